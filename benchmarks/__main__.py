@@ -0,0 +1,270 @@
+"""Замеры производительности этапов генерации сертификатов на синтетических данных.
+
+Запуск: `python -m benchmarks -sizes 100 1000 10000 -output results.json`.
+Каждый этап замеряется отдельно, результат - JSON со временем каждого повтора.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from certificates.certificate_generator import CertificateGeneratorApp, OutputMode
+from certificates.leaders import LeadersIndex
+from certificates.models import FullName, Team
+from certificates.output_tree import OutputTree
+from certificates.services.docx_generator import DocxCertificateGenerator
+from certificates.services.gender_guesser import SimpleGenderGuesser
+from certificates.services.pdf_generator import LEADER_REPLACEMENTS, STUDENT_REPLACEMENTS
+from certificates.services.teams_data_provider import (
+    START_ROW,
+    Columns,
+    TeamsTableParser,
+)
+from certificates.services.xlsx_teams_data_provider import XlsxTeamsDataProvider
+from certificates.team_table import TeamTable
+from utils.strings import try_extract_number_as_str
+from utils.xlsx import CellValue
+
+from .stubs import StubCertificateGenerator, StubTeamsDataProvider
+from .synthetic import generate_registration, write_registration, write_template
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+
+@dataclass
+class Workload:
+    """Подготовленные для замеров данные одного размера.
+
+    :teams_count:
+    Количество команд в регистрации.
+
+    :sheets:
+    Листы регистрации в памяти.
+
+    :registration_path:
+    Путь к той же регистрации, сохраненной в .xlsx.
+
+    :participation_template_path:
+    Путь к .docx шаблону сертификата участника со всеми его подстановками.
+
+    :appreciation_template_path:
+    Путь к .docx шаблону благодарности со всеми ее подстановками.
+
+    :teams:
+    Команды, разобранные из регистрации.
+
+    :names:
+    Строки ФИО всех участников и преподавателей.
+    """
+
+    teams_count: int
+    sheets: dict[str, list[list[CellValue]]]
+    registration_path: Path
+    participation_template_path: Path
+    appreciation_template_path: Path
+    teams: list[Team]
+    names: list[str]
+
+
+def bench_xlsx_read(workload: Workload, _: Path) -> None:
+    XlsxTeamsDataProvider(workload.registration_path, SimpleGenderGuesser()).get_data()
+
+
+def bench_table_parse(workload: Workload, _: Path) -> None:
+    parser = TeamsTableParser(SimpleGenderGuesser())
+    for sheet_name, rows in workload.sheets.items():
+        grade = try_extract_number_as_str(sheet_name, default_str="5")
+        parser.parse(rows[START_ROW - 1:], grade)
+
+
+def bench_full_name_parse(workload: Workload, _: Path) -> None:
+    for name in workload.names:
+        FullName.from_string(name)
+
+
+def bench_gender_guess(workload: Workload, _: Path) -> None:
+    SimpleGenderGuesser().guess_genders(
+        person.full_name
+        for team in workload.teams
+        for person in (*team.members, *team.leaders)
+    )
+
+
+def bench_leaders_index(workload: Workload, _: Path) -> None:
+    LeadersIndex.from_teams(workload.teams)
+
+
+def bench_team_table(workload: Workload, _: Path) -> None:
+    for _team in TeamTable.from_teams(workload.teams):
+        pass
+
+
+def bench_make_dirs(workload: Workload, scratch_path: Path) -> None:
+    output_tree = OutputTree(scratch_path, DocxCertificateGenerator.OUTPUT_SUFFIX)
+    for team in workload.teams:
+        output_tree.add_team(team)
+    output_tree.create()
+
+
+def bench_app_stub(workload: Workload, scratch_path: Path) -> None:
+    app = CertificateGeneratorApp(
+        StubTeamsDataProvider(workload.teams), StubCertificateGenerator(write_files=True),
+    )
+    app.generate_certificates(str(scratch_path))
+
+
+def bench_app_packages(workload: Workload, scratch_path: Path) -> None:
+    app = CertificateGeneratorApp(
+        StubTeamsDataProvider(workload.teams), StubCertificateGenerator(write_files=True),
+    )
+    app.generate_certificates(str(scratch_path), mode=OutputMode.packages)
+
+
+def bench_render_docx(workload: Workload, scratch_path: Path) -> None:
+    with DocxCertificateGenerator(
+        workload.participation_template_path, workload.appreciation_template_path,
+    ) as cert_generator:
+        for team in workload.teams:
+            cert_generator.generate_students_certificate(team, scratch_path)
+
+
+# Этапы в порядке прохождения данных через приложение.
+STAGES: dict[str, Callable[[Workload, Path], None]] = {
+    "xlsx_read": bench_xlsx_read,
+    "table_parse": bench_table_parse,
+    "full_name_parse": bench_full_name_parse,
+    "gender_guess": bench_gender_guess,
+    "leaders_index": bench_leaders_index,
+    "team_table": bench_team_table,
+    "make_dirs": bench_make_dirs,
+    "app_stub": bench_app_stub,
+    "app_packages": bench_app_packages,
+    "render_docx": bench_render_docx,
+}
+
+
+def prepare_workload(teams_count: int, work_path: Path) -> Workload:
+    """Готовит синтетическую регистрацию и шаблон заданного размера."""
+    sheets = generate_registration(teams_count)
+    registration_path = work_path / f"registration_{teams_count}.xlsx"
+    write_registration(registration_path, sheets)
+    participation_template_path = work_path / "participation.docx"
+    write_template(participation_template_path, tuple(sorted(STUDENT_REPLACEMENTS)))
+    appreciation_template_path = work_path / "appreciation.docx"
+    write_template(appreciation_template_path, tuple(sorted(LEADER_REPLACEMENTS)))
+
+    teams = XlsxTeamsDataProvider(registration_path, SimpleGenderGuesser()).get_data()
+    names = [
+        name
+        for rows in sheets.values()
+        for row in rows[START_ROW - 1:]
+        for field in (row[Columns.student - 1], row[Columns.leader - 1])
+        if isinstance(field, str)
+        for name in field.split(",")
+    ]
+    return Workload(
+        teams_count,
+        sheets,
+        registration_path,
+        participation_template_path,
+        appreciation_template_path,
+        teams,
+        names,
+    )
+
+
+def run_stage(
+    stage: str,
+    workload: Workload,
+    work_path: Path,
+    repeat: int,
+) -> dict:
+    """Замеряет этап `repeat` раз, каждый раз в новой пустой папке."""
+    seconds: list[float] = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(dir=work_path) as scratch_dir:
+            # У сборщика событий по умолчанию нет подписчиков, поэтому приложение
+            # ничего не выводит и не мешает замерам.
+            started = time.perf_counter()
+            STAGES[stage](workload, Path(scratch_dir))
+            seconds.append(time.perf_counter() - started)
+
+    best = min(seconds)
+    return {
+        "stage": stage,
+        "teams": workload.teams_count,
+        "seconds": seconds,
+        "best_s": best,
+        "median_s": statistics.median(seconds),
+        "per_team_us": best / workload.teams_count * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры этапов генерации сертификатов")
+    parser.add_argument(
+        "-sizes",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help="Количество команд в синтетических регистрациях",
+    )
+    parser.add_argument(
+        "-stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=list(STAGES),
+        help="Замеряемые этапы",
+    )
+    parser.add_argument(
+        "-repeat",
+        type=int,
+        default=3,
+        help="Сколько раз повторять каждый замер",
+    )
+    parser.add_argument(
+        "-output",
+        type=str,
+        default=None,
+        help="Путь к JSON-файлу с результатами, по умолчанию результаты печатаются",
+    )
+
+    args = parser.parse_args()
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for teams_count in args.sizes:
+            workload = prepare_workload(teams_count, Path(work_dir))
+            for stage in args.stages:
+                result = run_stage(stage, workload, Path(work_dir), args.repeat)
+                results.append(result)
+                # Ход замеров печатается в stderr, чтобы не смешиваться с JSON.
+                print(
+                    f"{stage:>16} {teams_count:>6} команд: "
+                    f"{result['best_s']:.3f} с ({result['per_team_us']:.1f} мкс/команда)",
+                    file=sys.stderr,
+                )
+
+    report = json.dumps(
+        {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        },
+        ensure_ascii=False,
+        indent=2,
+    )
+    if args.output is None:
+        print(report)
+    else:
+        Path(args.output).write_text(report, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
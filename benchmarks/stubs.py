@@ -0,0 +1,77 @@
+"""Заглушки сервисов приложения для замеров без Excel и Word."""
+
+import os
+import pathlib
+from collections.abc import Sequence
+from os import PathLike
+from typing import Self
+
+from certificates.models import Leader, Team
+from certificates.services.pdf_generator import CertificateGenerator
+from certificates.services.teams_data_provider import TeamsDataProvider
+from certificates.team_filter import ALL_TEAMS, TeamFilter
+
+
+class StubTeamsDataProvider(TeamsDataProvider):
+    """Провайдер, возвращающий заранее подготовленные команды."""
+
+    def __init__(self, teams: list[Team]) -> None:
+        """Инициализирует провайдер.
+
+        :teams:
+        Команды, которые будет возвращать провайдер.
+        """
+        self._teams = teams
+
+    def get_data(self, team_filter: TeamFilter = ALL_TEAMS) -> list[Team]:
+        """Возвращает подготовленные команды, подходящие под фильтр."""
+        if team_filter.is_empty:
+            return self._teams
+        return [team for team in self._teams if team_filter.accepts_team(team)]
+
+
+class StubCertificateGenerator(CertificateGenerator):
+    """Генератор, который только считает документы и, по желанию, создает пустые файлы.
+
+    Позволяет измерить накладные расходы приложения (папки, очереди, процессы)
+    отдельно от стоимости рендеринга.
+    """
+
+    def __init__(self, write_files: bool = False) -> None:
+        """Инициализирует генератор.
+
+        :write_files:
+        Создавать ли на месте каждого документа пустой файл.
+        """
+        super().__init__(os.devnull, os.devnull)
+        self._write_files = write_files
+        self.documents_count = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        pass
+
+    def generate_students_certificate(
+        self,
+        team: Team,
+        output_directory: PathLike,
+    ) -> None:
+        """Учитывает сертификаты участников команды."""
+        for student in team.members:
+            self._write(output_directory, str(student.full_name))
+
+    def generate_appreciation_certificate(
+        self,
+        leader: Leader,
+        output_directory: PathLike,
+        teams: Sequence[Team] = (),
+    ) -> None:
+        """Учитывает благодарственное письмо преподавателю."""
+        self._write(output_directory, str(leader.full_name))
+
+    def _write(self, output_directory: PathLike, name: str) -> None:
+        self.documents_count += 1
+        if self._write_files:
+            (pathlib.Path(output_directory) / f"{name}{self.OUTPUT_SUFFIX}").touch()
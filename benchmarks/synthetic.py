@@ -0,0 +1,212 @@
+"""Синтетические регистрации и шаблоны для замеров производительности."""
+
+import random
+import zipfile
+from os import PathLike
+from xml.sax.saxutils import escape, quoteattr
+
+from certificates.models import Team
+from certificates.services.pdf_generator import TextReplacements
+from certificates.services.teams_data_provider import START_ROW, TABLE_EOF, Columns
+from utils.xlsx import CellValue
+
+GRADES = ("5", "6", "7", "8", "9", "10", "11")
+
+_MALE_FIRST_NAMES = ("Александр", "Дмитрий", "Иван", "Максим", "Никита", "Сергей")
+_FEMALE_FIRST_NAMES = ("Анна", "Дарья", "Мария", "Ольга", "Полина", "Софья")
+_MALE_PATRONYMICS = ("Андреевич", "Викторович", "Олегович", "Петрович", "Юрьевич")
+_FEMALE_PATRONYMICS = ("Андреевна", "Викторовна", "Олеговна", "Петровна", "Юрьевна")
+_LAST_NAMES = ("Иванов", "Кузнецов", "Смирнов", "Попов", "Соколов", "Волков", "Лебедев")
+_CITIES = ("Екатеринбург", "Пермь", "Челябинск", "Тюмень", "Курган")
+
+_XLSX_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+_WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# Сколько команд в среднем выставляет одна школа и сколько в ней преподавателей.
+_TEAMS_PER_SCHOOL = 6
+_LEADERS_PER_SCHOOL = 3
+
+
+def generate_registration(
+    teams_count: int,
+    grades: tuple[str, ...] = GRADES,
+    seed: int = 0,
+) -> dict[str, list[list[CellValue]]]:
+    """Возвращает листы синтетической регистрации: название листа -> строки листа.
+
+    Листы называются по классам, команды распределяются между ними поровну.
+    Строки листа начинаются с первой и имеют ту же структуру, что и настоящая
+    регистрация: шапка до `START_ROW`, блоки по `Team.MEMBERS_PER_TEAM` строк
+    на команду (часть составов неполная), несколько преподавателей через запятую
+    и `TABLE_EOF` в конце.
+
+    :teams_count:
+    Общее количество команд.
+
+    :grades:
+    Классы, для каждого из которых создается лист.
+
+    :seed:
+    Зерно генератора случайных чисел: при одном зерне данные всегда одинаковые.
+    """
+    rng = random.Random(seed)
+    schools_count = max(1, teams_count // _TEAMS_PER_SCHOOL)
+    schools = [
+        (
+            f"МАОУ СОШ № {school_idx + 1}",
+            rng.choice(_CITIES),
+            [_random_full_name(rng) for _ in range(_LEADERS_PER_SCHOOL)],
+        )
+        for school_idx in range(schools_count)
+    ]
+
+    sheets: dict[str, list[list[CellValue]]] = {}
+    for grade_idx, grade in enumerate(grades):
+        rows: list[list[CellValue]] = [_empty_row() for _ in range(START_ROW - 1)]
+        rows[0][0] = f"Регистрация участников, {grade} класс"
+
+        for team_idx in range(grade_idx, teams_count, len(grades)):
+            school, city, school_leaders = rng.choice(schools)
+            leaders = rng.sample(school_leaders, rng.choice((1, 1, 2)))
+            members_count = rng.choice((Team.MEMBERS_PER_TEAM, Team.MEMBERS_PER_TEAM - 1, 4))
+
+            for member_idx in range(Team.MEMBERS_PER_TEAM):
+                row = _empty_row()
+                if member_idx == 0:
+                    row[0] = float(team_idx + 1)
+                    row[Columns.city - 1] = city
+                    row[Columns.school - 1] = school
+                    row[Columns.team - 1] = f'Команда "{grade}-{team_idx + 1}"'
+                    row[Columns.leader - 1] = ", ".join(leaders)
+                if member_idx < members_count:
+                    row[Columns.student - 1] = _random_full_name(rng)
+                rows.append(row)
+
+        eof_row = _empty_row()
+        eof_row[0] = TABLE_EOF
+        rows.append(eof_row)
+        sheets[f"{grade} класс"] = rows
+
+    return sheets
+
+
+def write_registration(path: PathLike, sheets: dict[str, list[list[CellValue]]]) -> None:
+    """Сохраняет листы регистрации в .xlsx файл, строки - в общей таблице, как у Excel.
+
+    :path:
+    Путь к создаваемому .xlsx файлу.
+
+    :sheets:
+    Листы регистрации, например из `generate_registration`.
+    """
+    shared_strings: dict[str, int] = {}
+
+    def cell_xml(reference: str, value: CellValue) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, str):
+            string_idx = shared_strings.setdefault(value, len(shared_strings))
+            return f'<c r="{reference}" t="s"><v>{string_idx}</v></c>'
+        return f'<c r="{reference}"><v>{value}</v></c>'
+
+    sheet_parts: list[str] = []
+    for rows in sheets.values():
+        rows_xml = "".join(
+            f'<row r="{row_idx}">'
+            + "".join(
+                cell_xml(f"{_column_letter(col_idx)}{row_idx}", value)
+                for col_idx, value in enumerate(row, start=1)
+            )
+            + "</row>"
+            for row_idx, row in enumerate(rows, start=1)
+        )
+        sheet_parts.append(f"<worksheet {_XLSX_NS}><sheetData>{rows_xml}</sheetData></worksheet>")
+
+    sheets_xml = "".join(
+        f'<sheet name={quoteattr(name)} sheetId="{idx}" r:id="rId{idx}"/>'
+        for idx, name in enumerate(sheets, start=1)
+    )
+    rels_xml = "".join(
+        f'<Relationship Id="rId{idx}" Type="{_REL_NS}/worksheet" '
+        f'Target="worksheets/sheet{idx}.xml"/>'
+        for idx in range(1, len(sheets) + 1)
+    )
+    strings_xml = "".join(
+        f"<si><t>{escape(string)}</t></si>" for string in shared_strings
+    )
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "xl/workbook.xml",
+            f"<workbook {_XLSX_NS} xmlns:r=\"{_REL_NS}\"><sheets>{sheets_xml}</sheets></workbook>",
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{_PKG_REL_NS}">{rels_xml}'
+            f'<Relationship Id="rIdStrings" Type="{_REL_NS}/sharedStrings" '
+            'Target="sharedStrings.xml"/></Relationships>',
+        )
+        archive.writestr("xl/sharedStrings.xml", f"<sst {_XLSX_NS}>{strings_xml}</sst>")
+        for idx, sheet_xml in enumerate(sheet_parts, start=1):
+            archive.writestr(f"xl/worksheets/sheet{idx}.xml", sheet_xml)
+
+
+def write_template(path: PathLike, replacements: tuple[TextReplacements, ...]) -> None:
+    """Сохраняет простой .docx шаблон, в котором каждая подстановка - отдельный абзац.
+
+    :path:
+    Путь к создаваемому .docx файлу.
+
+    :replacements:
+    Подстановки, которые нужно разместить в шаблоне.
+    """
+    paragraphs = "".join(
+        f'<w:p><w:pPr><w:jc w:val="center"/></w:pPr>'
+        f"<w:r><w:t>{{{replacement}}}</w:t></w:r></w:p>"
+        for replacement in replacements
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            f'<Types xmlns="{_CONTENT_TYPES_NS}">'
+            '<Default Extension="rels" '
+            'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>",
+        )
+        archive.writestr(
+            "_rels/.rels",
+            f'<Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" '
+            'Target="word/document.xml"/></Relationships>',
+        )
+        archive.writestr(
+            "word/document.xml",
+            f'<w:document xmlns:w="{_WORD_NS}"><w:body>{paragraphs}</w:body></w:document>',
+        )
+
+
+def _empty_row() -> list[CellValue]:
+    return [None] * Columns.leader
+
+
+def _column_letter(col_idx: int) -> str:
+    letters = ""
+    while col_idx:
+        col_idx, remainder = divmod(col_idx - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def _random_full_name(rng: random.Random) -> str:
+    last_name = rng.choice(_LAST_NAMES)
+    if rng.random() < 0.5:
+        return f"{last_name} {rng.choice(_MALE_FIRST_NAMES)} {rng.choice(_MALE_PATRONYMICS)}"
+    return (
+        f"{last_name}а {rng.choice(_FEMALE_FIRST_NAMES)} {rng.choice(_FEMALE_PATRONYMICS)}"
+    )
@@ -1,10 +1,11 @@
 import argparse
 from pathlib import Path
 
-from .certificate_generator import CertificateGeneratorApp
-from .services.gender_guesser import SimpleGenderGuesser
-from .services.pdf_generator import PdfCertificateGenerator
-from .services.teams_data_provider import ExcelTeamsDataProvider
+from .backends import READERS, RENDERERS, describe
+
+# Варианты `-combine` совпадают со значениями `CombineMode`, но сам модуль генерации
+# импортируется только после разбора аргументов, чтобы справка выводилась быстро.
+COMBINE_MODES = ("grade", "school")
 
 
 def main():
@@ -33,13 +34,355 @@ def main():
         default=str(Path.cwd()),
         help="Путь, по которому будут созданы сертификаты",
     )
+    parser.add_argument(
+        "-reader",
+        type=str,
+        choices=list(READERS),
+        default="xlwings",
+        help=f"Способ чтения регистрации: {describe(READERS)}",
+    )
+    parser.add_argument(
+        "-names",
+        type=str,
+        default=None,
+        help=(
+            "Путь к словарю имен и отчеств для определения пола преподавателей: "
+            "в каждой строке имя и через пробел пол, м или ж"
+        ),
+    )
+    parser.add_argument(
+        "-cache",
+        action="store_true",
+        help=(
+            "Кэшировать считанные команды рядом с файлом регистрации "
+            "и не перечитывать его, пока он не изменится"
+        ),
+    )
+    parser.add_argument(
+        "-grade",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Генерировать документы только для этих классов, например: -grade 7 8",
+    )
+    parser.add_argument(
+        "-school",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Генерировать документы только для команд этих школ",
+    )
+    parser.add_argument(
+        "-city",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Генерировать документы только для команд из этих городов",
+    )
+    parser.add_argument(
+        "-team",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Генерировать документы только для команд с этими названиями",
+    )
+    parser.add_argument(
+        "-leader",
+        type=str,
+        nargs="+",
+        default=[],
+        help=(
+            "Генерировать только благодарности этим преподавателям "
+            "(в формате `Фамилия Имя Отчество`) и сертификаты их команд"
+        ),
+    )
+    parser.add_argument(
+        "-renderer",
+        type=str,
+        choices=list(RENDERERS),
+        default="word",
+        help=f"Способ генерации: {describe(RENDERERS)}",
+    )
+    parser.add_argument(
+        "-soffice",
+        type=str,
+        default="soffice",
+        help="Путь к исполняемому файлу LibreOffice для режима libreoffice",
+    )
+    parser.add_argument(
+        "-soffice-instances",
+        type=int,
+        default=1,
+        help="Количество процессов LibreOffice в каждом процессе генерации",
+    )
+    parser.add_argument(
+        "-font",
+        type=str,
+        default="times.ttf",
+        help="Путь к файлу шрифта, которым печатаются значения в режиме pdf-overlay",
+    )
+    parser.add_argument(
+        "-workers",
+        type=int,
+        default=1,
+        help="Количество процессов, параллельно генерирующих сертификаты",
+    )
+    parser.add_argument(
+        "-mkdir-threads",
+        type=int,
+        default=1,
+        help=(
+            "Сколько потоков одновременно создают папки с результатами, "
+            "для сетевых дисков стоит указать 8-16"
+        ),
+    )
+    # Режимы сохранения документов (см. `OutputMode`) взаимоисключающие.
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument(
+        "-combine",
+        type=str,
+        choices=COMBINE_MODES,
+        default=None,
+        help=(
+            "Собрать сертификаты и благодарности в общие pdf-файлы: "
+            "grade - по одному на класс, school - по одному на школу"
+        ),
+    )
+    mode_group.add_argument(
+        "-incremental",
+        action="store_true",
+        help=(
+            "Генерировать только документы, данные или шаблоны которых изменились "
+            "с прошлого запуска, и удалять документы выбывших участников"
+        ),
+    )
+    mode_group.add_argument(
+        "-pipelined",
+        action="store_true",
+        help=(
+            "Начинать генерацию сразу, не дожидаясь чтения всей регистрации: "
+            "документы команды генерируются, как только она считана"
+        ),
+    )
+    mode_group.add_argument(
+        "-resume",
+        action="store_true",
+        help=(
+            "Вести журнал готовых документов и при повторном запуске с той же папкой "
+            "продолжать прерванную генерацию; ошибки записываются в отчет"
+        ),
+    )
+    parser.add_argument(
+        "-retries",
+        type=int,
+        default=0,
+        help="Сколько раз повторять задание, завершившееся ошибкой",
+    )
+    parser.add_argument(
+        "-timeout",
+        type=float,
+        default=None,
+        help=(
+            "Сколько секунд могут генерироваться документы одной команды или "
+            "преподавателя, прежде чем процесс генерации будет перезапущен"
+        ),
+    )
+    mode_group.add_argument(
+        "-packages",
+        action="store_true",
+        help=(
+            "Вместо папок с документами собрать по zip-архиву на каждую папку преподавателей "
+            "с сертификатами их команд и благодарностями - для рассылки по почте"
+        ),
+    )
+    parser.add_argument(
+        "-jobs",
+        type=str,
+        default=None,
+        help=(
+            "Путь к JSON-файлу заданий пакетного запуска: списку объектов с путями "
+            "reg, cert, thanks, output и необязательным названием name. Задания выполняются "
+            "по очереди с остальными аргументами командной строки, Excel и Word "
+            "запускаются один раз на все задания, а одинаковые шаблоны готовятся один раз"
+        ),
+    )
+    parser.add_argument(
+        "-serve",
+        action="store_true",
+        help=(
+            "Не генерировать все документы, а запустить сервер, который держит регистрацию "
+            "и генератор в памяти и по HTTP-запросу создает отдельный сертификат: "
+            "GET /student?name=ФИО[&team=Команда], GET /leader?name=ФИО[&school=Школа], "
+            "GET /status, POST /reload. Регистрация перечитывается при изменении файла"
+        ),
+    )
+    parser.add_argument(
+        "-port",
+        type=int,
+        default=8765,
+        help="Порт, на котором сервер принимает запросы с этого компьютера",
+    )
+    parser.add_argument(
+        "-socket",
+        type=str,
+        default=None,
+        help="Путь к Unix-сокету, на котором сервер принимает запросы вместо порта",
+    )
+    parser.add_argument(
+        "-watch-interval",
+        type=float,
+        default=1.0,
+        help="Как часто, в секундах, сервер проверяет, не изменился ли файл регистрации",
+    )
+    parser.add_argument(
+        "-metrics",
+        type=str,
+        default=None,
+        help=(
+            "Путь к файлу, в который построчно в JSON записываются события генерации: "
+            "этапы, время каждого документа, ошибки и итоговая статистика"
+        ),
+    )
 
     args = parser.parse_args()
-    generator = CertificateGeneratorApp(
-        ExcelTeamsDataProvider(Path(args.reg), SimpleGenderGuesser()),
-        PdfCertificateGenerator(Path(args.cert), Path(args.thanks)),
+    if args.jobs is not None and args.serve:
+        parser.error("аргументы -jobs и -serve не совместимы")
+
+    # Генерация и выбранные способы импортируются только после разбора аргументов.
+    from utils.metrics import ConsoleSink, JsonLinesSink, Metrics, set_metrics
+
+    from .certificate_generator import CertificateGeneratorApp, CombineMode, OutputMode
+    from .render_pool import RetryPolicy
+    from .services.cached_teams_data_provider import CachedTeamsDataProvider
+    from .services.gender_guesser import (
+        KNOWN_FIRST_NAMES,
+        SimpleGenderGuesser,
+        load_known_names,
     )
-    generator.generate_certificates(args.output)
+    from .team_filter import TeamFilter
+
+    gender_guesser = SimpleGenderGuesser()
+    if args.names is not None:
+        gender_guesser = SimpleGenderGuesser(
+            {**KNOWN_FIRST_NAMES, **load_known_names(Path(args.names))},
+        )
+    team_filter = TeamFilter.create(args.grade, args.school, args.city, args.team, args.leader)
+    combine_by = CombineMode.grade
+    if args.combine is not None:
+        output_mode = OutputMode.combined
+        combine_by = CombineMode(args.combine)
+    elif args.incremental:
+        output_mode = OutputMode.incremental
+    elif args.pipelined:
+        output_mode = OutputMode.pipelined
+    elif args.resume:
+        output_mode = OutputMode.resumable
+    elif args.packages:
+        output_mode = OutputMode.packages
+    else:
+        output_mode = OutputMode.folders
+
+    def create_provider(reg_path, session=None):
+        teams_data_provider = READERS[args.reader].factory(reg_path, gender_guesser, session)
+        if args.cache:
+            teams_data_provider = CachedTeamsDataProvider(
+                teams_data_provider,
+                reg_path,
+                reg_path.with_name(f"{reg_path.name}.cache.json"),
+                gender_guesser,
+            )
+        return teams_data_provider
+
+    def generate(teams_data_provider, cert_generator, output_path):
+        generator = CertificateGeneratorApp(
+            teams_data_provider, cert_generator, args.mkdir_threads, team_filter,
+        )
+        generator.generate_certificates(
+            output_path,
+            args.workers,
+            mode=output_mode,
+            combine_by=combine_by,
+            retry_policy=RetryPolicy(args.retries + 1, args.timeout),
+        )
+
+    metrics = Metrics()
+    console = ConsoleSink(metrics)
+    metrics.subscribe(console)
+    metrics_file = None
+    if args.metrics is not None:
+        metrics_file = JsonLinesSink(Path(args.metrics))
+        metrics.subscribe(metrics_file)
+    set_metrics(metrics)
+
+    try:
+        if args.jobs is not None:
+            run_jobs(args, create_provider, generate)
+            return
+
+        reg_path = Path(args.reg)
+        teams_data_provider = create_provider(reg_path)
+        cert_generator = RENDERERS[args.renderer].factory(
+            Path(args.cert), Path(args.thanks), args,
+        )
+        if args.serve:
+            from .server import CertificateServer
+
+            server = CertificateServer(
+                teams_data_provider,
+                cert_generator,
+                reg_path,
+                Path(args.output),
+                args.watch_interval,
+            )
+            server.serve(args.port, None if args.socket is None else Path(args.socket))
+            return
+
+        generate(teams_data_provider, cert_generator, args.output)
+    finally:
+        console.close()
+        if metrics_file is not None:
+            metrics.emit({"event": "summary", "stages": metrics.summary()})
+            metrics_file.close()
+
+
+def run_jobs(args, create_provider, generate):
+    """Выполняет задания пакетного запуска из файла `args.jobs`.
+
+    Сеансы способов чтения и генерации (см. `Backend.session`) и кэш шаблонов
+    создаются один раз и передаются всем заданиям, а закрываются после последнего.
+    """
+    from .batch import load_jobs, run_batch
+    from .services.pdf_generator import TemplateCache
+
+    jobs = load_jobs(Path(args.jobs))
+    reader, renderer = READERS[args.reader], RENDERERS[args.renderer]
+    reader_session = None if reader.session is None else reader.session(args)
+    renderer_session = None if renderer.session is None else renderer.session(args)
+    template_cache = TemplateCache()
+
+    def run_job(job):
+        cert_generator = renderer.factory(
+            job.participation_template_path,
+            job.appreciation_template_path,
+            args,
+            renderer_session,
+            template_cache,
+        )
+        generate(
+            create_provider(job.registration_path, reader_session),
+            cert_generator,
+            str(job.output_path),
+        )
+
+    try:
+        results = run_batch(jobs, run_job)
+    finally:
+        template_cache.close()
+        for session in (reader_session, renderer_session):
+            if session is not None:
+                session.close()
+    if any(result.error is not None for result in results):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Final, NamedTuple
+
+if TYPE_CHECKING:
+    from .services.gender_guesser import GenderGuesser
+    from .services.pdf_generator import (
+        CertificateGenerator,
+        SharedDocumentConverter,
+        TemplateCache,
+    )
+    from .services.teams_data_provider import ExcelSession, TeamsDataProvider
+
+
+class Backend(NamedTuple):
+    """Способ чтения регистрации или генерации документов, выбираемый по имени.
+
+    Модуль способа импортируется только при вызове фабрики: справка и разбор
+    аргументов командной строки не загружают генераторы и их зависимости,
+    а на компьютерах без Office доступны способы, которым он не нужен.
+    """
+
+    description: str
+    factory: Callable[..., Any]
+    # Создает по аргументам командной строки сеанс способа для пакетного запуска:
+    # запущенное приложение, общее для всех заданий. У сеанса есть метод `close`.
+    session: Callable[[Any], Any] | None = None
+
+
+def _create_excel_session(options: Any) -> ExcelSession:
+    from .services.teams_data_provider import ExcelSession
+
+    return ExcelSession()
+
+
+def _create_xlwings_reader(
+    reg_path: Path, gender_guesser: GenderGuesser, session: ExcelSession | None = None,
+) -> TeamsDataProvider:
+    from .services.teams_data_provider import ExcelTeamsDataProvider
+
+    return ExcelTeamsDataProvider(reg_path, gender_guesser, session)
+
+
+def _create_xlsx_stream_reader(
+    reg_path: Path, gender_guesser: GenderGuesser, session: None = None,
+) -> TeamsDataProvider:
+    from .services.xlsx_teams_data_provider import XlsxTeamsDataProvider
+
+    return XlsxTeamsDataProvider(reg_path, gender_guesser)
+
+
+def _create_word_session(options: Any) -> SharedDocumentConverter:
+    from .services.pdf_generator import SharedDocumentConverter, WordDocumentConverter
+
+    return SharedDocumentConverter(WordDocumentConverter())
+
+
+def _create_libreoffice_session(options: Any) -> SharedDocumentConverter:
+    from .services.libreoffice_converter import LibreOfficeDocumentConverter
+    from .services.pdf_generator import SharedDocumentConverter
+
+    return SharedDocumentConverter(
+        LibreOfficeDocumentConverter(options.soffice, options.soffice_instances),
+    )
+
+
+def _create_word_renderer(
+    cert_path: Path,
+    thanks_path: Path,
+    options: Any,
+    session: SharedDocumentConverter | None = None,
+    template_cache: TemplateCache | None = None,
+) -> CertificateGenerator:
+    from .services.docx_to_pdf_generator import DocxToPdfCertificateGenerator
+    from .services.pdf_generator import WordDocumentConverter
+
+    # Значения подставляются без Word, а Word только сохраняет документы в pdf.
+    return DocxToPdfCertificateGenerator(
+        cert_path, thanks_path, session or WordDocumentConverter(), template_cache,
+    )
+
+
+def _create_docx_renderer(
+    cert_path: Path,
+    thanks_path: Path,
+    options: Any,
+    session: None = None,
+    template_cache: TemplateCache | None = None,
+) -> CertificateGenerator:
+    from .services.docx_generator import DocxCertificateGenerator
+
+    return DocxCertificateGenerator(cert_path, thanks_path, template_cache)
+
+
+def _create_pdf_overlay_renderer(
+    cert_path: Path,
+    thanks_path: Path,
+    options: Any,
+    session: SharedDocumentConverter | None = None,
+    template_cache: TemplateCache | None = None,
+) -> CertificateGenerator:
+    from .services.pdf_generator import WordDocumentConverter
+    from .services.pdf_overlay_generator import PdfOverlayCertificateGenerator
+
+    return PdfOverlayCertificateGenerator(
+        cert_path,
+        thanks_path,
+        Path(options.font),
+        session or WordDocumentConverter(),
+        template_cache,
+    )
+
+
+def _create_libreoffice_renderer(
+    cert_path: Path,
+    thanks_path: Path,
+    options: Any,
+    session: SharedDocumentConverter | None = None,
+    template_cache: TemplateCache | None = None,
+) -> CertificateGenerator:
+    from .services.docx_to_pdf_generator import DocxToPdfCertificateGenerator
+    from .services.libreoffice_converter import LibreOfficeDocumentConverter
+
+    return DocxToPdfCertificateGenerator(
+        cert_path,
+        thanks_path,
+        session or LibreOfficeDocumentConverter(options.soffice, options.soffice_instances),
+        template_cache,
+    )
+
+
+# Фабрика способа чтения принимает путь к регистрации, определитель пола
+# и, при пакетном запуске, сеанс способа.
+READERS: Final[dict[str, Backend]] = {
+    "xlwings": Backend("через Excel", _create_xlwings_reader, _create_excel_session),
+    "xlsx-stream": Backend("без Excel", _create_xlsx_stream_reader),
+}
+
+# Фабрика способа генерации принимает пути к шаблонам сертификата и благодарности,
+# разобранные аргументы командной строки с настройками способа и, при пакетном
+# запуске, сеанс способа и кэш шаблонов, общие для всех заданий.
+RENDERERS: Final[dict[str, Backend]] = {
+    "word": Backend("pdf через MS Word", _create_word_renderer, _create_word_session),
+    "docx": Backend("docx-файлы без Word", _create_docx_renderer),
+    "pdf-overlay": Backend(
+        "pdf-шаблон готовится в Word один раз, значения накладываются поверх него",
+        _create_pdf_overlay_renderer,
+        _create_word_session,
+    ),
+    "libreoffice": Backend(
+        "pdf через LibreOffice без графического интерфейса",
+        _create_libreoffice_renderer,
+        _create_libreoffice_session,
+    ),
+}
+
+
+def describe(backends: dict[str, Backend]) -> str:
+    """Перечисляет способы с описаниями для справки командной строки."""
+    return ", ".join(f"{name} - {backend.description}" for name, backend in backends.items())
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Final
+
+from utils.metrics import Event, get_metrics
+
+# Ключи задания в файле заданий совпадают с аргументами командной строки одиночного запуска.
+_JOB_PATH_KEYS: Final[tuple[str, ...]] = ("reg", "cert", "thanks", "output")
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """Одно задание пакетного запуска: регистрация, шаблоны и папка с результатами."""
+
+    name: str
+    registration_path: Path
+    participation_template_path: Path
+    appreciation_template_path: Path
+    output_path: Path
+
+
+@dataclass
+class JobResult:
+    """Итог задания пакетного запуска.
+
+    :seconds:
+    Время выполнения задания целиком.
+
+    :read_seconds:
+    Время считывания регистрации. При генерации параллельно со считыванием
+    оно входит во время генерации.
+
+    :documents_count:
+    Сколько документов сгенерировано, включая завершившиеся ошибкой.
+
+    :error:
+    Исключение, которым завершилось задание, если оно завершилось ошибкой.
+    """
+
+    job: BatchJob
+    seconds: float = 0.0
+    read_seconds: float = 0.0
+    documents_count: int = 0
+    error: Exception | None = None
+
+
+def load_jobs(jobs_path: Path) -> list[BatchJob]:
+    """Загружает задания пакетного запуска из JSON-файла.
+
+    Файл содержит список заданий, каждое - объект с путями `reg`, `cert`, `thanks`
+    и `output`, как у аргументов командной строки, и необязательным названием `name`.
+    Относительные пути отсчитываются от папки файла заданий.
+
+    :jobs_path:
+    Путь к файлу заданий.
+    """
+    with open(jobs_path, encoding="utf-8") as jobs_file:
+        entries = json.load(jobs_file)
+    if not isinstance(entries, list) or not entries:
+        msg = f"Файл заданий {jobs_path} должен содержать непустой список заданий"
+        raise ValueError(msg)
+
+    jobs: list[BatchJob] = []
+    for idx, entry in enumerate(entries, start=1):
+        missing = [
+            key for key in _JOB_PATH_KEYS
+            if not isinstance(entry, dict) or not isinstance(entry.get(key), str)
+        ]
+        if missing:
+            msg = f"В задании {idx} файла {jobs_path} не указаны пути: {', '.join(missing)}"
+            raise ValueError(msg)
+
+        reg_path, cert_path, thanks_path, output_path = (
+            jobs_path.parent / entry[key] for key in _JOB_PATH_KEYS
+        )
+        jobs.append(
+            BatchJob(
+                str(entry.get("name") or output_path.name),
+                reg_path,
+                cert_path,
+                thanks_path,
+                output_path,
+            ),
+        )
+    return jobs
+
+
+class _JobStats:
+    """Подписчик на события, собирающий показатели текущего задания."""
+
+    def __init__(self) -> None:
+        self.result: JobResult | None = None
+
+    def __call__(self, event: Event) -> None:
+        if self.result is None:
+            return
+        match event:
+            case {"event": "stage_end", "stage": "read", "seconds": seconds}:
+                self.result.read_seconds += seconds
+            case {"event": "item", "stage": str(stage), "count": count} if (
+                stage.startswith("render.")
+            ):
+                self.result.documents_count += count
+
+
+def run_batch(
+    jobs: Sequence[BatchJob],
+    run_job: Callable[[BatchJob], None],
+) -> list[JobResult]:
+    """Выполняет задания по очереди и сообщает время выполнения каждого.
+
+    Ошибка одного задания не прерывает остальные: она выводится и попадает в итог
+    задания. После всех заданий выводится сводка по каждому из них, а в события
+    (см. `utils.metrics`) записывается событие `job` на каждое задание.
+
+    :jobs:
+    Задания пакетного запуска.
+
+    :run_job:
+    Выполняет одно задание. Приложения, общие для всех заданий (см. `Backend.session`),
+    запускаются при первом задании, поэтому его время включает их запуск.
+    """
+    metrics = get_metrics()
+    job_stats = _JobStats()
+    metrics.subscribe(job_stats)
+
+    results: list[JobResult] = []
+    with metrics.stage("batch", len(jobs)):
+        for job in jobs:
+            result = job_stats.result = JobResult(job)
+            started = time.perf_counter()
+            try:
+                with metrics.stage("job", title=f"Задание {job.name}"):
+                    run_job(job)
+            except Exception as exception:
+                result.error = exception
+                metrics.message(f"Задание {job.name} завершилось ошибкой: {exception}", "error")
+            result.seconds = time.perf_counter() - started
+            job_stats.result = None
+            error = None if result.error is None else repr(result.error)
+            metrics.item("batch", job.name, result.seconds, error)
+            metrics.emit(_job_event(result))
+            results.append(result)
+
+    metrics.message(_format_summary(results))
+    return results
+
+
+def _job_event(result: JobResult) -> dict[str, Any]:
+    return {
+        "event": "job",
+        "name": result.job.name,
+        "registration": str(result.job.registration_path),
+        "output": str(result.job.output_path),
+        "seconds": result.seconds,
+        "read_seconds": result.read_seconds,
+        "documents": result.documents_count,
+        "error": None if result.error is None else repr(result.error),
+    }
+
+
+def _format_summary(results: Sequence[JobResult]) -> str:
+    lines = ["Итоги пакетного запуска:"]
+    for result in results:
+        line = (
+            f"  {result.job.name}: {result.seconds:.1f} с, "
+            f"считывание {result.read_seconds:.1f} с, документов: {result.documents_count}"
+        )
+        if result.error is not None:
+            line += ", завершено с ошибкой"
+        lines.append(line)
+    lines.append(f"Всего: {sum(result.seconds for result in results):.1f} с")
+    return "\n".join(lines)
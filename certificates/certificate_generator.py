@@ -1,22 +1,118 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import ExitStack, contextmanager
+from dataclasses import replace
+from enum import StrEnum
 from pathlib import Path
+from typing import TYPE_CHECKING, Final
 
-from utils.progress_bar import ProgressBar
+from utils.background import iterate_in_background
+from utils.files import hash_file
+from utils.iterables import batched
+from utils.metrics import get_metrics
 from utils.strings import sanitize_string
 
-from .models import Leader
-from .services.pdf_generator import CertificateGenerator
-from .services.teams_data_provider import ExcelTeamsDataProvider
+from .checkpoint import CheckpointJournal, write_error_report
+from .leader_packages import LeaderPackages
+from .leaders import LeadersIndex
+from .manifest import GenerationManifest, hash_inputs
+from .models import Leader, Student, Team
+from .output_tree import PACKAGES_FOLDER, OutputTree
+from .render_pool import (
+    NO_RETRIES,
+    RenderResult,
+    RenderTask,
+    RetryPolicy,
+    render_in_memory,
+    render_in_pool,
+    render_tasks,
+)
+from .services.pdf_generator import (
+    CertificateGenerator,
+    get_leader_replacements,
+    get_student_replacements,
+)
+from .services.teams_data_provider import TeamsDataProvider
+from .team_filter import ALL_TEAMS, TeamFilter
+
+if TYPE_CHECKING:
+    from utils.combined_pdf import CombinedPdfWriter
+
+
+class CombineMode(StrEnum):
+    """Признак, по которому сертификаты собираются в общие pdf-файлы."""
+
+    grade = "grade"
+    school = "school"
+
+
+class OutputMode(StrEnum):
+    """Способ сохранения сгенерированных документов.
+
+    - `folders` - по файлу на каждого человека в папках команд и преподавателей;
+    - `combined` - по многостраничному pdf-файлу на каждый класс или школу
+      (см. `CombineMode`), генератор сертификатов должен создавать pdf-файлы;
+    - `incremental` - как `folders`, но в папке с результатами ведется манифест
+      входных данных документов, и повторно генерируются только документы, данные
+      или шаблон которых изменились. Документы выбывших участников удаляются;
+    - `pipelined` - как `folders`, но генерация начинается сразу, параллельно
+      со считыванием регистрации: документы каждой команды генерируются,
+      как только команда считана;
+    - `resumable` - как `folders`, но в папке с результатами ведется журнал готовых
+      документов, и повторный запуск с той же папкой продолжает прерванную генерацию:
+      уже созданные папки не мешают запуску, а готовые документы пропускаются.
+      Задания, завершившиеся ошибкой, записываются в отчет `ERROR_REPORT_FILENAME`;
+    - `packages` - вместо папок с документами в папке `PACKAGES_FOLDER` создается
+      по одному zip-архиву для рассылки на каждую папку преподавателей: сертификаты
+      их команд и благодарности им (см. `LeaderPackages`). Генераторы, создающие
+      документы в памяти (см. `RENDERS_IN_MEMORY`), работают в текущем процессе
+      без временных файлов, число процессов и повторы к ним не применяются.
+      Остальные генерируют документы во временную папку.
+    """
+
+    folders = "folders"
+    combined = "combined"
+    incremental = "incremental"
+    pipelined = "pipelined"
+    resumable = "resumable"
+    packages = "packages"
+
+    @property
+    def supports_team_filter(self) -> bool:
+        """Можно ли в этом режиме перепечатать часть документов (см. `TeamFilter`).
+
+        Общие файлы и архивы заменялись бы неполными, а инкрементальная генерация
+        удаляла бы документы неотобранных участников как выбывших.
+        """
+        return self in (OutputMode.folders, OutputMode.pipelined, OutputMode.resumable)
+
+
+# Сколько считанных, но еще не переданных на генерацию заданий может накопиться.
+_PIPELINE_QUEUE_SIZE: Final[int] = 64
+# Части этапа `render`: документы участников и благодарности преподавателям.
+_STUDENTS_STAGE: Final[str] = "render.students"
+_APPRECIATIONS_STAGE: Final[str] = "render.appreciations"
+# Отчет о заданиях, завершившихся ошибкой, в папке с результатами.
+ERROR_REPORT_FILENAME: Final[str] = "Ошибки.txt"
 
 
-#TODO: Убрать вызовы print(), придумать другой способ отслеживания прогресса,
-# возможно в дальнейшем какой то общий объект-состояние для главного и фонового потока.
 class CertificateGeneratorApp:
-    """Приложение-генератор сертификатов для участников и их преподавателей."""
+    """Приложение-генератор сертификатов для участников и их преподавателей.
+
+    Ход генерации (этапы, время каждого документа, ошибки) передается в сборщик
+    событий `utils.metrics.get_metrics()`, вывод в консоль - дело его подписчиков.
+    """
 
     def __init__(
         self,
-        teams_data_extractor: ExcelTeamsDataProvider,
+        teams_data_extractor: TeamsDataProvider,
         pdf_cert_generator: CertificateGenerator,
+        mkdir_threads: int = 1,
+        team_filter: TeamFilter = ALL_TEAMS,
     ) -> None:
         """Инициализирует экземпляр консольного приложения генератора сертифактов.
 
@@ -25,58 +121,551 @@ class CertificateGeneratorApp:
 
         :pdf_cert_generator:
         Экземпляр сервиса-генератора сертификатов.
+
+        :mkdir_threads:
+        Сколько потоков создают папки с результатами (см. `OutputTree.create`).
+
+        :team_filter:
+        Если задан, генерируются только документы подходящих команд и благодарности
+        их преподавателям (при фильтре по преподавателям - только заданным).
+        Документы сохраняются в уже существующие папки прежней структуры, поэтому
+        фильтр подходит для перепечатки части документов после полной генерации.
+        В благодарностях, как и при полной генерации, перечисляются все команды
+        преподавателя, поэтому регистрация считывается целиком.
         """
         self._teams_data_extractor = teams_data_extractor
         self._cert_generator = pdf_cert_generator
+        self._mkdir_threads = mkdir_threads
+        self._team_filter = team_filter
+        # Отобрана часть команд, папки остальных остались от полной генерации.
+        self._partial = not team_filter.is_empty
 
     def generate_certificates(
         self,
         output_path: str,
+        workers: int = 1,
+        *,
+        mode: OutputMode = OutputMode.folders,
+        combine_by: CombineMode = CombineMode.grade,
+        retry_policy: RetryPolicy = NO_RETRIES,
     ) -> None:
-        """Генерирует сертификаты на основе предоставленных файлов-шаблонов."""
-        print("Считывание данных из регистрационного файла")
-        teams = self._teams_data_extractor.get_data()
+        """Генерирует сертификаты на основе предоставленных файлов-шаблонов.
 
-        print("Генерируем сертификаты участников")
+        :output_path:
+        Путь, по которому будут созданы папки с сертификатами и благодарностями.
+
+        :workers:
+        Количество процессов, между которыми распределяется генерация.
+        Каждый процесс использует собственный экземпляр генератора сертификатов.
+
+        :mode:
+        Способ сохранения документов (см. `OutputMode`).
+
+        :combine_by:
+        Признак, по которому документы собираются в общие файлы
+        в режиме `OutputMode.combined`.
+
+        :retry_policy:
+        Повторы заданий, завершившихся ошибкой, и ограничение времени их выполнения.
+        Если задано, генерация всегда идет в отдельных процессах, которые
+        при аварийном завершении или зависании заменяются новыми.
+        """
+        if mode == OutputMode.combined and self._cert_generator.OUTPUT_SUFFIX != ".pdf":
+            msg = "Общие pdf-файлы собираются только из pdf-документов, выберите pdf-генератор"
+            raise ValueError(msg)
+        if self._partial and not mode.supports_team_filter:
+            msg = (
+                "Фильтр команд не совместим с инкрементальной генерацией, "
+                "общими pdf-файлами и архивами для рассылки"
+            )
+            raise ValueError(msg)
 
-        certs_folder_path = Path(output_path) / "Сертификаты"
-        Path.mkdir(certs_folder_path)
+        if mode == OutputMode.pipelined:
+            self._generate_pipelined(Path(output_path), workers, retry_policy)
+            return
+
+        metrics = get_metrics()
+        with metrics.stage("read", title="Считывание данных из регистрационного файла"):
+            all_teams = self._teams_data_extractor.get_data()
+        # Команды отбираются после чтения: благодарностям нужны все команды преподавателя.
+        teams = [team for team in all_teams if self._team_filter.accepts_team(team)]
+        leaders = self._select_leaders(LeadersIndex.from_teams(all_teams))
+        if self._partial:
+            metrics.message(f"Команд, подходящих под фильтр: {len(teams)}")
+
+        if mode == OutputMode.resumable:
+            self._generate_resumable(teams, leaders, Path(output_path), workers, retry_policy)
+            return
+
+        if mode == OutputMode.incremental:
+            self._generate_incrementally(
+                teams, leaders, Path(output_path), workers, retry_policy,
+            )
+            return
+
+        if mode == OutputMode.packages:
+            self._generate_packages(teams, leaders, Path(output_path), workers, retry_policy)
+            return
+
+        if mode == OutputMode.combined:
+            self._generate_combined(
+                teams, leaders, Path(output_path), combine_by, workers, retry_policy,
+            )
+            return
+
+        if workers > 1 or retry_policy.is_enabled:
+            self._generate_in_parallel(
+                teams, leaders, Path(output_path), workers, retry_policy,
+            )
+            return
+
+        output_tree = OutputTree(
+            Path(output_path), self._cert_generator.OUTPUT_SUFFIX, partial=self._partial,
+        )
+        team_folders = [(team, output_tree.add_team(team)) for team in teams]
+        leader_folders = [
+            (leader, output_tree.add_leader(leader, leader_teams), leader_teams)
+            for leader, leader_teams in leaders
+        ]
+        output_tree.create(self._mkdir_threads)
 
         with self._cert_generator as cert_generator:
-            progress_bar = ProgressBar(20, len(teams))
+            with metrics.stage(
+                _STUDENTS_STAGE,
+                sum(len(team.members) for team in teams),
+                "Генерируем сертификаты участников",
+            ):
+                for batch in batched(team_folders, cert_generator.BATCH_SIZE):
+                    started = time.perf_counter()
+                    cert_generator.generate_students_certificates(batch)
+                    metrics.item(
+                        _STUDENTS_STAGE,
+                        batch[0][0].name,
+                        time.perf_counter() - started,
+                        count=sum(len(team.members) for team, _ in batch),
+                    )
 
-            for team in teams:
-                leaders_str = " ".join([str(leader.full_name) for leader in team.leaders])
-                leader_path = certs_folder_path / leaders_str
-                if not Path.exists(leader_path):
-                    Path.mkdir(leader_path)
+            with metrics.stage(
+                _APPRECIATIONS_STAGE,
+                len(leader_folders),
+                "Генерируем благодарности преподавателям",
+            ):
+                for leaders_batch in batched(leader_folders, cert_generator.BATCH_SIZE):
+                    started = time.perf_counter()
+                    cert_generator.generate_appreciation_certificates(leaders_batch)
+                    metrics.item(
+                        _APPRECIATIONS_STAGE,
+                        str(leaders_batch[0][0].full_name),
+                        time.perf_counter() - started,
+                        count=len(leaders_batch),
+                    )
 
-                team_path = leader_path / sanitize_string(team.name)
-                Path.mkdir(team_path)
+            metrics.message("Готово!")
 
-                cert_generator.generate_students_certificate(team, team_path)
+    def _generate_in_parallel(
+        self,
+        teams: list[Team],
+        leaders: list[tuple[Leader, list[Team]]],
+        output_path: Path,
+        workers: int,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        output_tree = OutputTree(
+            output_path, self._cert_generator.OUTPUT_SUFFIX, partial=self._partial,
+        )
+        tasks = [RenderTask(team, output_tree.add_team(team)) for team in teams]
+        tasks.extend(
+            RenderTask(leader, output_tree.add_leader(leader, leader_teams), leader_teams)
+            for leader, leader_teams in leaders
+        )
+        output_tree.create(self._mkdir_threads)
 
-                progress_bar.increase()
+        metrics = get_metrics()
+        with self._render_stage(
+            f"Генерируем сертификаты и благодарности в {workers} процессах", tasks,
+        ):
+            results = render_in_pool(self._cert_generator, tasks, workers, retry_policy)
+            for _ in self._track_results(results):
+                pass
 
-            progress_bar.flush()
+        metrics.message("Готово!")
 
-            appreciations_path = Path(output_path) / "Благодарности"
-            Path.mkdir(appreciations_path)
+    def _generate_pipelined(
+        self,
+        output_path: Path,
+        workers: int,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        output_tree = OutputTree(
+            output_path, self._cert_generator.OUTPUT_SUFFIX, partial=self._partial,
+        )
+        output_tree.create(self._mkdir_threads)
+
+        # Регистрация читается в фоновом потоке, пока уже считанные команды генерируются.
+        tasks = iterate_in_background(self._iter_tasks(output_tree), _PIPELINE_QUEUE_SIZE)
+
+        metrics = get_metrics()
+        # Количество заданий заранее неизвестно, поэтому выводится только число выполненных.
+        with self._render_stage(
+            "Генерируем сертификаты и благодарности по мере считывания регистрации",
+        ):
+            results = render_tasks(self._cert_generator, tasks, workers, retry_policy)
+            for _ in self._track_results(results):
+                pass
+
+        metrics.message("Готово!")
+
+    def _iter_tasks(self, output_tree: OutputTree) -> Iterator[RenderTask]:
+        """Возвращает задания на генерацию по мере считывания команд.
+
+        Папка каждой команды создается сразу после ее считывания.
+        Благодарности преподавателям возвращаются после всех команд: в письме
+        перечисляются все команды преподавателя, а они известны только к концу чтения.
+        """
+        leaders_index = LeadersIndex()
+        # Этап чтения идет параллельно с генерацией, поэтому в консоль не выводится.
+        with get_metrics().stage("read"):
+            for team in self._teams_data_extractor.iter_data():
+                # Неотобранные команды нужны только для списков команд в благодарностях.
+                if self._team_filter.accepts_team(team):
+                    team_path = output_tree.add_team(team)
+                    output_tree.create(self._mkdir_threads)
+                    yield RenderTask(team, team_path)
+                leaders_index.add_team(team)
+
+        leader_tasks = [
+            RenderTask(leader, output_tree.add_leader(leader, leader_teams), leader_teams)
+            for leader, leader_teams in self._select_leaders(leaders_index)
+        ]
+        output_tree.create(self._mkdir_threads)
+        yield from leader_tasks
+
+    def _generate_combined(
+        self,
+        teams: list[Team],
+        leaders: list[tuple[Leader, list[Team]]],
+        output_path: Path,
+        combine_by: CombineMode,
+        workers: int,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        # pymupdf нужен только для сборки общих файлов.
+        from utils.combined_pdf import CombinedPdfWriter
 
-            all_leaders: list[Leader] = []
-            for team_leaders in (team.leaders for team in teams):
-                all_leaders.extend(team_leaders)
+        # Документы собираются в общие файлы, поэтому нужны только корневые папки.
+        output_tree = OutputTree(output_path, self._cert_generator.OUTPUT_SUFFIX)
+        output_tree.create()
+        certs_folder_path = output_tree.certificates_path
+        appreciations_path = output_tree.appreciations_path
 
-            print("Генерируем благодарности преподавателям")
-            progress_bar = ProgressBar(20, len(all_leaders))
+        with tempfile.TemporaryDirectory() as temp_dir, ExitStack() as writers_stack:
+            # Документы рендерятся во временную папку на локальном диске и сразу
+            # переносятся в общий файл своей группы.
+            tasks: list[RenderTask] = []
+            combined_paths: dict[Path, Path] = {}
+            # Команды без участников пропускаются: страниц у них нет, а класс неизвестен.
+            batches: list[tuple[RenderTask, Path, Team]] = [
+                (RenderTask(team, certs_folder_path), certs_folder_path, team)
+                for team in teams
+                if team.members
+            ]
+            # Благодарность попадает в общий файл первой непустой команды преподавателя.
+            for leader, leader_teams in leaders:
+                batch_team = next((team for team in leader_teams if team.members), None)
+                if batch_team is not None:
+                    batches.append(
+                        (
+                            RenderTask(leader, appreciations_path, leader_teams),
+                            appreciations_path,
+                            batch_team,
+                        ),
+                    )
+            for task, folder_path, batch_team in batches:
+                task.output_directory = Path(temp_dir) / str(len(tasks))
+                Path.mkdir(task.output_directory)
+                tasks.append(task)
+                batch_name = self._get_batch_name(batch_team, combine_by)
+                combined_paths[task.output_directory] = folder_path / f"{batch_name}.pdf"
 
-            for leader in all_leaders:
-                leader_cert_path = appreciations_path
-                cert_generator.generate_appreciation_certificate(
-                    leader, leader_cert_path,
+            metrics = get_metrics()
+            writers: dict[Path, CombinedPdfWriter] = {}
+
+            with self._render_stage("Генерируем сертификаты и благодарности", tasks):
+                results = render_tasks(self._cert_generator, tasks, workers, retry_policy)
+                for result in self._track_results(results):
+                    if result.error is None:
+                        combined_path = combined_paths[result.task.output_directory]
+                        if combined_path not in writers:
+                            writers[combined_path] = writers_stack.enter_context(
+                                CombinedPdfWriter(combined_path),
+                            )
+                        with metrics.timed("combine.append", result.task.description):
+                            self._append_to_combined(
+                                writers[combined_path],
+                                result.task,
+                                self._cert_generator.OUTPUT_SUFFIX,
+                            )
+                    shutil.rmtree(result.task.output_directory)
+
+        metrics.message("Готово!")
+
+    def _generate_packages(
+        self,
+        teams: list[Team],
+        leaders: list[tuple[Leader, list[Team]]],
+        output_path: Path,
+        workers: int,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        suffix = self._cert_generator.OUTPUT_SUFFIX
+        # Папки только планируются: по ним именуются архивы и пути документов в них.
+        output_tree = OutputTree(output_path, suffix)
+        team_folders = [(team, output_tree.add_team(team)) for team in teams]
+        leader_folders = [
+            (leader, output_tree.add_leader(leader, leader_teams), leader_teams)
+            for leader, leader_teams in leaders
+        ]
+        packages_path = output_path / PACKAGES_FOLDER
+        Path.mkdir(packages_path, parents=True)
+
+        metrics = get_metrics()
+        with (
+            ExitStack() as temp_stack,
+            LeaderPackages(packages_path, output_tree.appreciations_path, suffix) as packages,
+        ):
+            if self._cert_generator.RENDERS_IN_MEMORY:
+                # Документы собираются в памяти и сразу записываются в архивы.
+                tasks = packages.plan(team_folders, leader_folders)
+                results = render_in_memory(self._cert_generator, tasks)
+            else:
+                # Документы генерируются во временную папку на локальном диске
+                # и сразу переносятся в архивы.
+                temp_dir = temp_stack.enter_context(tempfile.TemporaryDirectory())
+                tasks = packages.plan(team_folders, leader_folders, Path(temp_dir))
+                results = render_tasks(self._cert_generator, tasks, workers, retry_policy)
+            with self._render_stage("Генерируем документы и собираем архивы для рассылки", tasks):
+                for result in self._track_results(results):
+                    with metrics.timed("package.append", result.task.description):
+                        packages.add(result)
+
+        metrics.message("Готово!")
+
+    def _generate_incrementally(
+        self,
+        teams: list[Team],
+        leaders: list[tuple[Leader, list[Team]]],
+        output_path: Path,
+        workers: int,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        suffix = self._cert_generator.OUTPUT_SUFFIX
+        output_tree = OutputTree(output_path, suffix, exist_ok=True)
+        team_folders = [(team, output_tree.add_team(team)) for team in teams]
+        leader_folders = [
+            (leader, output_tree.add_leader(leader, leader_teams), leader_teams)
+            for leader, leader_teams in leaders
+        ]
+        output_tree.create(self._mkdir_threads)
+
+        manifest = GenerationManifest(output_path)
+        participation_hash = hash_file(self._cert_generator.participation_cert_template_path)
+        appreciation_hash = hash_file(self._cert_generator.appreciation_cert_template_path)
+
+        inputs_hashes: dict[Path, str] = {}
+        tasks: list[RenderTask] = []
+        for team, team_path in team_folders:
+            outdated_members: list[Student] = []
+            for student in team.members:
+                student_cert_path = team_path / f"{student.full_name}{suffix}"
+                inputs_hash = hash_inputs(
+                    participation_hash, get_student_replacements(team, student),
+                )
+                inputs_hashes[student_cert_path] = inputs_hash
+                if not manifest.is_up_to_date(student_cert_path, inputs_hash):
+                    outdated_members.append(student)
+            if outdated_members:
+                tasks.append(
+                    RenderTask(replace(team, members=tuple(outdated_members)), team_path),
+                )
+
+        for leader, leader_path, leader_teams in leader_folders:
+            leader_cert_path = leader_path / f"{leader.full_name}{suffix}"
+            inputs_hash = hash_inputs(
+                appreciation_hash, get_leader_replacements(leader, leader_teams),
+            )
+            inputs_hashes[leader_cert_path] = inputs_hash
+            if not manifest.is_up_to_date(leader_cert_path, inputs_hash):
+                tasks.append(RenderTask(leader, leader_path, leader_teams))
+
+        removed = manifest.remove_stale(inputs_hashes)
+        manifest.save()
+        metrics = get_metrics()
+        metrics.message(f"Удалено устаревших документов: {len(removed)}")
+
+        try:
+            with self._render_stage(
+                f"Генерируем измененные документы: {len(tasks)} заданий", tasks,
+            ):
+                results = render_tasks(self._cert_generator, tasks, workers, retry_policy)
+                for result in self._track_results(results):
+                    if result.error is None:
+                        for document_path in result.task.output_paths(suffix):
+                            manifest.update(document_path, inputs_hashes[document_path])
+        finally:
+            manifest.save()
+
+        metrics.message("Готово!")
+
+    def _generate_resumable(
+        self,
+        teams: list[Team],
+        leaders: list[tuple[Leader, list[Team]]],
+        output_path: Path,
+        workers: int,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        suffix = self._cert_generator.OUTPUT_SUFFIX
+        output_tree = OutputTree(output_path, suffix, exist_ok=True, partial=self._partial)
+        team_folders = [(team, output_tree.add_team(team)) for team in teams]
+        leader_folders = [
+            (leader, output_tree.add_leader(leader, leader_teams), leader_teams)
+            for leader, leader_teams in leaders
+        ]
+        output_tree.create(self._mkdir_threads)
+
+        with CheckpointJournal(output_path) as journal:
+            tasks: list[RenderTask] = []
+            for team, team_path in team_folders:
+                remaining_members = [
+                    student for student in team.members
+                    if not journal.is_done(team_path / f"{student.full_name}{suffix}")
+                ]
+                if remaining_members:
+                    tasks.append(
+                        RenderTask(replace(team, members=tuple(remaining_members)), team_path),
+                    )
+
+            for leader, leader_path, leader_teams in leader_folders:
+                if not journal.is_done(leader_path / f"{leader.full_name}{suffix}"):
+                    tasks.append(RenderTask(leader, leader_path, leader_teams))
+
+            metrics = get_metrics()
+            if len(journal):
+                metrics.message(f"Продолжаем генерацию, готовых документов: {len(journal)}")
+
+            with self._render_stage(
+                f"Генерируем оставшиеся документы: {len(tasks)} заданий", tasks,
+            ):
+                results = render_tasks(self._cert_generator, tasks, workers, retry_policy)
+                error_report_path = output_path / ERROR_REPORT_FILENAME
+                for result in self._track_results(results, error_report_path):
+                    if result.error is None:
+                        journal.record(result.task.output_paths(suffix))
+
+        metrics.message("Готово!")
+
+    def _select_leaders(self, leaders_index: LeadersIndex) -> list[tuple[Leader, list[Team]]]:
+        """Возвращает преподавателей, которым нужны благодарности, со всеми их командами.
+
+        Благодарности получают подходящие под фильтр преподаватели отобранных команд.
+
+        :leaders_index:
+        Индекс преподавателей всех команд регистрации, а не только отобранных.
+        """
+        return [
+            (leader, leader_teams)
+            for leader, leader_teams in leaders_index.items()
+            if self._team_filter.accepts_leader(leader)
+            and any(self._team_filter.accepts_team(team) for team in leader_teams)
+        ]
+
+    @staticmethod
+    @contextmanager
+    def _render_stage(title: str, tasks: Sequence[RenderTask] | None = None) -> Iterator[None]:
+        """Отмечает этап `render` и его части - генерацию сертификатов и благодарностей.
+
+        Части этапа выполняются одновременно, их прогресс выводится рядом.
+
+        :tasks:
+        Задания этапа, если они известны заранее, - для подсчета документов.
+        """
+        students_total = appreciations_total = None
+        if tasks is not None:
+            students_total = sum(
+                task.documents_count for task in tasks if isinstance(task.subject, Team)
+            )
+            appreciations_total = sum(
+                task.documents_count for task in tasks if not isinstance(task.subject, Team)
+            )
+
+        metrics = get_metrics()
+        with (
+            metrics.stage("render", title=title),
+            metrics.stage(_STUDENTS_STAGE, students_total, "Сертификаты"),
+            metrics.stage(_APPRECIATIONS_STAGE, appreciations_total, "Благодарности"),
+        ):
+            yield
+
+    def _track_results(
+        self,
+        results: Iterable[RenderResult],
+        error_report_path: Path | None = None,
+    ) -> Iterator[RenderResult]:
+        """Записывает документы заданий в части этапа `render` и передает результаты дальше.
+
+        Ошибки заданий выводятся сообщениями и не прерывают генерацию остальных.
+        Если хотя бы одно задание завершилось ошибкой, после всех заданий
+        выбрасывается `RuntimeError`.
+
+        :error_report_path:
+        Если задан, задания с ошибками записываются в этот файл (см. `write_error_report`),
+        а отчет прошлого запуска без ошибок удаляется.
+        """
+        metrics = get_metrics()
+        failed_results: list[RenderResult] = []
+        for result in results:
+            task = result.task
+            metrics.item(
+                _STUDENTS_STAGE if isinstance(task.subject, Team) else _APPRECIATIONS_STAGE,
+                task.description,
+                result.seconds,
+                result.error,
+                count=task.documents_count,
+            )
+            if result.error is not None:
+                failed_results.append(result)
+                metrics.message(result.error, level="error")
+            yield result
+
+        if error_report_path is not None:
+            if failed_results:
+                write_error_report(
+                    error_report_path, failed_results, self._cert_generator.OUTPUT_SUFFIX,
                 )
+            else:
+                error_report_path.unlink(missing_ok=True)
+
+        if failed_results:
+            msg = f"Не удалось сгенерировать документы для {len(failed_results)} заданий"
+            if error_report_path is not None:
+                msg += f", подробности в {error_report_path}"
+            raise RuntimeError(msg)
 
-                progress_bar.increase()
+    @staticmethod
+    def _append_to_combined(writer: CombinedPdfWriter, task: RenderTask, suffix: str) -> None:
+        subject = task.subject
+        if isinstance(subject, Team):
+            leaders_str = ", ".join(str(leader.full_name) for leader in subject.leaders)
+            writer.add_bookmark(f"{subject.name} ({leaders_str})")
+            for student in subject.members:
+                writer.add_bookmark(str(student.full_name), level=1)
+                writer.append(task.output_directory / f"{student.full_name}{suffix}")
+        else:
+            writer.add_bookmark(str(subject.full_name))
+            writer.append(task.output_directory / f"{subject.full_name}{suffix}")
 
-            progress_bar.flush()
-            print("Готово!")
+    @staticmethod
+    def _get_batch_name(team: Team, combine_by: CombineMode) -> str:
+        if combine_by == CombineMode.school:
+            return sanitize_string(team.school)
+        return f"{team.members[0].grade} класс"
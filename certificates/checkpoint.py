@@ -0,0 +1,88 @@
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Final, Self
+
+from .render_pool import RenderResult
+
+
+class CheckpointJournal:
+    """Журнал готовых документов, позволяющий продолжить прерванную генерацию.
+
+    Хранится в папке с результатами. Пути документов дописываются в журнал сразу
+    после выполнения каждого задания, поэтому при аварийном завершении программы
+    (в том числе при зависании и принудительном закрытии Word) теряется только
+    работа над заданиями, выполнявшимися в этот момент.
+    """
+
+    FILENAME: Final[str] = "checkpoint.jsonl"
+
+    def __init__(self, output_path: Path) -> None:
+        """Загружает журнал из папки с результатами, если он там есть.
+
+        :output_path:
+        Путь к папке с результатами генерации.
+        """
+        self._output_path = output_path
+        self._journal_path = output_path / self.FILENAME
+        self._done: set[str] = set()
+        if self._journal_path.exists():
+            with open(self._journal_path, encoding="utf-8") as journal:
+                for line in journal:
+                    # Последняя строка могла быть записана не полностью.
+                    try:
+                        self._done.add(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+
+    def __enter__(self) -> Self:
+        self._journal = open(self._journal_path, "a", encoding="utf-8")  # noqa: SIM115
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self._journal.close()
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def is_done(self, document_path: Path) -> bool:
+        """Проверяет, что документ уже был сгенерирован и не удален."""
+        return self._key(document_path) in self._done and document_path.is_file()
+
+    def record(self, document_paths: Iterable[Path]) -> None:
+        """Записывает в журнал готовые документы.
+
+        Запись сбрасывается на диск сразу, чтобы пережить аварийное завершение программы.
+        """
+        keys = [
+            key for key in map(self._key, document_paths) if key not in self._done
+        ]
+        self._done.update(keys)
+        self._journal.writelines(json.dumps(key, ensure_ascii=False) + "\n" for key in keys)
+        self._journal.flush()
+
+    def _key(self, document_path: Path) -> str:
+        return document_path.relative_to(self._output_path).as_posix()
+
+
+def write_error_report(report_path: Path, results: Iterable[RenderResult], suffix: str) -> None:
+    """Сохраняет отчет о заданиях, завершившихся ошибкой.
+
+    Для каждого задания в отчет попадают команда или преподаватель, документы,
+    которые не удалось создать, и текст ошибки.
+
+    :report_path:
+    Путь к файлу отчета.
+
+    :results:
+    Результаты заданий с ошибками.
+
+    :suffix:
+    Расширение файлов, создаваемых генератором сертификатов.
+    """
+    with open(report_path, "w", encoding="utf-8") as report:
+        for result in results:
+            report.write(f"Задание: {result.task.description}\n")
+            for document_path in result.task.output_paths(suffix):
+                report.write(f"  {document_path}\n")
+            report.write(f"{result.error}\n\n")
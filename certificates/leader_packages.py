@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import shutil
+import zipfile
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Self
+
+from .models import Leader, Team
+from .render_pool import RenderResult, RenderTask
+
+
+@dataclass
+class _Package:
+    """Архив одной папки преподавателей.
+
+    :remaining_tasks:
+    Сколько заданий, документы которых попадают в архив, еще не выполнено.
+
+    :pending_documents:
+    Благодарности, готовые раньше, чем архив был открыт: (путь к файлу
+    или содержимое документа, имя в архиве).
+    """
+
+    path: Path
+    remaining_tasks: int = 0
+    archive: zipfile.ZipFile | None = None
+    pending_documents: list[tuple[Path | bytes, str]] = field(default_factory=list)
+
+
+class LeaderPackages:
+    """ZIP-архивы для рассылки преподавателям: по одному на каждую папку преподавателей.
+
+    Архив содержит сертификаты команд из папки `Сертификаты/<преподаватели>`
+    и благодарности этим преподавателям с теми же именами папок и файлов,
+    что и при генерации в папки. Документы дописываются в архив сразу после
+    генерации и без сжатия: pdf и docx уже сжаты, повторное сжатие только тратит
+    время. Архив закрывается, как только в него записаны все его документы.
+
+    Документы, сгенерированные в памяти (см. `RenderResult.documents`), записываются
+    в архив напрямую. Временные папки нужны только генераторам, создающим файлы.
+    """
+
+    def __init__(self, packages_path: Path, appreciations_path: Path, suffix: str) -> None:
+        """Инициализирует набор архивов.
+
+        :packages_path:
+        Папка, в которую сохраняются архивы.
+
+        :appreciations_path:
+        Папка благодарностей в плане папок (см. `OutputTree`): пути благодарностей
+        внутри архива берутся относительно нее.
+
+        :suffix:
+        Расширение файлов, создаваемых генератором сертификатов.
+        """
+        self._packages_path = packages_path
+        self._appreciations_path = appreciations_path
+        self._suffix = suffix
+        self._packages: list[_Package] = []
+        # Архивы и папки в них, в которые попадают документы задания, по `id` задания.
+        self._targets: dict[int, list[tuple[_Package, PurePosixPath]]] = {}
+        # Сколько архивов еще ждут документ задания, прежде чем его папку можно удалить.
+        self._references: dict[Path, int] = {}
+        # Генерируются ли документы в памяти, без временных папок заданий.
+        self._in_memory = False
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        for package in self._packages:
+            self._close(package)
+
+    def plan(
+        self,
+        team_folders: Sequence[tuple[Team, Path]],
+        leader_folders: Sequence[tuple[Leader, Path, Sequence[Team]]],
+        temp_path: Path | None = None,
+    ) -> list[RenderTask]:
+        """Распределяет документы по архивам и возвращает задания на их генерацию.
+
+        Задания упорядочены по архивам: сначала команды архива, затем благодарности
+        его преподавателей, еще не попавшие в предыдущие архивы. Поэтому архивы
+        заполняются и закрываются по очереди, а не остаются открытыми до конца.
+
+        :team_folders:
+        Команды и папки их сертификатов по плану папок.
+
+        :leader_folders:
+        Преподаватели, папки их благодарностей по плану папок и их команды.
+
+        :temp_path:
+        Папка на локальном диске, в которой документы генерируются до записи в архив.
+        Не нужна, если документы генерируются в памяти: тогда папки заданий
+        не создаются, а их пути совпадают с путями по плану папок.
+        """
+        packages: dict[Path, _Package] = {}
+        package_tasks: defaultdict[Path, list[RenderTask]] = defaultdict(list)
+        targets: dict[int, list[tuple[_Package, PurePosixPath]]] = {}
+        team_package_folders: dict[int, Path] = {}
+
+        for team, team_path in team_folders:
+            package_folder = team_path.parent
+            if package_folder not in packages:
+                packages[package_folder] = _Package(
+                    self._packages_path / f"{package_folder.name}.zip",
+                )
+            task = RenderTask(team, team_path)
+            package_tasks[package_folder].append(task)
+            team_package_folders[id(team)] = package_folder
+            targets[id(task)] = [
+                (packages[package_folder], PurePosixPath(team_path.relative_to(package_folder))),
+            ]
+
+        for leader, leader_path, leader_teams in leader_folders:
+            package_folders = list(
+                dict.fromkeys(team_package_folders[id(team)] for team in leader_teams),
+            )
+            task = RenderTask(leader, leader_path, list(leader_teams))
+            # Благодарность генерируется вместе с первым архивом, в который попадает.
+            package_tasks[package_folders[0]].append(task)
+            folder = PurePosixPath(leader_path.relative_to(self._appreciations_path))
+            targets[id(task)] = [
+                (packages[package_folder], folder) for package_folder in package_folders
+            ]
+
+        self._packages = list(packages.values())
+        self._in_memory = temp_path is None
+        tasks = [task for folder_tasks in package_tasks.values() for task in folder_tasks]
+        for idx, task in enumerate(tasks):
+            if temp_path is not None:
+                task.output_directory = temp_path / str(idx)
+                Path.mkdir(task.output_directory)
+            self._targets[id(task)] = targets[id(task)]
+            for package, _ in targets[id(task)]:
+                package.remaining_tasks += 1
+        return tasks
+
+    def add(self, result: RenderResult) -> None:
+        """Записывает документы выполненного задания в его архивы.
+
+        Документы задания, завершившегося ошибкой, в архивы не попадают. Папка,
+        в которой задание создало документы, удаляется, как только документы
+        записаны во все архивы.
+        """
+        task = result.task
+        documents: list[tuple[str, Path | bytes]] = []
+        if result.documents is not None:
+            documents = list(result.documents.items())
+        elif result.error is None:
+            # Одноименные участники одной команды получают один общий сертификат.
+            documents = [
+                (path.name, path) for path in dict.fromkeys(task.output_paths(self._suffix))
+            ]
+
+        references = 0
+        for package, folder in self._targets.pop(id(task)):
+            entries = [(document, str(folder / name)) for name, document in documents]
+            # Архив открывается вместе с первой своей командой: благодарность,
+            # готовая раньше, ждет его, чтобы не держать открытыми все архивы сразу.
+            if package.archive is None and isinstance(task.subject, Team):
+                self._open(package)
+            if package.archive is not None:
+                self._write(package, entries)
+            elif entries:
+                package.pending_documents.extend(entries)
+                references += 1
+
+            package.remaining_tasks -= 1
+            if package.remaining_tasks == 0:
+                self._close(package)
+
+        if self._in_memory:
+            return
+        if references:
+            self._references[task.output_directory] = references
+        else:
+            shutil.rmtree(task.output_directory)
+
+    def _open(self, package: _Package) -> None:
+        package.archive = zipfile.ZipFile(package.path, "w", zipfile.ZIP_STORED)
+        pending_documents, package.pending_documents = package.pending_documents, []
+        self._write(package, pending_documents)
+        for document_path in dict.fromkeys(
+            document for document, _ in pending_documents if isinstance(document, Path)
+        ):
+            task_directory = document_path.parent
+            self._references[task_directory] -= 1
+            if self._references[task_directory] == 0:
+                del self._references[task_directory]
+                shutil.rmtree(task_directory)
+
+    @staticmethod
+    def _write(package: _Package, entries: list[tuple[Path | bytes, str]]) -> None:
+        for document, name in entries:
+            if isinstance(document, Path):
+                package.archive.write(document, name)
+            else:
+                package.archive.writestr(name, document)
+
+    @staticmethod
+    def _close(package: _Package) -> None:
+        if package.archive is not None:
+            package.archive.close()
+            package.archive = None
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from .models import Leader, Team
+
+LeaderKey = tuple[str, str]
+
+
+def get_leader_key(leader: Leader, school: str) -> LeaderKey:
+    """Возвращает ключ, по которому преподаватели разных команд считаются одним человеком.
+
+    ФИО и школа сравниваются без учета регистра, лишних пробелов и различия `е`/`ё`.
+
+    :leader:
+    Преподаватель команды.
+
+    :school:
+    Школа команды, которую ведет преподаватель.
+    """
+    return normalize_name(str(leader.full_name)), normalize_name(school)
+
+
+def normalize_name(text: str) -> str:
+    """Приводит строку к виду для сравнения: без регистра, лишних пробелов и `ё`."""
+    return " ".join(text.casefold().replace("ё", "е").split())
+
+
+class LeadersIndex:
+    """Уникальные преподаватели и команды, которые ведет каждый из них.
+
+    Преподаватель, ведущий несколько команд одной школы, записан в регистрации
+    у каждой из них, но в индекс попадает один раз - в том виде, в котором
+    встретился впервые.
+    """
+
+    def __init__(self) -> None:
+        self._leaders: dict[LeaderKey, Leader] = {}
+        self._teams: dict[LeaderKey, list[Team]] = {}
+
+    @classmethod
+    def from_teams(cls, teams: Iterable[Team]) -> LeadersIndex:
+        """Строит индекс преподавателей переданных команд."""
+        index = cls()
+        for team in teams:
+            index.add_team(team)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._leaders)
+
+    def add_team(self, team: Team) -> list[Leader]:
+        """Добавляет команду в индекс.
+
+        Возвращает преподавателей команды, которые до этого в индексе не встречались.
+        """
+        new_leaders: list[Leader] = []
+        for leader in team.leaders:
+            key = get_leader_key(leader, team.school)
+            if key not in self._leaders:
+                self._leaders[key] = leader
+                self._teams[key] = []
+                new_leaders.append(leader)
+            # Один преподаватель может быть записан у команды дважды.
+            leader_teams = self._teams[key]
+            if not leader_teams or leader_teams[-1] is not team:
+                leader_teams.append(team)
+        return new_leaders
+
+    def items(self) -> list[tuple[Leader, list[Team]]]:
+        """Возвращает пары (преподаватель, его команды) в порядке появления преподавателей."""
+        return [(self._leaders[key], self._teams[key]) for key in self._leaders]
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Final
+
+from .services.pdf_generator import TextReplacements
+
+
+class GenerationManifest:
+    """Манифест сгенерированных документов: путь документа -> хэш входных данных.
+
+    Хранится в папке с результатами и позволяет при повторном запуске генерировать
+    только документы, входные данные или шаблон которых изменились.
+    """
+
+    FILENAME: Final[str] = "manifest.json"
+
+    def __init__(self, output_path: Path) -> None:
+        """Загружает манифест из папки с результатами, если он там есть.
+
+        :output_path:
+        Путь к папке с результатами генерации.
+        """
+        self._output_path = output_path
+        self._manifest_path = output_path / self.FILENAME
+        self._entries: dict[str, str] = {}
+        if self._manifest_path.exists():
+            self._entries = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+
+    def is_up_to_date(self, document_path: Path, inputs_hash: str) -> bool:
+        """Проверяет, что документ существует и создан из тех же входных данных."""
+        return (
+            self._entries.get(self._key(document_path)) == inputs_hash
+            and document_path.exists()
+        )
+
+    def update(self, document_path: Path, inputs_hash: str) -> None:
+        """Запоминает хэш входных данных, из которых создан документ."""
+        self._entries[self._key(document_path)] = inputs_hash
+
+    def remove_stale(self, actual_paths: Iterable[Path]) -> list[Path]:
+        """Удаляет документы из манифеста, которых нет среди актуальных.
+
+        Вместе с документами удаляются опустевшие после этого папки.
+        Файлы, которые не записаны в манифест, не трогаются.
+
+        :actual_paths:
+        Пути документов, которые должны остаться после генерации.
+        """
+        actual_keys = {self._key(path) for path in actual_paths}
+        removed: list[Path] = []
+
+        for key in self._entries.keys() - actual_keys:
+            del self._entries[key]
+            document_path = self._output_path / key
+            if not document_path.exists():
+                continue
+            document_path.unlink()
+            removed.append(document_path)
+
+            parent = document_path.parent
+            while parent != self._output_path and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+
+        return removed
+
+    def save(self) -> None:
+        """Сохраняет манифест, не оставляя поврежденного файла при сбое записи."""
+        temp_path = self._manifest_path.with_suffix(".tmp")
+        temp_path.write_text(
+            json.dumps(self._entries, ensure_ascii=False, indent=0, sort_keys=True),
+            encoding="utf-8",
+        )
+        os.replace(temp_path, self._manifest_path)
+
+    def _key(self, document_path: Path) -> str:
+        return document_path.relative_to(self._output_path).as_posix()
+
+
+def hash_inputs(template_hash: str, replacements: Mapping[TextReplacements, str]) -> str:
+    """Возвращает хэш входных данных документа: шаблона и значений подстановок."""
+    inputs = json.dumps(
+        [template_hash, sorted(replacements.items())], ensure_ascii=False,
+    )
+    return hashlib.sha256(inputs.encode("utf-8")).hexdigest()
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass
 from enum import Enum
-from typing import Final
+from typing import ClassVar
 
 from utils.strings import sanitize_string
 
@@ -11,7 +12,9 @@ class Gender(Enum):
     male = 0
     female = 1
 
-@dataclass
+# Участников в крупных регистрациях сотни тысяч, поэтому модели неизменяемые
+# и без `__dict__`: так объекты занимают в несколько раз меньше памяти.
+@dataclass(frozen=True, slots=True)
 class FullName:
     last_name: str
     first_name: str
@@ -28,7 +31,8 @@ class FullName:
                    "Ожидалось: `Фамилия Имя [Отчество]`")
             raise ValueError(msg)
 
-        return cls(*full_name_parts)
+        # Имена и отчества часто повторяются, одинаковые строки хранятся один раз.
+        return cls(*map(sys.intern, full_name_parts))
 
     def __str__(self) -> str:
         """Возваращает ФИО в виде строки формата `Фамилия Имя Отчество`."""
@@ -37,23 +41,23 @@ class FullName:
             full_name_line += " " + self.patronymic
         return full_name_line
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Person:
     full_name: FullName
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Student(Person):
     grade: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Leader(Person):
     gender: Gender = Gender.male
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Team:
     name: str
     school: str
     city: str
-    members: list[Student]
-    leaders: list[Leader]
-    MEMBERS_PER_TEAM: Final[int] = 6
+    members: tuple[Student, ...]
+    leaders: tuple[Leader, ...]
+    MEMBERS_PER_TEAM: ClassVar[int] = 6
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+from utils.metrics import get_metrics
+from utils.strings import sanitize_string
+
+from .leaders import LeaderKey, get_leader_key
+from .models import Leader, Team
+
+CERTIFICATES_FOLDER: Final[str] = "Сертификаты"
+APPRECIATIONS_FOLDER: Final[str] = "Благодарности"
+PACKAGES_FOLDER: Final[str] = "Пакеты"
+
+# Без включенной поддержки длинных путей Windows (и Word) не открывают файлы,
+# путь к которым длиннее 259 символов.
+MAX_PATH_LENGTH: Final[int] = 259 if sys.platform == "win32" else 4095
+# Ограничение длины имени одной папки или файла в большинстве файловых систем.
+MAX_NAME_LENGTH: Final[int] = 255
+# Сколько слишком длинных путей перечислять в сообщении об ошибке.
+_REPORTED_PATHS_COUNT: Final[int] = 5
+
+
+class OutputTree:
+    """План папок с результатами генерации.
+
+    Пути папок команд и благодарностей вычисляются заранее, без обращений
+    к файловой системе, а сами папки создаются одним проходом в `create`.
+    Для сетевых дисков, где каждое обращение - отдельный запрос к серверу,
+    это заметно быстрее, чем проверять и создавать папки по ходу генерации.
+
+    При планировании разрешаются совпадения имен:
+    - одноименные команды одних преподавателей получают папки с номерами `(2)`, `(3)`...;
+    - благодарности однофамильцев из разных школ сохраняются в подпапки их школ.
+
+    Имена сравниваются без учета регистра, как в файловой системе Windows.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        suffix: str,
+        exist_ok: bool = False,
+        partial: bool = False,
+    ) -> None:
+        """Инициализирует план с папками сертификатов и благодарностей.
+
+        :output_path:
+        Путь к папке с результатами генерации.
+
+        :suffix:
+        Расширение файлов, создаваемых генератором сертификатов.
+
+        :exist_ok:
+        Не считать ошибкой папки, оставшиеся от предыдущего запуска.
+
+        :partial:
+        В план попадет только часть команд, а папки остальных остались от полной
+        генерации, например при перепечатке одной школы. Совпадения имен тогда
+        разрешаются по уже существующим документам, чтобы каждый документ попал
+        на свое прежнее место. Подразумевает `exist_ok`.
+        """
+        self.certificates_path = output_path / CERTIFICATES_FOLDER
+        self.appreciations_path = output_path / APPRECIATIONS_FOLDER
+        self._suffix = suffix
+        self._exist_ok = exist_ok or partial
+        self._partial = partial
+
+        self._pending: list[Path] = [self.certificates_path, self.appreciations_path]
+        self._leader_folders: dict[tuple[Leader, ...], Path] = {}
+        self._children: defaultdict[Path, set[str]] = defaultdict(set)
+        self._appreciation_owners: dict[str, LeaderKey] = {}
+        self._too_long_paths: list[Path] = []
+
+    def add_team(self, team: Team) -> Path:
+        """Планирует папку для сертификатов участников команды и возвращает ее путь."""
+        leader_folder = self._leader_folders.get(team.leaders)
+        if leader_folder is None:
+            leaders_str = " ".join([str(leader.full_name) for leader in team.leaders])
+            leader_folder = self._add_folder(self.certificates_path, sanitize_string(leaders_str))
+            self._leader_folders[team.leaders] = leader_folder
+
+        team_name = sanitize_string(team.name)
+        if self._partial:
+            team_path = self._add_existing_team_folder(leader_folder, team_name, team)
+        else:
+            team_path = self._add_folder(leader_folder, team_name, unique=True)
+        file_names = self._children[team_path]
+        for student in team.members:
+            file_name = f"{student.full_name}{self._suffix}"
+            if file_name.casefold() in file_names:
+                get_metrics().message(
+                    f"В команде {team.name} несколько участников {student.full_name}, "
+                    "сертификат будет создан один",
+                    "warning",
+                )
+            file_names.add(file_name.casefold())
+            self._check_length(team_path / file_name)
+        return team_path
+
+    def add_leader(self, leader: Leader, teams: Sequence[Team]) -> Path:
+        """Планирует папку для благодарности преподавателю и возвращает ее путь.
+
+        :teams:
+        Команды преподавателя: по школе первой из них различаются однофамильцы.
+        """
+        school = teams[0].school if teams else ""
+        file_name = f"{leader.full_name}{self._suffix}"
+        key = get_leader_key(leader, school)
+        folder = self.appreciations_path
+        school_folder = sanitize_string(str(school))
+        owner = self._appreciation_owners.get(file_name.casefold())
+        # При перепечатке благодарность, сохраненная полной генерацией в папку школы,
+        # остается там: общую папку занял однофамилец, который сейчас не отобран.
+        if owner is None and not (
+            self._partial and (folder / school_folder / file_name).is_file()
+        ):
+            owner = self._appreciation_owners[file_name.casefold()] = key
+        if owner != key:
+            folder = self._add_folder(folder, school_folder)
+        self._check_length(folder / file_name)
+        return folder
+
+    def create(self, threads: int = 1) -> None:
+        """Создает запланированные папки, которые еще не были созданы.
+
+        Папки создаются по уровням вложенности, без предварительных проверок
+        существования. Перед созданием проверяется длина путей всех документов.
+
+        :threads:
+        Сколько папок одного уровня создавать параллельно. Для сетевых дисков
+        несколько потоков скрывают задержку каждого запроса.
+        """
+        if self._too_long_paths:
+            paths = "\n".join(map(str, self._too_long_paths[:_REPORTED_PATHS_COUNT]))
+            msg = (
+                f"Пути {len(self._too_long_paths)} документов длиннее {MAX_PATH_LENGTH} "
+                f"символов или содержат имена длиннее {MAX_NAME_LENGTH} символов:\n{paths}"
+            )
+            raise ValueError(msg)
+
+        levels: defaultdict[int, list[Path]] = defaultdict(list)
+        for folder_path in self._pending:
+            levels[len(folder_path.parts)].append(folder_path)
+        pending_count = len(self._pending)
+        self._pending.clear()
+
+        started = time.perf_counter()
+        if threads > 1:
+            with ThreadPoolExecutor(threads) as executor:
+                for _, level in sorted(levels.items()):
+                    # `list` дожидается создания всех папок уровня и пробрасывает ошибки.
+                    list(executor.map(self._make_folder, level))
+        else:
+            for _, level in sorted(levels.items()):
+                for folder_path in level:
+                    self._make_folder(folder_path)
+        get_metrics().item("mkdir", None, time.perf_counter() - started, count=pending_count)
+
+    def _add_folder(self, parent_path: Path, name: str, unique: bool = False) -> Path:
+        siblings = self._children[parent_path]
+        folder_name = name
+        if unique:
+            copy_idx = 1
+            while folder_name.casefold() in siblings:
+                copy_idx += 1
+                folder_name = f"{name} ({copy_idx})"
+        folder_path = parent_path / folder_name
+        if folder_name.casefold() not in siblings:
+            siblings.add(folder_name.casefold())
+            self._pending.append(folder_path)
+        return folder_path
+
+    def _add_existing_team_folder(self, leader_folder: Path, name: str, team: Team) -> Path:
+        # Номер одноименной команды зависит от того, какие команды шли раньше при полной
+        # генерации, поэтому ищется папка с документами этой команды или свободное имя.
+        siblings = self._children[leader_folder]
+        folder_name = name
+        copy_idx = 1
+        while True:
+            folder_path = leader_folder / folder_name
+            if folder_name.casefold() not in siblings and (
+                not folder_path.is_dir() or self._contains_team(folder_path, team)
+            ):
+                break
+            copy_idx += 1
+            folder_name = f"{name} ({copy_idx})"
+        siblings.add(folder_name.casefold())
+        self._pending.append(folder_path)
+        return folder_path
+
+    def _contains_team(self, folder_path: Path, team: Team) -> bool:
+        return not team.members or any(
+            (folder_path / f"{student.full_name}{self._suffix}").is_file()
+            for student in team.members
+        )
+
+    def _check_length(self, document_path: Path) -> None:
+        if len(str(document_path.absolute())) > MAX_PATH_LENGTH or any(
+            len(part) > MAX_NAME_LENGTH for part in document_path.parts
+        ):
+            self._too_long_paths.append(document_path)
+
+    def _make_folder(self, folder_path: Path) -> None:
+        Path.mkdir(folder_path, exist_ok=self._exist_ok)
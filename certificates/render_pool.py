@@ -0,0 +1,602 @@
+import collections
+import multiprocessing
+import multiprocessing.connection
+import queue
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+from typing import Final
+
+from utils.iterables import batched
+from utils.metrics import Metrics, get_metrics, set_metrics
+
+from .models import Leader, Team
+from .services.pdf_generator import CertificateGenerator
+
+# Как часто главный процесс проверяет время выполнения заданий, пока ждет результатов.
+_WORKERS_POLL_INTERVAL = 1.0
+
+
+class _MessageKind(StrEnum):
+    """Вид сообщения, которое процесс-обработчик передает главному процессу."""
+
+    result = "result"
+    event = "event"
+    startup_error = "startup_error"
+
+
+# Сколько пакетов заданий на каждый процесс может ждать в очереди.
+_QUEUED_BATCHES_PER_WORKER = 4
+
+
+@dataclass
+class RenderTask:
+    """Задание на генерацию сертификатов команды или благодарности преподавателю.
+
+    :subject:
+    Команда или преподаватель.
+
+    :output_directory:
+    Папка, в которую сохраняются документы.
+
+    :teams:
+    Для преподавателя - команды, которые он ведет.
+    """
+
+    subject: Team | Leader
+    output_directory: Path
+    teams: list[Team] = field(default_factory=list)
+
+    def run(self, cert_generator: CertificateGenerator) -> None:
+        """Выполняет задание с помощью переданного генератора сертификатов."""
+        if isinstance(self.subject, Team):
+            cert_generator.generate_students_certificate(
+                self.subject, self.output_directory,
+            )
+        else:
+            cert_generator.generate_appreciation_certificate(
+                self.subject, self.output_directory, self.teams,
+            )
+
+    def render(self, cert_generator: CertificateGenerator) -> dict[str, bytes]:
+        """Выполняет задание, не записывая документы в файлы, и возвращает их содержимое.
+
+        Генератор должен уметь генерировать документы в памяти (см. `RENDERS_IN_MEMORY`).
+        """
+        if isinstance(self.subject, Team):
+            return cert_generator.render_students_certificates(self.subject)
+        return {
+            f"{self.subject.full_name}{cert_generator.OUTPUT_SUFFIX}": (
+                cert_generator.render_appreciation_certificate(self.subject, self.teams)
+            ),
+        }
+
+    @property
+    def description(self) -> str:
+        """Название команды или ФИО преподавателя - для сообщений и метрик."""
+        if isinstance(self.subject, Team):
+            return self.subject.name
+        return str(self.subject.full_name)
+
+    @property
+    def documents_count(self) -> int:
+        """Сколько документов создает задание."""
+        if isinstance(self.subject, Team):
+            return len(self.subject.members)
+        return 1
+
+    def output_paths(self, suffix: str) -> list[Path]:
+        """Возвращает пути документов, которые создает задание.
+
+        :suffix:
+        Расширение файлов, создаваемых генератором сертификатов.
+        """
+        if isinstance(self.subject, Team):
+            return [
+                self.output_directory / f"{student.full_name}{suffix}"
+                for student in self.subject.members
+            ]
+        return [self.output_directory / f"{self.subject.full_name}{suffix}"]
+
+
+@dataclass
+class RenderResult:
+    """Результат выполнения задания на генерацию.
+
+    :task:
+    Выполненное задание.
+
+    :error:
+    Текст трассировки исключения, если задание завершилось ошибкой.
+
+    :seconds:
+    Время выполнения задания. Для заданий, выполненных одним пакетом,
+    время пакета делится между ними поровну.
+
+    :documents:
+    Содержимое документов по именам файлов, если задание выполнено в памяти
+    (см. `render_in_memory`), иначе документы записаны в папку задания.
+    """
+
+    task: RenderTask
+    error: str | None = None
+    seconds: float = 0.0
+    documents: dict[str, bytes] | None = None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Повторы заданий, завершившихся ошибкой, и ограничение времени их выполнения.
+
+    :attempts:
+    Сколько раз всего выполнять задание, прежде чем вернуть его с ошибкой.
+    Перед повтором процесс-обработчик перезапускает генератор сертификатов:
+    после сбоя Word или LibreOffice часто остаются в неработоспособном состоянии.
+
+    :timeout:
+    Сколько секунд может выполняться одно задание. Процесс, не уложившийся в срок
+    (например, из-за зависшего Word), завершается и заменяется новым.
+    """
+
+    attempts: int = 1
+    timeout: float | None = None
+
+    @property
+    def is_enabled(self) -> bool:
+        """Заданы ли повторы или ограничение времени."""
+        return self.attempts > 1 or self.timeout is not None
+
+
+# Без повторов и ограничения времени - значение по умолчанию для параметров-политик.
+NO_RETRIES: Final[RetryPolicy] = RetryPolicy()
+
+
+def render_tasks(
+    cert_generator: CertificateGenerator,
+    tasks: Iterable[RenderTask],
+    workers: int,
+    retry_policy: RetryPolicy = NO_RETRIES,
+) -> Iterator[RenderResult]:
+    """Выполняет задания и возвращает результаты по мере готовности.
+
+    При `workers > 1`, а также при заданных повторах или ограничении времени задания
+    выполняются в пуле процессов (см. `render_in_pool`), иначе - последовательно
+    в текущем процессе с тем же способом передачи ошибок. Задания могут поступать
+    постепенно, например из генератора, читающего регистрацию.
+    Задания передаются генератору пакетами по `CertificateGenerator.BATCH_SIZE`.
+    """
+    if workers > 1 or retry_policy.is_enabled:
+        yield from render_in_pool(cert_generator, tasks, workers, retry_policy)
+        return
+
+    with cert_generator:
+        for batch in batched(tasks, cert_generator.BATCH_SIZE):
+            outcomes = _run_batch(cert_generator, batch)
+            for task, (error, seconds) in zip(batch, outcomes, strict=True):
+                yield RenderResult(task, error, seconds)
+
+
+def render_in_memory(
+    cert_generator: CertificateGenerator,
+    tasks: Iterable[RenderTask],
+) -> Iterator[RenderResult]:
+    """Выполняет задания в текущем процессе, не записывая документы в файлы.
+
+    Документы возвращаются в `RenderResult.documents`, ошибки - так же, как
+    в `render_tasks`. Генератор должен уметь генерировать документы в памяти
+    (см. `RENDERS_IN_MEMORY`).
+    """
+    with cert_generator:
+        for task in tasks:
+            started = time.perf_counter()
+            try:
+                documents = task.render(cert_generator)
+            except Exception:
+                yield RenderResult(task, traceback.format_exc(), time.perf_counter() - started)
+            else:
+                yield RenderResult(task, None, time.perf_counter() - started, documents)
+
+
+def render_in_pool(
+    cert_generator: CertificateGenerator,
+    tasks: Iterable[RenderTask],
+    workers: int,
+    retry_policy: RetryPolicy = NO_RETRIES,
+) -> Iterator[RenderResult]:
+    """Выполняет задания в пуле процессов и возвращает результаты по мере готовности.
+
+    Каждый процесс создает собственную копию `cert_generator` и входит в ее контекст
+    один раз, после чего получает пакеты заданий, пока они не закончатся.
+    Ошибки отдельных заданий не прерывают работу пула, а возвращаются в результатах.
+    События метрик из процессов (см. `utils.metrics`) передаются в сборщик
+    главного процесса.
+
+    Задания считываются из `tasks` отдельным потоком по мере их появления, пакетами
+    по `CertificateGenerator.BATCH_SIZE`, так что процессы начинают работу,
+    не дожидаясь остальных заданий. Пакеты раздает процессам главный процесс,
+    поэтому он знает, какие задания выполняет каждый процесс: если процесс
+    аварийно завершился или не уложился в `retry_policy.timeout`, его задания
+    повторяются, а сам процесс заменяется новым.
+
+    :cert_generator:
+    Генератор сертификатов, копия которого передается в каждый процесс.
+    Контекст генератора в главном процессе не открывается.
+
+    :tasks:
+    Задания на генерацию.
+
+    :workers:
+    Количество процессов.
+
+    :retry_policy:
+    Повторы заданий, завершившихся ошибкой, и ограничение времени их выполнения.
+    """
+    batches_queue: queue.Queue[list[tuple[int, RenderTask]]] = queue.Queue(
+        workers * _QUEUED_BATCHES_PER_WORKER,
+    )
+    # Через этот канал поток, считывающий задания, будит главный процесс,
+    # если тот ждет результатов при свободных процессах.
+    wake_reader, wake_writer = multiprocessing.Pipe(duplex=False)
+
+    def start_worker() -> _WorkerHandle:
+        return _WorkerHandle(cert_generator, restart_on_error=retry_policy.attempts > 1)
+
+    handles = [start_worker() for _ in range(workers)]
+
+    pending: dict[int, RenderTask] = {}
+    attempts: collections.Counter[int] = collections.Counter()
+    # Пакеты, которые нужно раздать процессам раньше новых: повторы и задания процессов,
+    # которые не смогли запуститься.
+    backlog: collections.deque[list[tuple[int, RenderTask]]] = collections.deque()
+    feeding_done = threading.Event()
+    workers_lost = threading.Event()
+    feeding_errors: list[Exception] = []
+
+    def feed() -> None:
+        try:
+            for batch in batched(enumerate(tasks), cert_generator.BATCH_SIZE):
+                # Задания запоминаются до отправки: результат может прийти сразу.
+                pending.update(batch)
+                while not workers_lost.is_set():
+                    try:
+                        batches_queue.put(batch, timeout=_WORKERS_POLL_INTERVAL)
+                    except queue.Full:
+                        continue
+                    wake_writer.send(None)
+                    break
+        except Exception as error:
+            feeding_errors.append(error)
+        finally:
+            feeding_done.set()
+            wake_writer.send(None)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    metrics = get_metrics()
+
+    def fail_or_retry(task_idx: int, error: str, seconds: float = 0.0) -> RenderResult | None:
+        """Возвращает задание в очередь, если попытки не исчерпаны, иначе - результат."""
+        if task_idx not in pending:
+            return None
+        attempts[task_idx] += 1
+        if attempts[task_idx] < retry_policy.attempts:
+            metrics.message(
+                f"Повтор задания {pending[task_idx].description} "
+                f"(попытка {attempts[task_idx] + 1} из {retry_policy.attempts})",
+                level="warning",
+            )
+            backlog.append([(task_idx, pending[task_idx])])
+            return None
+        return RenderResult(pending.pop(task_idx), error, seconds)
+
+    startup_errors: list[str] = []
+    completed = False
+    try:
+        while pending or not feeding_done.is_set():
+            for handle in handles:
+                while handle.is_available:
+                    if backlog:
+                        handle.send(backlog.popleft())
+                        continue
+                    try:
+                        handle.send(batches_queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+            connections = {
+                handle.connection: handle for handle in handles if handle.is_connected
+            }
+            for connection in multiprocessing.connection.wait(
+                [*connections, wake_reader], timeout=_WORKERS_POLL_INTERVAL,
+            ):
+                if connection is wake_reader:
+                    # Новые пакеты раздаются процессам в начале следующей итерации.
+                    while wake_reader.poll():
+                        wake_reader.recv()
+                    continue
+
+                # Сообщения процесса дочитываются сразу, чтобы не ждать их по одному.
+                handle = connections[connection]
+                while (message := handle.receive()) is not None:
+                    kind, *payload = message
+                    match kind:
+                        case _MessageKind.event:
+                            metrics.emit(*payload)
+                        case _MessageKind.startup_error:
+                            startup_errors.extend(payload)
+                        case _MessageKind.result:
+                            task_idx, error, seconds = payload
+                            handle.complete(task_idx)
+                            if error is None and task_idx in pending:
+                                yield RenderResult(pending.pop(task_idx), None, seconds)
+                            elif error is not None:
+                                result = fail_or_retry(task_idx, error, seconds)
+                                if result is not None:
+                                    yield result
+                    if not handle.is_connected or not connection.poll():
+                        break
+
+            for slot, handle in enumerate(handles):
+                if handle.is_timed_out(retry_policy.timeout):
+                    handle.terminate()
+                    error = f"Задание не выполнено за {retry_policy.timeout} с"
+                elif handle.is_connected or (
+                    handle.startup_error is not None and not handle.has_batches
+                ):
+                    continue
+                else:
+                    error = handle.startup_error or "Процесс-обработчик аварийно завершился"
+
+                # Если процесс аварийно завершился или завис, текущий пакет считается
+                # неудачной попыткой, а процесс заменяется новым, даже если заданий у него
+                # не было, - иначе пул молча продолжил бы работу с меньшим числом процессов.
+                # Процесс, в котором не запустился генератор, не заменяется: новый
+                # не запустится точно так же. Остальные переданные процессу пакеты
+                # просто раздаются заново.
+                can_restart = handle.startup_error is None
+                batches = handle.take_batches()
+                if can_restart and batches:
+                    for task_idx in batches.pop(0):
+                        if (result := fail_or_retry(task_idx, error)) is not None:
+                            yield result
+                backlog.extend(
+                    [(task_idx, pending[task_idx]) for task_idx in batch if task_idx in pending]
+                    for batch in batches
+                )
+                if can_restart:
+                    metrics.message("Процесс-обработчик перезапускается", level="warning")
+                    handles[slot] = start_worker()
+
+            if not any(handle.is_connected for handle in handles):
+                break
+
+        # Все процессы завершились, не выполнив часть заданий (например, не запустился Word).
+        # Оставшиеся задания дочитываются и тоже возвращаются с ошибкой.
+        workers_lost.set()
+        feeder.join()
+        error = "\n".join(startup_errors) or "Процесс-обработчик аварийно завершился"
+        for task_idx in sorted(pending):
+            yield RenderResult(pending.pop(task_idx), error)
+
+        completed = True
+        if feeding_errors:
+            raise feeding_errors[0]
+    finally:
+        workers_lost.set()
+        for handle in handles:
+            if completed:
+                handle.stop()
+            else:
+                handle.terminate()
+
+
+class _WorkerHandle:
+    """Процесс-обработчик и пакеты заданий, переданные ему, но еще не выполненные.
+
+    Сообщения процесс отправляет через собственный канал, а не через общую очередь:
+    процесс, завершенный посреди отправки, может навсегда заблокировать общую
+    очередь для остальных. К тому же из канала можно дочитать все сообщения,
+    отправленные процессом до аварийного завершения.
+    """
+
+    # Сколько пакетов может ждать в очереди процесса, пока он выполняет текущий.
+    QUEUED_BATCHES: Final[int] = 1
+
+    def __init__(self, cert_generator: CertificateGenerator, restart_on_error: bool) -> None:
+        self._tasks_queue = multiprocessing.Queue()
+        self.connection, child_connection = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_worker,
+            args=(cert_generator, self._tasks_queue, child_connection, restart_on_error),
+            daemon=True,
+        )
+        self._process.start()
+        # Конец канала для записи остается только у процесса-обработчика,
+        # поэтому после его завершения чтение из канала сообщает о конце данных.
+        child_connection.close()
+        self._batches: list[list[int]] = []
+        self._progress_time = time.monotonic()
+        self.is_connected = True
+        self.startup_error: str | None = None
+
+    @property
+    def is_available(self) -> bool:
+        """Можно ли передать процессу еще один пакет."""
+        return (
+            self.is_connected
+            and self.startup_error is None
+            and len(self._batches) <= self.QUEUED_BATCHES
+        )
+
+    @property
+    def has_batches(self) -> bool:
+        """Остались ли у процесса невыполненные задания."""
+        return bool(self._batches)
+
+    def is_timed_out(self, timeout: float | None) -> bool:
+        """Превысил ли текущий пакет отведенное время (`timeout` на каждое задание)."""
+        if timeout is None or not self._batches or not self.is_connected:
+            return False
+        deadline = self._progress_time + timeout * len(self._batches[0])
+        return time.monotonic() > deadline
+
+    def send(self, batch: list[tuple[int, RenderTask]]) -> None:
+        if not self._batches:
+            self._progress_time = time.monotonic()
+        self._batches.append([task_idx for task_idx, _ in batch])
+        self._tasks_queue.put(batch)
+
+    def receive(self) -> tuple | None:
+        """Читает сообщение процесса. Возвращает None, если процесс завершился."""
+        try:
+            message = self.connection.recv()
+        except (EOFError, OSError):
+            self._disconnect()
+            return None
+        if message[0] == _MessageKind.startup_error:
+            self.startup_error = message[1]
+        return message
+
+    def complete(self, task_idx: int) -> None:
+        """Отмечает задание выполненным; время текущего пакета отсчитывается заново."""
+        for batch in self._batches:
+            if task_idx in batch:
+                batch.remove(task_idx)
+                break
+        while self._batches and not self._batches[0]:
+            self._batches.pop(0)
+            self._progress_time = time.monotonic()
+
+    def take_batches(self) -> list[list[int]]:
+        """Забирает невыполненные задания процесса, первым - текущий пакет."""
+        batches, self._batches = self._batches, []
+        return batches
+
+    def stop(self) -> None:
+        if self.is_connected:
+            self._tasks_queue.put(None)
+        self._process.join()
+        self._disconnect()
+
+    def terminate(self) -> None:
+        self._process.terminate()
+        self._process.join()
+        self._disconnect()
+
+    def _disconnect(self) -> None:
+        self.is_connected = False
+        self.connection.close()
+
+
+def _worker(
+    cert_generator: CertificateGenerator,
+    tasks_queue: multiprocessing.Queue,
+    connection: multiprocessing.connection.Connection,
+    restart_on_error: bool,
+) -> None:
+    # События метрик могут приходить из нескольких потоков генератора.
+    send_lock = threading.Lock()
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            connection.send(message)
+
+    set_metrics(Metrics([lambda event: send((_MessageKind.event, event))]))
+    entered = _enter_generator(cert_generator, send)
+    try:
+        while entered and (batch := tasks_queue.get()) is not None:
+            outcomes = _run_batch(cert_generator, [task for _, task in batch])
+            for (task_idx, _), (error, seconds) in zip(batch, outcomes, strict=True):
+                send((_MessageKind.result, task_idx, error, seconds))
+
+            if restart_on_error and any(error is not None for error, _ in outcomes):
+                # Перед повтором генератор перезапускается вместе с Word или LibreOffice.
+                cert_generator.__exit__(None, None, None)
+                entered = _enter_generator(cert_generator, send)
+    finally:
+        if entered:
+            cert_generator.__exit__(None, None, None)
+
+
+def _enter_generator(
+    cert_generator: CertificateGenerator,
+    send: Callable[[tuple], None],
+) -> bool:
+    """Входит в контекст генератора, при ошибке сообщает о ней главному процессу."""
+    try:
+        cert_generator.__enter__()
+    except Exception:
+        send((_MessageKind.startup_error, traceback.format_exc()))
+        return False
+    return True
+
+
+def _run_batch(
+    cert_generator: CertificateGenerator,
+    batch: list[RenderTask],
+) -> list[tuple[str | None, float]]:
+    """Выполняет пакет заданий и возвращает для каждого текст ошибки и время выполнения.
+
+    Если пакет завершился ошибкой, по одному повторяются только задания,
+    документы которых пакет не успел записать: так ошибку получают только
+    сломанные задания, а готовые документы не генерируются повторно.
+    """
+    outcomes: list[tuple[str | None, float] | None] = [None] * len(batch)
+    if len(batch) > 1:
+        suffix = cert_generator.OUTPUT_SUFFIX
+        # Документы могли остаться от прошлого запуска, поэтому записанными пакетом
+        # считаются только файлы, время изменения которых поменялось.
+        previous_mtimes = [_get_mtimes(task.output_paths(suffix)) for task in batch]
+        started = time.perf_counter()
+        team_tasks = [task for task in batch if isinstance(task.subject, Team)]
+        leader_tasks = [task for task in batch if not isinstance(task.subject, Team)]
+        try:
+            if team_tasks:
+                cert_generator.generate_students_certificates(
+                    (task.subject, task.output_directory) for task in team_tasks
+                )
+            if leader_tasks:
+                cert_generator.generate_appreciation_certificates(
+                    (task.subject, task.output_directory, task.teams)
+                    for task in leader_tasks
+                )
+        except Exception:
+            seconds = (time.perf_counter() - started) / len(batch)
+            for idx, (task, mtimes) in enumerate(zip(batch, previous_mtimes, strict=True)):
+                current_mtimes = _get_mtimes(task.output_paths(suffix))
+                if all(
+                    current is not None and current != previous
+                    for current, previous in zip(current_mtimes, mtimes, strict=True)
+                ):
+                    outcomes[idx] = (None, seconds)
+        else:
+            seconds = (time.perf_counter() - started) / len(batch)
+            return [(None, seconds)] * len(batch)
+
+    for idx, task in enumerate(batch):
+        if outcomes[idx] is not None:
+            continue
+        started = time.perf_counter()
+        try:
+            task.run(cert_generator)
+        except Exception:
+            outcomes[idx] = (traceback.format_exc(), time.perf_counter() - started)
+        else:
+            outcomes[idx] = (None, time.perf_counter() - started)
+    return [outcome for outcome in outcomes if outcome is not None]
+
+
+def _get_mtimes(paths: list[Path]) -> list[int | None]:
+    """Возвращает время изменения файлов, `None` - для несуществующих."""
+    mtimes: list[int | None] = []
+    for path in paths:
+        try:
+            mtimes.append(path.stat().st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return mtimes
@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Final, TypeVar
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from utils.metrics import get_metrics
+
+from .leaders import LeadersIndex, normalize_name
+from .models import Leader, Student, Team
+from .output_tree import OutputTree
+from .services.pdf_generator import CertificateGenerator
+from .services.teams_data_provider import TeamsDataProvider
+
+T = TypeVar("T")
+
+# Сервер принимает запросы только с этого компьютера: проверки доступа у него нет.
+HOST: Final[str] = "127.0.0.1"
+
+_CONTENT_TYPES: Final[dict[str, str]] = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+class AmbiguousNameError(LookupError):
+    """ФИО подходит нескольким людям, и нужно уточнить команду или школу."""
+
+    def __init__(self, name: str, candidates: list[str]) -> None:
+        super().__init__(f"{name}: найдено несколько совпадений, уточните запрос")
+        self.candidates = candidates
+
+
+@dataclass
+class _Registration:
+    """Считанная регистрация, подготовленная для поиска людей по ФИО.
+
+    Папки документов планируются по всем командам сразу, поэтому документ,
+    сгенерированный по запросу, попадает туда же, куда его сохранила бы
+    полная генерация в ту же папку с результатами.
+    """
+
+    stat: tuple[int, int]
+    teams_count: int = 0
+    loaded_at: float = field(default_factory=time.time)
+    students: defaultdict[str, list[tuple[Team, Student, Path]]] = field(
+        default_factory=lambda: defaultdict(list),
+    )
+    leaders: defaultdict[str, list[tuple[Leader, list[Team], Path]]] = field(
+        default_factory=lambda: defaultdict(list),
+    )
+
+    @classmethod
+    def build(
+        cls, teams: list[Team], stat: tuple[int, int], output_path: Path, suffix: str,
+    ) -> _Registration:
+        registration = cls(stat, len(teams))
+        output_tree = OutputTree(output_path, suffix, exist_ok=True)
+        for team in teams:
+            team_path = output_tree.add_team(team)
+            for student in team.members:
+                registration.students[normalize_name(str(student.full_name))].append(
+                    (team, student, team_path),
+                )
+        for leader, leader_teams in LeadersIndex.from_teams(teams).items():
+            leader_path = output_tree.add_leader(leader, leader_teams)
+            registration.leaders[normalize_name(str(leader.full_name))].append(
+                (leader, leader_teams, leader_path),
+            )
+        return registration
+
+
+class CertificateServer:
+    """Сервер, генерирующий отдельные документы по запросу.
+
+    Регистрация считывается один раз и перечитывается в фоне при изменении файла,
+    а генератор сертификатов (вместе с Word или LibreOffice и подготовленными
+    шаблонами) запускается при старте сервера и не закрывается между запросами.
+    Поэтому перепечатка одного сертификата не требует полного запуска генерации.
+
+    HTTP API:
+    - `GET /student?name=ФИО[&team=Команда]` - сертификат участника;
+    - `GET /leader?name=ФИО[&school=Школа]` - благодарность преподавателю;
+    - `GET /status` - сведения о считанной регистрации;
+    - `POST /reload` - перечитать регистрацию, не дожидаясь проверки файла.
+
+    Документ сохраняется в папку с результатами на свое место и возвращается
+    в теле ответа. Ошибки возвращаются в JSON: `{"error": ..., "candidates": [...]}`.
+    """
+
+    def __init__(
+        self,
+        teams_data_provider: TeamsDataProvider,
+        cert_generator: CertificateGenerator,
+        registration_path: Path,
+        output_path: Path,
+        watch_interval: float = 1.0,
+    ) -> None:
+        """Инициализирует сервер.
+
+        :teams_data_provider:
+        Провайдер, которым считывается регистрация.
+
+        :cert_generator:
+        Генератор сертификатов. Запускается в `serve` и работает до остановки сервера.
+
+        :registration_path:
+        Путь к файлу регистрации, изменения которого отслеживаются.
+
+        :output_path:
+        Путь к папке с результатами генерации.
+
+        :watch_interval:
+        Как часто, в секундах, проверять, не изменился ли файл регистрации.
+        """
+        self._provider = teams_data_provider
+        self._cert_generator = cert_generator
+        self._registration_path = registration_path
+        self._output_path = output_path
+        self._watch_interval = watch_interval
+
+        self._registration: _Registration | None = None
+        self._failed_stat: tuple[int, int] | None = None
+        # Запущен ли генератор: если перезапуск после сбоя не удался,
+        # генератор запускается заново при следующем запросе.
+        self._generator_entered = False
+        self._reload_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def serve(self, port: int | None = None, socket_path: Path | None = None) -> None:
+        """Считывает регистрацию и обрабатывает запросы до прерывания (Ctrl+C).
+
+        :port:
+        Порт, на котором сервер принимает HTTP-запросы с этого компьютера.
+
+        :socket_path:
+        Путь к Unix-сокету, на котором сервер принимает HTTP-запросы вместо порта.
+        """
+        metrics = get_metrics()
+        # Без первой версии регистрации сервер не запускается.
+        with metrics.stage("read", title="Считывание данных из регистрационного файла"):
+            self._load(self._get_stat())
+
+        server = self._create_server(port, socket_path)
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        try:
+            self._enter_generator()
+            watcher.start()
+            address = socket_path or f"http://{HOST}:{server.server_address[1]}"
+            metrics.message(f"Сервер принимает запросы: {address}")
+            server.serve_forever()
+        except KeyboardInterrupt:
+            metrics.message("Сервер остановлен")
+        finally:
+            self._stopped.set()
+            self._exit_generator()
+            server.server_close()
+            if socket_path is not None:
+                socket_path.unlink(missing_ok=True)
+
+    def reload(self) -> bool:
+        """Перечитывает регистрацию и возвращает, удалось ли это.
+
+        Если файл не удалось прочитать (например, Excel еще не дописал его),
+        запросы продолжают обслуживаться по предыдущей версии регистрации.
+        """
+        with self._reload_lock:
+            # Состояние файла берется до чтения: если файл изменится во время чтения,
+            # следующая проверка это заметит.
+            stat = self._get_stat()
+            try:
+                self._load(stat)
+            except Exception as error:
+                self._failed_stat = stat
+                get_metrics().message(
+                    f"Не удалось перечитать регистрацию, используется предыдущая: {error!r}",
+                    "warning",
+                )
+                return False
+            return True
+
+    def status(self) -> dict[str, Any]:
+        """Возвращает сведения о считанной регистрации."""
+        registration = self._get_registration()
+        return {
+            "registration": str(self._registration_path),
+            "teams": registration.teams_count,
+            "students": sum(map(len, registration.students.values())),
+            "leaders": sum(map(len, registration.leaders.values())),
+            "loaded_at": registration.loaded_at,
+        }
+
+    def render_student(self, name: str, team_name: str | None = None) -> Path:
+        """Генерирует сертификат участника и возвращает путь к нему.
+
+        :name:
+        ФИО участника.
+
+        :team_name:
+        Название команды - если в регистрации несколько участников с таким ФИО.
+        """
+        matches = self._get_registration().students.get(normalize_name(name), [])
+        if team_name is not None:
+            matches = [
+                match for match in matches
+                if normalize_name(str(match[0].name)) == normalize_name(team_name)
+            ]
+        team, student, team_path = self._choose(name, matches, lambda match: match[0].name)
+        self._render(
+            f"{student.full_name}, {team.name}",
+            lambda: self._cert_generator.generate_students_certificate(
+                replace(team, members=(student,)), team_path,
+            ),
+            team_path,
+        )
+        return team_path / f"{student.full_name}{self._cert_generator.OUTPUT_SUFFIX}"
+
+    def render_leader(self, name: str, school: str | None = None) -> Path:
+        """Генерирует благодарность преподавателю и возвращает путь к ней.
+
+        :name:
+        ФИО преподавателя.
+
+        :school:
+        Школа - если в регистрации несколько преподавателей с таким ФИО.
+        """
+        matches = self._get_registration().leaders.get(normalize_name(name), [])
+        if school is not None:
+            matches = [
+                match for match in matches
+                if normalize_name(str(match[1][0].school)) == normalize_name(school)
+            ]
+        leader, leader_teams, leader_path = self._choose(
+            name, matches, lambda match: match[1][0].school,
+        )
+        self._render(
+            str(leader.full_name),
+            lambda: self._cert_generator.generate_appreciation_certificate(
+                leader, leader_path, leader_teams,
+            ),
+            leader_path,
+        )
+        return leader_path / f"{leader.full_name}{self._cert_generator.OUTPUT_SUFFIX}"
+
+    def _load(self, stat: tuple[int, int]) -> None:
+        metrics = get_metrics()
+        with metrics.timed("serve.reload", str(self._registration_path)):
+            teams = self._provider.get_data()
+            registration = _Registration.build(
+                teams, stat, self._output_path, self._cert_generator.OUTPUT_SUFFIX,
+            )
+        # Запросы, уже получившие предыдущую версию, дорабатывают с ней.
+        self._registration = registration
+        self._failed_stat = None
+        metrics.message(f"Регистрация считана, команд: {registration.teams_count}")
+
+    def _get_registration(self) -> _Registration:
+        if self._registration is None:
+            msg = "Регистрация еще не считана"
+            raise RuntimeError(msg)
+        return self._registration
+
+    @staticmethod
+    def _choose(name: str, matches: list[T], describe: Callable[[T], object]) -> T:
+        if not matches:
+            msg = f"{name}: не найдено в регистрации"
+            raise LookupError(msg)
+        if len(matches) > 1:
+            raise AmbiguousNameError(name, [str(describe(match)) for match in matches])
+        return matches[0]
+
+    def _render(
+        self, description: str, render: Callable[[], None], output_directory: Path,
+    ) -> None:
+        Path.mkdir(output_directory, parents=True, exist_ok=True)
+        if not self._generator_entered:
+            # Перезапуск после прошлого сбоя не удался, ошибка запуска уходит в ответ.
+            self._enter_generator()
+        try:
+            with get_metrics().timed("serve.render", description):
+                render()
+        except Exception:
+            # После сбоя Word или LibreOffice часто остаются в неработоспособном
+            # состоянии, поэтому генератор перезапускается до следующего запроса.
+            self._exit_generator()
+            try:
+                self._enter_generator()
+            except Exception as error:
+                get_metrics().message(
+                    f"Не удалось перезапустить генератор, повторим при следующем запросе: "
+                    f"{error!r}",
+                    "warning",
+                )
+            raise
+
+    def _enter_generator(self) -> None:
+        self._cert_generator.__enter__()
+        self._generator_entered = True
+
+    def _exit_generator(self) -> None:
+        if not self._generator_entered:
+            return
+        # Генератор считается остановленным, даже если остановка завершилась ошибкой.
+        self._generator_entered = False
+        try:
+            self._cert_generator.__exit__(None, None, None)
+        except Exception as error:
+            get_metrics().message(f"Не удалось остановить генератор: {error!r}", "warning")
+
+    def _get_stat(self) -> tuple[int, int]:
+        stat = self._registration_path.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def _watch(self) -> None:
+        # Файл перечитывается, только когда его состояние не менялось в течение одной
+        # проверки: так не читается файл, который Excel еще сохраняет.
+        pending_stat = None
+        while not self._stopped.wait(self._watch_interval):
+            try:
+                stat = self._get_stat()
+            except OSError:
+                continue
+            registration = self._registration
+            if stat in (registration.stat if registration else None, self._failed_stat):
+                pending_stat = None
+            elif stat != pending_stat:
+                pending_stat = stat
+            else:
+                get_metrics().message("Файл регистрации изменился, перечитываем")
+                self.reload()
+                pending_stat = None
+
+    def _create_server(
+        self, port: int | None, socket_path: Path | None,
+    ) -> socketserver.BaseServer:
+        server: socketserver.BaseServer
+        if socket_path is None:
+            server = HTTPServer((HOST, port or 0), _RequestHandler)
+        elif hasattr(socket, "AF_UNIX"):
+            # Сокет мог остаться от сервера, завершенного аварийно.
+            if socket_path.is_socket():
+                socket_path.unlink()
+            server = socketserver.UnixStreamServer(os.fspath(socket_path), _RequestHandler)
+        else:
+            msg = "Unix-сокеты не поддерживаются в этой системе, укажите порт"
+            raise ValueError(msg)
+        server.certificate_server = self
+        return server
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Переводит HTTP-запросы в вызовы методов `CertificateServer`.
+
+    Сервер передается через атрибут `certificate_server` сокет-сервера.
+    """
+
+    def do_GET(self) -> None:
+        server: CertificateServer = self.server.certificate_server
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/status":
+            self._handle(lambda: self._send_json(HTTPStatus.OK, server.status()))
+        elif url.path == "/student" and "name" in params:
+            self._handle(lambda: self._send_file(
+                server.render_student(params["name"], params.get("team")),
+            ))
+        elif url.path == "/leader" and "name" in params:
+            self._handle(lambda: self._send_file(
+                server.render_leader(params["name"], params.get("school")),
+            ))
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Неизвестный запрос"})
+
+    def do_POST(self) -> None:
+        server: CertificateServer = self.server.certificate_server
+        if urlsplit(self.path).path == "/reload":
+            self._handle(lambda: self._send_json(
+                HTTPStatus.OK, {"reloaded": server.reload(), **server.status()},
+            ))
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Неизвестный запрос"})
+
+    def _handle(self, respond: Callable[[], None]) -> None:
+        try:
+            respond()
+        except AmbiguousNameError as error:
+            self._send_json(
+                HTTPStatus.CONFLICT, {"error": str(error), "candidates": error.candidates},
+            )
+        except LookupError as error:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": str(error)})
+        except Exception as error:
+            get_metrics().message(traceback.format_exc(), "error")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(error)})
+
+    def _send_json(self, status: HTTPStatus, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: Path) -> None:
+        body = path.read_bytes()
+        self.send_response(HTTPStatus.OK)
+        self.send_header(
+            "Content-Type", _CONTENT_TYPES.get(path.suffix, "application/octet-stream"),
+        )
+        self.send_header("Content-Length", str(len(body)))
+        # Имена файлов русские, поэтому передаются в кодировке UTF-8 по RFC 5987.
+        self.send_header(
+            "Content-Disposition", f"attachment; filename*=UTF-8''{quote(path.name)}",
+        )
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # У клиентов Unix-сокета нет адреса.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        # ФИО в адресе запроса закодированы, в журнале они выводятся читаемыми.
+        get_metrics().message(f"{self.address_string()} {unquote(format % args)}")
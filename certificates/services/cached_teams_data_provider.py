@@ -0,0 +1,168 @@
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Any, Final
+
+from certificates.models import FullName, Leader, Student, Team
+from certificates.team_filter import ALL_TEAMS, TeamFilter
+from utils.files import hash_file
+from utils.strings import intern_if_str
+
+from .gender_guesser import GenderGuesser
+from .teams_data_provider import TeamsDataProvider
+
+
+class CachedTeamsDataProvider(TeamsDataProvider):
+    """Провайдер, кэширующий на диске данные о командах другого провайдера.
+
+    Кэш привязан к файлу регистрации: его пути, размеру, времени изменения и хэшу
+    содержимого. Пока файл не изменился, команды берутся из кэша, а исходный
+    провайдер (и, например, Excel) не запускается.
+
+    Пол преподавателей в кэше не хранится: он определяется заново при каждом чтении
+    кэша, поэтому изменения словаря имен (`-names`) сразу учитываются.
+    """
+
+    FORMAT_VERSION: Final[int] = 2
+
+    def __init__(
+        self,
+        provider: TeamsDataProvider,
+        filepath: os.PathLike,
+        cache_path: os.PathLike,
+        gender_guesser: GenderGuesser,
+    ) -> None:
+        """Инициализирует кэширующий провайдер.
+
+        :provider:
+        Провайдер, данные которого кэшируются.
+
+        :filepath:
+        Путь к файлу регистрации, который читает `provider`.
+
+        :cache_path:
+        Путь к файлу кэша.
+
+        :gender_guesser:
+        Определитель пола преподавателей команд из кэша. Должен совпадать
+        с определителем, которым пользуется `provider`.
+        """
+        self._provider = provider
+        self._filepath = Path(filepath)
+        self._cache_path = Path(cache_path)
+        self._gender_guesser = gender_guesser
+
+    def get_data(self, team_filter: TeamFilter = ALL_TEAMS) -> list[Team]:
+        """Возвращает команды из кэша или, если файл регистрации изменился, из провайдера.
+
+        Замечание
+        ---------
+        Если изменилось только время изменения файла, но не его содержимое,
+        кэш считается актуальным и обновляется без повторного чтения регистрации.
+        В кэше хранятся все команды, поэтому при его обновлении регистрация считывается
+        целиком, а фильтр применяется к уже считанным командам.
+        """
+        teams = self._get_all_teams()
+        if team_filter.is_empty:
+            return teams
+        return [team for team in teams if team_filter.accepts_team(team)]
+
+    def _get_all_teams(self) -> list[Team]:
+        stat = self._filepath.stat()
+        source = {
+            "provider": type(self._provider).__name__,
+            "path": str(self._filepath.resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+        cache = self._read_cache()
+        cached_source: dict[str, Any] = cache["source"] if cache is not None else {}
+        if cached_source | {"sha256": None} == source | {"sha256": None}:
+            return _deserialize_teams(cache["teams"], self._gender_guesser)
+
+        source["sha256"] = hash_file(self._filepath)
+        if cached_source | {"mtime_ns": stat.st_mtime_ns} == source:
+            self._write_cache(source, cache["teams"])
+            return _deserialize_teams(cache["teams"], self._gender_guesser)
+
+        teams = self._provider.get_data()
+        self._write_cache(source, _serialize_teams(teams))
+        return teams
+
+    def _read_cache(self) -> dict[str, Any] | None:
+        try:
+            cache = json.loads(self._cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if cache.get("version") != self.FORMAT_VERSION:
+            return None
+        return cache
+
+    def _write_cache(self, source: dict[str, Any], teams: list[list[Any]]) -> None:
+        cache = {"version": self.FORMAT_VERSION, "source": source, "teams": teams}
+        temp_path = self._cache_path.with_suffix(".tmp")
+        temp_path.write_text(
+            json.dumps(cache, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(temp_path, self._cache_path)
+
+
+def _serialize_full_name(full_name: FullName) -> list[str | None]:
+    return [full_name.last_name, full_name.first_name, full_name.patronymic]
+
+
+def _serialize_teams(teams: list[Team]) -> list[list[Any]]:
+    """Переводит команды в компактный вид: списки значений полей без имен."""
+    return [
+        [
+            team.name,
+            team.school,
+            team.city,
+            [
+                [*_serialize_full_name(student.full_name), student.grade]
+                for student in team.members
+            ],
+            [_serialize_full_name(leader.full_name) for leader in team.leaders],
+        ]
+        for team in teams
+    ]
+
+
+def _deserialize_teams(data: list[list[Any]], gender_guesser: GenderGuesser) -> list[Team]:
+    # Пол всех преподавателей определяется одним пакетом, как при разборе регистрации.
+    leader_names = [
+        _deserialize_full_name(full_name) for *_, leaders in data for full_name in leaders
+    ]
+    all_leaders = iter(
+        [
+            Leader(full_name=full_name, gender=gender)
+            for full_name, gender in zip(
+                leader_names, gender_guesser.guess_genders(leader_names), strict=True,
+            )
+        ],
+    )
+    # JSON создает новую строку для каждого значения, поэтому повторяющиеся
+    # школы, города, классы и части ФИО сводятся к одной строке.
+    return [
+        Team(
+            name=name,
+            school=intern_if_str(school),
+            city=intern_if_str(city),
+            members=tuple(
+                Student(full_name=_deserialize_full_name(full_name), grade=intern_if_str(grade))
+                for *full_name, grade in members
+            ),
+            leaders=tuple(islice(all_leaders, len(leaders))),
+        )
+        for name, school, city, members, leaders in data
+    ]
+
+
+def _deserialize_full_name(full_name: list[str | None]) -> FullName:
+    last_name, first_name, patronymic = full_name
+    return FullName(
+        intern_if_str(last_name), intern_if_str(first_name), intern_if_str(patronymic),
+    )
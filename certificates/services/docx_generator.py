@@ -0,0 +1,114 @@
+import pathlib
+from collections.abc import Sequence
+from os import PathLike
+from typing import ClassVar, Self
+
+from certificates.models import Leader, Team
+from utils.metrics import get_metrics
+
+from .docx_template import load_certificate_templates
+from .pdf_generator import (
+    CertificateGenerator,
+    get_leader_replacements,
+    get_student_replacements,
+)
+
+
+class DocxCertificateGenerator(CertificateGenerator):
+    """Генератор сертификатов в docx-формате, не требующий установленного Word.
+
+    Шаблоны разбираются один раз при входе в контекст, после чего каждый сертификат
+    собирается подстановкой значений в `word/document.xml` шаблона.
+    """
+
+    OUTPUT_SUFFIX: ClassVar[str] = ".docx"
+    RENDERS_IN_MEMORY: ClassVar[bool] = True
+
+    def __enter__(self) -> Self:
+        self._participation_template, self._appreciation_template = (
+            load_certificate_templates(
+                self._participation_cert_template_path,
+                self._appreciation_cert_template_path,
+                self._template_cache,
+            )
+        )
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        del self._participation_template
+        del self._appreciation_template
+
+    def generate_students_certificate(
+        self,
+        team: Team,
+        output_directory: PathLike,
+    ) -> None:
+        """Генерирует сертификаты участников в формате docx для каждого члена команды.
+
+        :team:
+        Команда, для участников которой генерируются сертификаты.
+
+        :output_directory:
+        Путь, по которому сохраняются сгенерированные сертификаты.
+        """
+        metrics = get_metrics()
+        for student in team.members:
+            with metrics.timed("docx.save", str(student.full_name)):
+                self._participation_template.save(
+                    pathlib.Path(output_directory) / f"{student.full_name}{self.OUTPUT_SUFFIX}",
+                    get_student_replacements(team, student),
+                )
+
+    def generate_appreciation_certificate(
+        self,
+        leader: Leader,
+        output_directory: PathLike,
+        teams: Sequence[Team] = (),
+    ) -> None:
+        """Генерирует благодарственное письмо преподавателю в формате docx.
+
+        :leader:
+        Преподаватель, для которого генерируется благодарственное письмо.
+
+        :output_directory:
+        Путь, по которому будет сохранен сгенерированный документ.
+
+        :teams:
+        Команды, которые ведет преподаватель.
+        """
+        with get_metrics().timed("docx.save", str(leader.full_name)):
+            self._appreciation_template.save(
+                pathlib.Path(output_directory) / f"{leader.full_name}{self.OUTPUT_SUFFIX}",
+                get_leader_replacements(leader, teams),
+            )
+
+    def render_students_certificates(self, team: Team) -> dict[str, bytes]:
+        """Возвращает содержимое сертификатов участников команды по именам их файлов.
+
+        :team:
+        Команда, для участников которой генерируются сертификаты.
+        """
+        metrics = get_metrics()
+        documents: dict[str, bytes] = {}
+        for student in team.members:
+            with metrics.timed("docx.render", str(student.full_name)):
+                documents[f"{student.full_name}{self.OUTPUT_SUFFIX}"] = (
+                    self._participation_template.render(get_student_replacements(team, student))
+                )
+        return documents
+
+    def render_appreciation_certificate(
+        self,
+        leader: Leader,
+        teams: Sequence[Team] = (),
+    ) -> bytes:
+        """Возвращает содержимое благодарственного письма преподавателю.
+
+        :leader:
+        Преподаватель, для которого генерируется благодарственное письмо.
+
+        :teams:
+        Команды, которые ведет преподаватель.
+        """
+        with get_metrics().timed("docx.render", str(leader.full_name)):
+            return self._appreciation_template.render(get_leader_replacements(leader, teams))
@@ -0,0 +1,250 @@
+import re
+import zipfile
+from collections.abc import Collection, Mapping
+from html import escape
+from io import BytesIO
+from os import PathLike
+
+from .pdf_generator import (
+    LEADER_REPLACEMENTS,
+    REQUIRED_REPLACEMENTS,
+    STUDENT_REPLACEMENTS,
+    TemplateCache,
+    TextReplacements,
+)
+
+DOCUMENT_PART = "word/document.xml"
+
+# Текстовые узлы `<w:t>` и границы абзацев `<w:p>`/`</w:p>` в порядке следования.
+# Подстановка может быть разбита Word'ом на несколько run'ов, но не выходит за абзац.
+_TOKEN_RE = re.compile(
+    r"<w:t(?:\s[^>]*)?>(?P<text>[^<]*)</w:t>|</?w:p[\s/>]",
+)
+_PLACEHOLDER_RE = re.compile(
+    "|".join(re.escape(f"{{{replacement}}}") for replacement in TextReplacements),
+)
+# Любой текст вида `{NAME}` - так в шаблоне выглядят и неизвестные подстановки.
+_ANY_PLACEHOLDER_RE = re.compile(r"\{([A-Z_]+)\}")
+_JUSTIFICATION_RE = re.compile(r'<w:jc w:val="(\w+)"')
+_PRESERVE_SPACE_TAG = '<w:t xml:space="preserve">'
+
+
+class DocxTemplate:
+    """Шаблон .docx-документа с подстановками из `TextReplacements`.
+
+    Архив шаблона разбирается один раз: `word/document.xml` компилируется в список
+    неизменяемых фрагментов и слотов под подстановки, а остальные части архива
+    упаковываются заранее и копируются в каждый документ без изменений. Каждый
+    документ затем собирается за один проход по этому плану.
+    """
+
+    def __init__(self, template_path: PathLike) -> None:
+        """Загружает и разбирает файл-шаблон.
+
+        :template_path:
+        Путь к .docx шаблону.
+        """
+        self._template_path = template_path
+        base_archive = BytesIO()
+        with (
+            zipfile.ZipFile(template_path) as template,
+            zipfile.ZipFile(base_archive, "w") as base,
+        ):
+            self._document_info = template.getinfo(DOCUMENT_PART)
+            document_xml = template.read(self._document_info).decode("utf-8")
+
+            for info in template.infolist():
+                if info.filename != DOCUMENT_PART:
+                    base.writestr(info, template.read(info))
+
+        self._base_archive = base_archive.getvalue()
+        self._chunks, self._slots, self._alignments, self._placeholders = (
+            _compile_document(document_xml)
+        )
+
+    @property
+    def path(self) -> PathLike:
+        """Путь к файлу шаблона."""
+        return self._template_path
+
+    @property
+    def replacements(self) -> frozenset[TextReplacements]:
+        """Подстановки, найденные в шаблоне."""
+        return frozenset(self._slots)
+
+    @property
+    def placeholders(self) -> frozenset[str]:
+        """Имена всех подстановок вида `{NAME}` в тексте шаблона, в том числе неизвестных."""
+        return self._placeholders
+
+    def check_replacements(
+        self,
+        available: Collection[TextReplacements],
+        required: Collection[TextReplacements] = REQUIRED_REPLACEMENTS,
+    ) -> None:
+        """Проверяет, что в шаблоне нет лишних подстановок и есть все обязательные.
+
+        Иначе документы получились бы с незаполненными полями, поэтому ошибка
+        выбрасывается сразу при загрузке шаблона.
+
+        :available:
+        Подстановки, для которых у документа этого вида есть значения.
+
+        :required:
+        Подстановки, без которых документ не имеет смысла.
+        """
+        unknown = self._placeholders - set(available)
+        missing = set(required) - self._placeholders
+        errors: list[str] = []
+        if unknown:
+            names = ", ".join(sorted(f"{{{name}}}" for name in unknown))
+            errors.append(f"неизвестные подстановки {names}")
+        if missing:
+            names = ", ".join(sorted(f"{{{name}}}" for name in missing))
+            errors.append(f"нет обязательных подстановок {names}")
+        if errors:
+            msg = f"В шаблоне {self._template_path} {'; '.join(errors)}"
+            raise ValueError(msg)
+
+    @property
+    def alignments(self) -> dict[TextReplacements, str]:
+        """Выравнивание (`w:jc`) абзацев, в которых впервые встречаются подстановки."""
+        alignments: dict[TextReplacements, str] = {}
+        for slot, alignment in zip(self._slots, self._alignments, strict=True):
+            alignments.setdefault(slot, alignment)
+        return alignments
+
+    def render_document_xml(self, values: Mapping[TextReplacements, str]) -> str:
+        """Возвращает `word/document.xml` с подставленными значениями.
+
+        Подстановки, для которых значение не передано, остаются в тексте как есть.
+        """
+        parts = [self._chunks[0]]
+        for slot, chunk in zip(self._slots, self._chunks[1:], strict=True):
+            value = values.get(slot)
+            # Как `xml.sax.saxutils.escape`, но без импорта `urllib` при запуске.
+            parts.append(f"{{{slot}}}" if value is None else escape(value, quote=False))
+            parts.append(chunk)
+        return "".join(parts)
+
+    def render(self, values: Mapping[TextReplacements, str]) -> bytes:
+        """Возвращает содержимое заполненного .docx-документа."""
+        output = BytesIO(self._base_archive)
+        with zipfile.ZipFile(output, "a") as archive:
+            info = zipfile.ZipInfo(DOCUMENT_PART, self._document_info.date_time)
+            info.compress_type = self._document_info.compress_type
+            archive.writestr(info, self.render_document_xml(values).encode("utf-8"))
+        return output.getvalue()
+
+    def save(self, output_path: PathLike, values: Mapping[TextReplacements, str]) -> None:
+        """Сохраняет заполненный .docx-документ по указанному пути."""
+        with open(output_path, "wb") as output_file:
+            output_file.write(self.render(values))
+
+
+def load_certificate_templates(
+    participation_cert_template_path: PathLike,
+    appreciation_cert_template_path: PathLike,
+    template_cache: TemplateCache | None = None,
+) -> tuple[DocxTemplate, DocxTemplate]:
+    """Загружает шаблоны сертификата участника и благодарности и проверяет их подстановки.
+
+    :participation_cert_template_path:
+    Путь к шаблону сертификаты участника.
+
+    :appreciation_cert_template_path:
+    Путь к шаблону благодарственного письма.
+
+    :template_cache:
+    Кэш, из которого берутся уже загруженные шаблоны и в который попадают новые.
+    """
+    return (
+        _load_template(participation_cert_template_path, STUDENT_REPLACEMENTS, template_cache),
+        _load_template(appreciation_cert_template_path, LEADER_REPLACEMENTS, template_cache),
+    )
+
+
+def _load_template(
+    template_path: PathLike,
+    available: Collection[TextReplacements],
+    template_cache: TemplateCache | None,
+) -> DocxTemplate:
+    # Подстановки проверяются при каждой загрузке: один файл может оказаться шаблоном
+    # и сертификата, и благодарности, а допустимые подстановки у них разные.
+    template = None if template_cache is None else template_cache.get("docx", template_path)
+    if template is None:
+        template = DocxTemplate(template_path)
+        if template_cache is not None:
+            template_cache.add("docx", template_path, template)
+    template.check_replacements(available)
+    return template
+
+
+def _compile_document(
+    document_xml: str,
+) -> tuple[list[str], list[TextReplacements], list[str], frozenset[str]]:
+    """Разбивает XML документа на неизменяемые фрагменты и слоты подстановок.
+
+    Возвращает фрагменты `chunks`, слоты `slots`, выравнивание абзаца каждого слота
+    и имена всех найденных в тексте подстановок, включая неизвестные. При этом
+    `len(chunks) == len(slots) + 1`: документ собирается
+    как `chunks[0] + slots[0] + chunks[1] + ...`.
+    """
+    chunks: list[str] = []
+    slots: list[TextReplacements] = []
+    alignments: list[str] = []
+    placeholders: set[str] = set()
+    current_chunk: list[str] = []
+    cursor = 0
+    paragraph_start = 0
+    paragraph_nodes: list[re.Match[str]] = []
+
+    def flush_paragraph(nodes: list[re.Match[str]]) -> None:
+        nonlocal cursor
+        text = "".join(node["text"] for node in nodes)
+        placeholders.update(_ANY_PLACEHOLDER_RE.findall(text))
+        known_placeholders = list(_PLACEHOLDER_RE.finditer(text))
+        if not known_placeholders:
+            return
+
+        justification = _JUSTIFICATION_RE.search(
+            document_xml, paragraph_start, nodes[0].start(),
+        )
+        alignment = justification.group(1) if justification else "left"
+
+        node_start = 0
+        for node in nodes:
+            node_end = node_start + len(node["text"])
+            touching = [
+                placeholder for placeholder in known_placeholders
+                if placeholder.start() < node_end and placeholder.end() > node_start
+            ]
+            if touching:
+                current_chunk.append(document_xml[cursor:node.start()])
+                current_chunk.append(_PRESERVE_SPACE_TAG)
+
+                position = node_start
+                for placeholder in touching:
+                    if placeholder.start() >= node_start:
+                        current_chunk.append(text[position:placeholder.start()])
+                        chunks.append("".join(current_chunk))
+                        current_chunk.clear()
+                        slots.append(TextReplacements(placeholder.group()[1:-1]))
+                        alignments.append(alignment)
+                    position = min(placeholder.end(), node_end)
+                current_chunk.append(text[position:node_end])
+                cursor = node.end("text")
+            node_start = node_end
+
+    for token in _TOKEN_RE.finditer(document_xml):
+        if token["text"] is None:
+            flush_paragraph(paragraph_nodes)
+            paragraph_nodes = []
+            paragraph_start = token.end()
+        else:
+            paragraph_nodes.append(token)
+    flush_paragraph(paragraph_nodes)
+
+    current_chunk.append(document_xml[cursor:])
+    chunks.append("".join(current_chunk))
+    return chunks, slots, alignments, frozenset(placeholders)
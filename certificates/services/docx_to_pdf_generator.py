@@ -0,0 +1,180 @@
+import itertools
+import pathlib
+import tempfile
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from os import PathLike
+from typing import ClassVar, Self
+
+from certificates.models import Leader, Team
+from utils.metrics import get_metrics
+
+from .docx_template import DocxTemplate, load_certificate_templates
+from .pdf_generator import (
+    CertificateGenerator,
+    DocumentConverter,
+    TemplateCache,
+    TextReplacements,
+    get_leader_replacements,
+    get_student_replacements,
+)
+
+
+class DocxToPdfCertificateGenerator(CertificateGenerator):
+    """Генератор сертификатов в pdf-формате с подстановкой значений без офисного пакета.
+
+    Значения подставляются в .docx шаблон напрямую (см. `DocxTemplate`), а конвертер
+    только переводит готовые документы в pdf. Сертификаты всей команды передаются
+    конвертеру одним пакетом, чтобы он мог обработать их параллельно.
+    """
+
+    BATCH_SIZE: ClassVar[int] = 16
+
+    def __init__(
+        self,
+        participation_cert_template_path: PathLike,
+        appreciation_cert_template_path: PathLike,
+        converter: DocumentConverter,
+        template_cache: TemplateCache | None = None,
+    ) -> None:
+        """Инициализирует генератор сертификатов на основе путей к файлам-шаблонам.
+
+        :participation_cert_template_path:
+        Путь к шаблону сертификаты участника.
+
+        :appreciation_cert_template_path:
+        Путь к шаблону благодарственного письма.
+
+        :converter:
+        Конвертер, которым заполненные документы переводятся в pdf.
+
+        :template_cache:
+        Кэш шаблонов, общий с другими генераторами.
+        """
+        super().__init__(
+            participation_cert_template_path, appreciation_cert_template_path, template_cache,
+        )
+        self._converter = converter
+
+    def __enter__(self) -> Self:
+        self._participation_template, self._appreciation_template = (
+            load_certificate_templates(
+                self._participation_cert_template_path,
+                self._appreciation_cert_template_path,
+                self._template_cache,
+            )
+        )
+        # Заполненные .docx складываются на локальный диск и удаляются после конвертации.
+        self._work_dir = tempfile.TemporaryDirectory()
+        self._document_numbers = itertools.count()
+        self._converter.__enter__()
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self._converter.__exit__(type, value, traceback)
+        self._work_dir.cleanup()
+        del self._participation_template
+        del self._appreciation_template
+
+    def generate_students_certificate(
+        self,
+        team: Team,
+        output_directory: PathLike,
+    ) -> None:
+        """Генерирует сертификаты участников в формате pdf для каждого члена команды.
+
+        :team:
+        Команда, для участников которой генерируются сертификаты.
+
+        :output_directory:
+        Путь, по которому сохраняются сгенерированные сертификаты.
+        """
+        self.generate_students_certificates([(team, output_directory)])
+
+    def generate_appreciation_certificate(
+        self,
+        leader: Leader,
+        output_directory: PathLike,
+        teams: Sequence[Team] = (),
+    ) -> None:
+        """Генерирует благодарственное письмо преподавателю в формате pdf.
+
+        :leader:
+        Преподаватель, для которого генерируется благодарственное письмо.
+
+        :output_directory:
+        Путь, по которому будет сохранен сгенерированный документ.
+
+        :teams:
+        Команды, которые ведет преподаватель.
+        """
+        self.generate_appreciation_certificates([(leader, output_directory, teams)])
+
+    def generate_students_certificates(
+        self,
+        teams: Iterable[tuple[Team, PathLike]],
+    ) -> None:
+        """Генерирует сертификаты участников нескольких команд одним пакетом.
+
+        Все документы заполняются заранее и передаются конвертеру за одно обращение.
+
+        :teams:
+        Пары (команда, путь, по которому сохраняются сертификаты команды).
+        """
+        self._convert_all(
+            (
+                self._participation_template,
+                get_student_replacements(team, student),
+                pathlib.Path(output_directory) / f"{student.full_name}{self.OUTPUT_SUFFIX}",
+            )
+            for team, output_directory in teams
+            for student in team.members
+        )
+
+    def generate_appreciation_certificates(
+        self,
+        leaders: Iterable[tuple[Leader, PathLike, Sequence[Team]]],
+    ) -> None:
+        """Генерирует благодарственные письма нескольким преподавателям одним пакетом.
+
+        :leaders:
+        Тройки (преподаватель, путь для сохранения письма, команды преподавателя).
+        """
+        self._convert_all(
+            (
+                self._appreciation_template,
+                get_leader_replacements(leader, teams),
+                pathlib.Path(output_directory) / f"{leader.full_name}{self.OUTPUT_SUFFIX}",
+            )
+            for leader, output_directory, teams in leaders
+        )
+
+    def _convert_all(
+        self,
+        documents: Iterable[tuple[DocxTemplate, Mapping[TextReplacements, str], pathlib.Path]],
+    ) -> None:
+        metrics = get_metrics()
+        filled_documents: list[tuple[pathlib.Path, pathlib.Path]] = []
+        try:
+            for template, values, output_path in documents:
+                with metrics.timed("docx.fill", output_path.name):
+                    filled_documents.append((self._fill(template, values), output_path))
+
+            started = time.perf_counter()
+            self._converter.convert_many_to_pdf(filled_documents)
+            metrics.item(
+                "convert", None, time.perf_counter() - started, count=len(filled_documents),
+            )
+        finally:
+            for document_path, _ in filled_documents:
+                document_path.unlink()
+
+    def _fill(
+        self,
+        template: DocxTemplate,
+        values: Mapping[TextReplacements, str],
+    ) -> pathlib.Path:
+        document_number = next(self._document_numbers)
+        document_path = pathlib.Path(self._work_dir.name) / f"{document_number}.docx"
+        template.save(document_path, values)
+        return document_path
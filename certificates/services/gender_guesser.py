@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+from os import PathLike
 from typing import Final
 
 from certificates.models import FullName, Gender
@@ -11,11 +14,93 @@ class GenderGuesser(ABC):
     def guess_gender(self, fio: FullName) -> Gender:
         """Метод, определяющий пол человека по переданному ФИО."""
 
+    def guess_genders(self, names: Iterable[FullName]) -> list[Gender]:
+        """Определяет пол каждого из переданных ФИО.
+
+        Реализации могут переопределять метод, чтобы обрабатывать ФИО пакетом.
+        """
+        return [self.guess_gender(fio) for fio in names]
+
+
+# Мужские имена на `а`/`я` и женские имена на согласную или мягкий знак,
+# для которых правило окончаний имени ошибается.
+KNOWN_FIRST_NAMES: Final[Mapping[str, Gender]] = {
+    **dict.fromkeys(
+        (
+            "никита", "илья", "фома", "кузьма", "лука", "савва", "данила",
+            "гаврила", "иона", "зосима", "фока", "мина", "никола",
+        ),
+        Gender.male,
+    ),
+    **dict.fromkeys(
+        ("любовь", "нинель", "юдифь", "эсфирь", "ассоль", "рахиль", "руфь", "агарь"),
+        Gender.female,
+    ),
+}
+
+
+def load_known_names(path: PathLike) -> dict[str, Gender]:
+    """Загружает словарь известных имен и отчеств из текстового файла.
+
+    Каждая строка файла - имя или отчество и через пробел пол: `м` или `ж`.
+    Пустые строки и строки, начинающиеся с `#`, пропускаются.
+
+    :path:
+    Путь к файлу в кодировке UTF-8.
+    """
+    genders = {"м": Gender.male, "ж": Gender.female}
+    known_names: dict[str, Gender] = {}
+    with open(path, encoding="utf-8") as names_file:
+        for line_number, line in enumerate(names_file, start=1):
+            line = line.strip()  # noqa: PLW2901
+            if not line or line.startswith("#"):
+                continue
+            name, _, gender = line.rpartition(" ")
+            if not name or gender.casefold() not in genders:
+                msg = f"{path}, строка {line_number}: ожидалось `Имя м` или `Имя ж`"
+                raise ValueError(msg)
+            known_names[_normalize(name)] = genders[gender.casefold()]
+    return known_names
+
+
+def _normalize(name: str) -> str:
+    return name.strip().casefold().replace("ё", "е")
+
 
 class SimpleGenderGuesser(GenderGuesser):
-    """Класс-определитель пола на основе окончаний ФИО."""
+    """Класс-определитель пола на основе окончаний ФИО.
 
-    SURNAME_ENDINGS: Final[list[str]] = ["ов", "ев", "ёв", "ин", "ын"]
+    Пол определяется в порядке убывания надежности: по окончанию отчества,
+    по словарю известных имен и отчеств, по окончанию фамилии и, наконец,
+    по окончанию имени. Результаты кэшируются: один и тот же преподаватель
+    обычно записан в регистрации у нескольких команд.
+    """
+
+    SURNAME_ENDINGS: Final[tuple[str, ...]] = ("ов", "ев", "ёв", "ин", "ын")
+    CACHE_SIZE: Final[int] = 4096
+
+    # Окончания собраны в кортежи, чтобы проверять их одним вызовом `str.endswith`.
+    _MALE_SURNAME_ENDINGS: Final[tuple[str, ...]] = SURNAME_ENDINGS
+    _FEMALE_SURNAME_ENDINGS: Final[tuple[str, ...]] = tuple(
+        ending + "а" for ending in SURNAME_ENDINGS
+    )
+    # Отчества, в том числе тюркские: `Мамед оглы`, `Алиевна`, `Гасан кызы`.
+    _MALE_PATRONYMIC_ENDINGS: Final[tuple[str, ...]] = ("ич", "оглы", "улы", "уулу")
+    _FEMALE_PATRONYMIC_ENDINGS: Final[tuple[str, ...]] = ("на", "кызы", "гызы")
+    _FEMALE_FIRST_NAME_ENDINGS: Final[tuple[str, ...]] = ("а", "я")
+
+    def __init__(self, known_names: Mapping[str, Gender] = KNOWN_FIRST_NAMES) -> None:
+        """Инициализирует определитель пола.
+
+        :known_names:
+        Имена и отчества в нижнем регистре с `е` вместо `ё`, пол которых известен
+        заранее (см. `load_known_names`). Используются, когда пол нельзя определить
+        по отчеству.
+        """
+        self._known_names = known_names
+        # Кэш у каждого экземпляра свой, так как зависит от словаря имен.
+        # `FullName` неизменяемый, поэтому сам служит ключом кэша.
+        self._guess_cached = lru_cache(maxsize=self.CACHE_SIZE)(self._guess)
 
     def guess_gender(self, fio: FullName) -> Gender:
         """Метод пытается определить пол на основании окончаний ФИО.
@@ -25,14 +110,32 @@ class SimpleGenderGuesser(GenderGuesser):
         Если не получилось однозначно определить пол,
         то возвращается мужской пол по умолчанию.
         """
-        if fio.patronymic and fio.patronymic[-1] == "а":
+        return self._guess_cached(fio)
+
+    def guess_genders(self, names: Iterable[FullName]) -> list[Gender]:
+        """Определяет пол каждого из переданных ФИО (см. `guess_gender`)."""
+        guess_cached = self._guess_cached
+        return [guess_cached(fio) for fio in names]
+
+    def _guess(self, fio: FullName) -> Gender:
+        last_name = _normalize(fio.last_name)
+        first_name = _normalize(fio.first_name)
+        patronymic = _normalize(fio.patronymic) if fio.patronymic else ""
+
+        if patronymic.endswith(self._FEMALE_PATRONYMIC_ENDINGS):
             return Gender.female
+        if patronymic.endswith(self._MALE_PATRONYMIC_ENDINGS):
+            return Gender.male
+
+        known_gender = self._known_names.get(first_name, self._known_names.get(patronymic))
+        if known_gender is not None:
+            return known_gender
 
-        if any(fio.last_name.endswith(ending) for ending in self.SURNAME_ENDINGS):
+        if last_name.endswith(self._MALE_SURNAME_ENDINGS):
             return Gender.male
-        if any(fio.last_name.endswith(ending + "а") for ending in self.SURNAME_ENDINGS):
+        if last_name.endswith(self._FEMALE_SURNAME_ENDINGS):
             return Gender.female
 
-        if fio.first_name.endswith(("а", "я")):
+        if first_name.endswith(self._FEMALE_FIRST_NAME_ENDINGS):
             return Gender.female
         return Gender.male
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import pathlib
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike
+from typing import Any, Final, Self
+
+from .pdf_generator import DocumentConverter
+
+# Сколько ждать, пока запущенный soffice начнет принимать подключения.
+_STARTUP_TIMEOUT: Final[float] = 60.0
+_CONNECT_RETRY_INTERVAL: Final[float] = 0.25
+_SHUTDOWN_TIMEOUT: Final[float] = 10.0
+
+_PDF_EXPORT_FILTER: Final[str] = "writer_pdf_Export"
+
+
+class LibreOfficeDocumentConverter(DocumentConverter):
+    """Конвертер документов в pdf-формат с помощью LibreOffice без графического интерфейса.
+
+    При входе в контекст запускается пул из `instances` процессов soffice, каждый
+    со своим профилем пользователя, и к каждому устанавливается UNO-подключение
+    через сокет. Процессы живут до выхода из контекста, поэтому время их запуска
+    (несколько секунд) тратится один раз, а не на каждый документ.
+
+    Примечание
+    ----------
+    Модуль `uno` поставляется вместе с LibreOffice, поэтому запускать приложение
+    нужно интерпретатором, который его видит (например, python из состава LibreOffice).
+    """
+
+    def __init__(self, soffice_path: str = "soffice", instances: int = 1) -> None:
+        """Инициализирует конвертер.
+
+        :soffice_path:
+        Путь к исполняемому файлу soffice или его имя, если он есть в PATH.
+
+        :instances:
+        Количество процессов soffice, между которыми распределяется конвертация.
+        """
+        self._soffice_path = soffice_path
+        self._instances_count = instances
+
+    def __enter__(self) -> Self:
+        self._instances: list[_SofficeInstance] = []
+        try:
+            for _ in range(self._instances_count):
+                instance = _SofficeInstance(self._soffice_path)
+                self._instances.append(instance)
+                instance.start()
+            for instance in self._instances:
+                instance.connect()
+        except BaseException:
+            self._stop_instances()
+            raise
+
+        self._free_instances: queue.Queue[_SofficeInstance] = queue.Queue()
+        for instance in self._instances:
+            self._free_instances.put(instance)
+        self._executor = ThreadPoolExecutor(len(self._instances))
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self._executor.shutdown()
+        self._stop_instances()
+
+    def convert_to_pdf(self, document_path: PathLike, output_path: PathLike) -> None:
+        """Сохраняет документ в pdf-формате через LibreOffice.
+
+        :document_path:
+        Путь к исходному документу.
+
+        :output_path:
+        Путь, по которому будет сохранен pdf-файл.
+        """
+        instance = self._free_instances.get()
+        try:
+            instance.convert_to_pdf(document_path, output_path)
+        finally:
+            self._free_instances.put(instance)
+
+    def convert_many_to_pdf(
+        self,
+        documents: Iterable[tuple[PathLike, PathLike]],
+    ) -> None:
+        """Сохраняет документы в pdf-формате, распределяя их между процессами soffice.
+
+        :documents:
+        Пары (путь к исходному документу, путь к pdf-файлу).
+        """
+        futures = [
+            self._executor.submit(self.convert_to_pdf, document_path, output_path)
+            for document_path, output_path in documents
+        ]
+        for future in futures:
+            future.result()
+
+    def _stop_instances(self) -> None:
+        for instance in self._instances:
+            instance.stop()
+        self._instances.clear()
+
+
+class _SofficeInstance:
+    """Один процесс soffice, принимающий UNO-подключения на отдельном порту."""
+
+    def __init__(self, soffice_path: str) -> None:
+        self._soffice_path = soffice_path
+        self._profile_dir: pathlib.Path | None = None
+        self._process: subprocess.Popen | None = None
+        self._desktop: Any = None
+
+    def start(self) -> None:
+        # Отдельный профиль нужен, чтобы несколько soffice не блокировали друг друга.
+        self._profile_dir = pathlib.Path(tempfile.mkdtemp(prefix="soffice-profile-"))
+        self._port = _find_free_port()
+        self._process = subprocess.Popen(
+            [
+                self._soffice_path,
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nolockcheck",
+                f"-env:UserInstallation={self._profile_dir.as_uri()}",
+                f"--accept=socket,host=127.0.0.1,port={self._port};urp;"
+                "StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def connect(self) -> None:
+        # uno доступен только в python, который видит установленный LibreOffice.
+        import uno
+        from com.sun.star.connection import NoConnectException
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context,
+        )
+        deadline = time.monotonic() + _STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self._port};urp;"
+                    "StarOffice.ComponentContext",
+                )
+                break
+            except NoConnectException:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    msg = f"Не удалось подключиться к {self._soffice_path}"
+                    raise RuntimeError(msg) from None
+                time.sleep(_CONNECT_RETRY_INTERVAL)
+
+        self._desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context,
+        )
+
+    def convert_to_pdf(self, document_path: PathLike, output_path: PathLike) -> None:
+        document = self._desktop.loadComponentFromURL(
+            pathlib.Path(document_path).resolve().as_uri(),
+            "_blank",
+            0,
+            _properties(Hidden=True, ReadOnly=True),
+        )
+        try:
+            document.storeToURL(
+                pathlib.Path(output_path).resolve().as_uri(),
+                _properties(FilterName=_PDF_EXPORT_FILTER),
+            )
+        finally:
+            document.close(True)
+
+    def stop(self) -> None:
+        if self._desktop is not None:
+            try:
+                self._desktop.terminate()
+            except Exception:
+                # Соединение с упавшим процессом уже разорвано, процесс завершается ниже.
+                pass
+            self._desktop = None
+        elif self._process is not None:
+            # К процессу не успели подключиться, попросить его завершиться через UNO нельзя.
+            self._process.terminate()
+
+        if self._process is not None:
+            try:
+                self._process.wait(_SHUTDOWN_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+        if self._profile_dir is not None:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+
+def _find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _properties(**values: Any) -> tuple[Any, ...]:
+    from com.sun.star.beans import PropertyValue
+
+    return tuple(PropertyValue(Name=name, Value=value) for name, value in values.items())
@@ -1,19 +1,14 @@
+import os
 import pathlib
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
 from enum import StrEnum
 from os import PathLike
-from typing import Self
+from typing import Any, ClassVar, Final, Self
 
-import win32com.client
-
-from certificates.models import Gender, Leader, Team
-from utils.com_types import (
-    Document,
-    WdFileFormat,
-    WdReplace,
-    WdSaveOptions,
-    WordApp,
-)
+from certificates.models import Gender, Leader, Student, Team
+from utils.com_types import WdFileFormat, WdSaveOptions, WordApp
+from utils.metrics import get_metrics
 
 
 class TextReplacements(StrEnum):
@@ -22,11 +17,112 @@ class TextReplacements(StrEnum):
     city = "CITY"
     school = "SCHOOL"
     honorific = "HONORIFIC"
+    teams = "TEAMS"
+
+
+# Подстановки, значения которых есть у сертификата участника и у благодарности.
+STUDENT_REPLACEMENTS: Final[frozenset[TextReplacements]] = frozenset(
+    {
+        TextReplacements.fio,
+        TextReplacements.grade,
+        TextReplacements.city,
+        TextReplacements.school,
+    },
+)
+LEADER_REPLACEMENTS: Final[frozenset[TextReplacements]] = frozenset(
+    {TextReplacements.fio, TextReplacements.honorific, TextReplacements.teams},
+)
+# Без этих подстановок документ не имеет смысла, их отсутствие в шаблоне - ошибка.
+REQUIRED_REPLACEMENTS: Final[frozenset[TextReplacements]] = frozenset(
+    {TextReplacements.fio},
+)
+
+
+class TemplateCache:
+    """Подготовленные шаблоны, общие для нескольких генераторов сертификатов.
+
+    Пакетный запуск создает генератор на каждое задание, а шаблоны разных заданий
+    часто совпадают. Генераторы, получившие кэш, разбирают и готовят каждый шаблон
+    один раз, поэтому файлы шаблонов не должны меняться, пока кэш используется.
+
+    Шаблоны хранятся только в процессе, создавшем кэш: копия кэша, переданная
+    в процесс генерации (см. `render_in_pool`), пуста.
+    """
+
+    def __init__(self) -> None:
+        self._templates: dict[tuple[str, pathlib.Path], Any] = {}
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Подготовленные шаблоны могут держать открытые документы, которые не копируются.
+        return {"_templates": {}}
+
+    def get(self, kind: str, template_path: PathLike) -> Any | None:
+        """Возвращает подготовленный шаблон или None, если его еще нет в кэше.
+
+        :kind:
+        Вид подготовки: один файл шаблона разные генераторы готовят по-разному.
+
+        :template_path:
+        Путь к файлу шаблона.
+        """
+        return self._templates.get((kind, pathlib.Path(template_path).resolve()))
+
+    def add(self, kind: str, template_path: PathLike, template: Any) -> None:
+        """Сохраняет подготовленный шаблон (параметры те же, что у `get`)."""
+        self._templates[kind, pathlib.Path(template_path).resolve()] = template
+
+    def close(self) -> None:
+        """Освобождает шаблоны, которые держат открытые документы, и очищает кэш."""
+        for template in self._templates.values():
+            close = getattr(template, "close", None)
+            if close is not None:
+                close()
+        self._templates.clear()
 
 
 class CertificateGenerator(ABC):
     """Абстрактный класс генератора сертификатов."""
 
+    OUTPUT_SUFFIX: ClassVar[str] = ".pdf"
+    # Сколько команд или преподавателей выгодно передавать в пакетные методы за раз.
+    # Генераторы, которые не умеют обрабатывать пакеты быстрее, оставляют 1.
+    BATCH_SIZE: ClassVar[int] = 1
+    # Умеет ли генератор возвращать документы в памяти, не записывая их в файлы
+    # (см. `render_students_certificates`).
+    RENDERS_IN_MEMORY: ClassVar[bool] = False
+
+    def __init__(
+        self,
+        participation_cert_template_path: PathLike,
+        appreciation_cert_template_path: PathLike,
+        template_cache: TemplateCache | None = None,
+    ) -> None:
+        """Инициализирует генератор сертификатов на основе путей к файлам-шаблонам.
+
+        :participation_cert_template_path:
+        Путь к шаблону сертификаты участника.
+
+        :appreciation_cert_template_path:
+        Путь к шаблону благодарственного письма.
+
+        :template_cache:
+        Кэш шаблонов, общий с другими генераторами. Без него шаблоны загружаются
+        заново при каждом входе в контекст генератора.
+        """
+        self._participation_cert_template_path = participation_cert_template_path
+        self._appreciation_cert_template_path = appreciation_cert_template_path
+        self._template_cache = template_cache
+
+    @property
+    def participation_cert_template_path(self) -> PathLike:
+        """Путь к шаблону сертификата участника."""
+        return self._participation_cert_template_path
+
+    @property
+    def appreciation_cert_template_path(self) -> PathLike:
+        """Путь к шаблону благодарственного письма."""
+        return self._appreciation_cert_template_path
+
     @abstractmethod
     def __enter__(self) -> Self: ...
 
@@ -53,6 +149,7 @@ class CertificateGenerator(ABC):
         self,
         leader: Leader,
         output_directory: PathLike,
+        teams: Sequence[Team] = (),
     ) -> None:
         """Генерирует благодарственные письмо преподавателю на основе файла-шаблона.
 
@@ -61,92 +158,225 @@ class CertificateGenerator(ABC):
 
         :output_directory:
         Путь, по которому будет сохранено благодарственное письмо преподавателю.
+
+        :teams:
+        Команды, которые ведет преподаватель. Перечисляются в письме на месте `{TEAMS}`.
         """
 
+    def render_students_certificates(self, team: Team) -> dict[str, bytes]:
+        """Возвращает содержимое сертификатов участников команды по именам их файлов.
 
-# TODO(idris): Попытаться заменить на кроссплатформенное решение.
-class PdfCertificateGenerator(CertificateGenerator):
-    """Генератор сертификатов в pdf-формате на основе файлов-шаблонов."""
+        Поддерживается генераторами с `RENDERS_IN_MEMORY`. Одноименные участники
+        получают один общий сертификат, как при записи в файлы.
 
-    def __init__(
+        :team:
+        Команда, для участников которой генерируются сертификаты.
+        """
+        msg = f"{type(self).__name__} не умеет генерировать документы в памяти"
+        raise NotImplementedError(msg)
+
+    def render_appreciation_certificate(
         self,
-        participation_cert_template_path: PathLike,
-        appreciation_cert_template_path: PathLike,
+        leader: Leader,
+        teams: Sequence[Team] = (),
+    ) -> bytes:
+        """Возвращает благодарственное письмо преподавателю, не записывая его в файл.
+
+        Поддерживается генераторами с `RENDERS_IN_MEMORY`.
+
+        :leader:
+        Преподаватель, для которого генерируется благодарственное письмо.
+
+        :teams:
+        Команды, которые ведет преподаватель.
+        """
+        msg = f"{type(self).__name__} не умеет генерировать документы в памяти"
+        raise NotImplementedError(msg)
+
+    def generate_students_certificates(
+        self,
+        teams: Iterable[tuple[Team, PathLike]],
     ) -> None:
-        """Инициализирует генератор сертификатов на основе путей к файлам-шаблонам.
+        """Генерирует сертификаты участников нескольких команд.
 
-        :participation_cert_template_path:
-        Путь к шаблону сертификаты участника.
+        Наследники переопределяют этот метод, если могут сгенерировать документы
+        пакетом быстрее, чем по одному. По умолчанию команды обрабатываются по очереди.
 
-        :appreciation_cert_template_path:
-        Путь к шаблону благодарственного письма.
+        :teams:
+        Пары (команда, путь, по которому сохраняются сертификаты команды).
         """
-        self._participation_cert_template_path = participation_cert_template_path
-        self._appreciation_cert_template_path = appreciation_cert_template_path
+        for team, output_directory in teams:
+            self.generate_students_certificate(team, output_directory)
 
-    def __enter__(self) -> Self:
-        self._app: WordApp = win32com.client.gencache.EnsureDispatch("Word.Application")
-        return self
+    def generate_appreciation_certificates(
+        self,
+        leaders: Iterable[tuple[Leader, PathLike, Sequence[Team]]],
+    ) -> None:
+        """Генерирует благодарственные письма нескольким преподавателям.
 
-    def __exit__(self, type, value, traceback) -> None:
-        self._app.Quit()
+        По умолчанию письма генерируются по очереди.
 
-    def generate_students_certificate(
+        :leaders:
+        Тройки (преподаватель, путь для сохранения письма, команды преподавателя).
+        """
+        for leader, output_directory, teams in leaders:
+            self.generate_appreciation_certificate(leader, output_directory, teams)
+
+
+class DocumentConverter(ABC):
+    """Абстрактный класс конвертера документов в pdf-формат."""
+
+    @abstractmethod
+    def __enter__(self) -> Self: ...
+
+    @abstractmethod
+    def __exit__(self, type, value, traceback) -> None: ...
+
+    @abstractmethod
+    def convert_to_pdf(self, document_path: PathLike, output_path: PathLike) -> None:
+        """Сохраняет документ в pdf-формате.
+
+        :document_path:
+        Путь к исходному документу.
+
+        :output_path:
+        Путь, по которому будет сохранен pdf-файл.
+        """
+
+    def convert_many_to_pdf(
         self,
-        team: Team,
-        output_directory: PathLike,
+        documents: Iterable[tuple[PathLike, PathLike]],
     ) -> None:
-        """Генерирует сертификаты участников в формате pdf для каждого члена команды.
+        """Сохраняет несколько документов в pdf-формате.
 
-        :team:
-        Команда, для участников которой генерируются сертификаты.
+        Конвертеры, умеющие обрабатывать документы параллельно, переопределяют
+        этот метод, по умолчанию документы конвертируются по одному.
 
-        :output_directory:
-        Путь, по которому сохраняются сгенерированные сертификаты.
+        :documents:
+        Пары (путь к исходному документу, путь к pdf-файлу).
         """
-        for student in team.members:
-            student_cert_path = pathlib.Path(output_directory) / str(student.full_name)
-            doc = self._app.Documents.Open(str(self._participation_cert_template_path))
+        for document_path, output_path in documents:
+            self.convert_to_pdf(document_path, output_path)
 
-            self._replace_text(doc, TextReplacements.fio, str(student.full_name))
-            self._replace_text(doc, TextReplacements.grade, student.grade)
-            self._replace_text(doc, TextReplacements.city, team.city)
-            self._replace_text(doc, TextReplacements.school, team.school)
 
-            doc.SaveAs(str(student_cert_path), FileFormat=WdFileFormat.wdFormatPDF)
-            doc.Close(WdSaveOptions.wdDoNotSaveChanges)
+class SharedDocumentConverter(DocumentConverter):
+    """Конвертер, который остается запущенным между входами в контекст.
 
-    def generate_appreciation_certificate(
+    Несколько генераторов по очереди пользуются одним конвертером: он запускается
+    при первом входе в контекст, выход из контекста его не останавливает,
+    а останавливает только `close`. Так Word или LibreOffice запускается один раз
+    на весь пакетный запуск, а не на каждое задание.
+
+    Копия конвертера в другом процессе (см. `render_in_pool`) ведет себя как обычный
+    конвертер: запускается при входе в контекст и останавливается при выходе.
+    """
+
+    def __init__(self, converter: DocumentConverter) -> None:
+        """Инициализирует общий конвертер.
+
+        :converter:
+        Конвертер, контекст которого открывается при первом использовании.
+        """
+        self._converter = converter
+        self._owner_pid = os.getpid()
+        self._started = False
+
+    def __enter__(self) -> Self:
+        if os.getpid() != self._owner_pid:
+            self._converter.__enter__()
+        elif not self._started:
+            self._converter.__enter__()
+            self._started = True
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        if os.getpid() != self._owner_pid:
+            self._converter.__exit__(type, value, traceback)
+
+    def close(self) -> None:
+        """Останавливает конвертер, если он был запущен."""
+        if self._started:
+            self._started = False
+            self._converter.__exit__(None, None, None)
+
+    def convert_to_pdf(self, document_path: PathLike, output_path: PathLike) -> None:
+        """Сохраняет документ в pdf-формате запущенным конвертером.
+
+        :document_path:
+        Путь к исходному документу.
+
+        :output_path:
+        Путь, по которому будет сохранен pdf-файл.
+        """
+        self._converter.convert_to_pdf(document_path, output_path)
+
+    def convert_many_to_pdf(
         self,
-        leader: Leader,
-        output_directory: PathLike,
+        documents: Iterable[tuple[PathLike, PathLike]],
     ) -> None:
-        """Генерирует сертификаты участников в формате pdf для каждого члена команды.
+        """Сохраняет несколько документов в pdf-формате запущенным конвертером.
 
-        :leader:
-        Преподаватель, для которого генерируется благодарственнео письмо.
+        :documents:
+        Пары (путь к исходному документу, путь к pdf-файлу).
+        """
+        self._converter.convert_many_to_pdf(documents)
 
-        :output_directory:
-        Путь, по которому будет сохранен сгенерированный документ.
+
+class WordDocumentConverter(DocumentConverter):
+    """Конвертер документов в pdf-формат с помощью MS Word."""
+
+    def __enter__(self) -> Self:
+        # win32com доступен только на Windows, поэтому импортируется при запуске Word,
+        # чтобы модуль с базовым классом генератора можно было загрузить на любой ОС.
+        import win32com.client
+
+        self._app: WordApp = win32com.client.gencache.EnsureDispatch("Word.Application")
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self._app.Quit()
+
+    def convert_to_pdf(self, document_path: PathLike, output_path: PathLike) -> None:
+        """Сохраняет документ в pdf-формате через MS Word.
+
+        :document_path:
+        Путь к исходному документу.
+
+        :output_path:
+        Путь, по которому будет сохранен pdf-файл.
         """
-        doc = self._app.Documents.Open(str(self._appreciation_cert_template_path))
-
-        self._replace_text(doc, TextReplacements.fio, str(leader.full_name))
-
-        honorific = "Уважаемый" if leader.gender == Gender.male else "Уважаемая"
-        self._replace_text(doc, TextReplacements.honorific, honorific)
-
-        doc.SaveAs(
-            str(pathlib.Path(output_directory) / str(leader.full_name)),
-            FileFormat=WdFileFormat.wdFormatPDF,
-        )
-        doc.Close(WdSaveOptions.wdDoNotSaveChanges)
-
-    @staticmethod
-    def _replace_text(doc: Document, text: str, replace_with: str) -> None:
-        doc.Content.Find.Execute(
-            FindText=f"{{{text}}}",
-            Forward=True,
-            ReplaceWith=replace_with,
-            Replace=WdReplace.wdReplaceAll,
-        )
+        with get_metrics().timed("word.convert", pathlib.Path(output_path).name):
+            # Word разрешает относительные пути от своей рабочей папки, а не от нашей.
+            doc = self._app.Documents.Open(str(pathlib.Path(document_path).resolve()))
+            doc.SaveAs(
+                str(pathlib.Path(output_path).resolve()),
+                FileFormat=WdFileFormat.wdFormatPDF,
+            )
+            doc.Close(WdSaveOptions.wdDoNotSaveChanges)
+
+
+def get_honorific(leader: Leader) -> str:
+    """Возвращает обращение к преподавателю с учетом его пола."""
+    return "Уважаемый" if leader.gender == Gender.male else "Уважаемая"
+
+
+def get_student_replacements(team: Team, student: Student) -> dict[TextReplacements, str]:
+    """Возвращает значения подстановок для сертификата участника команды."""
+    return {
+        TextReplacements.fio: str(student.full_name),
+        TextReplacements.grade: student.grade,
+        TextReplacements.city: team.city,
+        TextReplacements.school: team.school,
+    }
+
+
+def get_leader_replacements(
+    leader: Leader,
+    teams: Sequence[Team] = (),
+) -> dict[TextReplacements, str]:
+    """Возвращает значения подстановок для благодарственного письма преподавателю."""
+    return {
+        TextReplacements.fio: str(leader.full_name),
+        TextReplacements.honorific: get_honorific(leader),
+        TextReplacements.teams: ", ".join(team.name for team in teams),
+    }
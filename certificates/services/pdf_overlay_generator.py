@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import pathlib
+import re
+import tempfile
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from os import PathLike
+from typing import Self
+
+import pymupdf
+
+from certificates.models import Leader, Team
+from utils.metrics import get_metrics
+
+from .docx_template import DocxTemplate, load_certificate_templates
+from .pdf_generator import (
+    CertificateGenerator,
+    DocumentConverter,
+    TemplateCache,
+    TextReplacements,
+    get_leader_replacements,
+    get_student_replacements,
+)
+
+
+@dataclass
+class PlaceholderLayout:
+    """Положение подстановки на странице pdf-шаблона.
+
+    :page_number:
+    Номер страницы (с 0).
+
+    :bbox:
+    Прямоугольник `(x0, y0, x1, y1)`, который занимал текст подстановки.
+
+    :baseline:
+    Координата базовой линии текста подстановки.
+
+    :font_size:
+    Размер шрифта подстановки.
+
+    :color:
+    Цвет текста в виде `(r, g, b)`, компоненты от 0 до 1.
+
+    :alignment:
+    Выравнивание абзаца подстановки в .docx шаблоне (`left`, `center`, `right`, ...).
+    """
+
+    page_number: int
+    bbox: tuple[float, float, float, float]
+    baseline: float
+    font_size: float
+    color: tuple[float, float, float]
+    alignment: str
+
+
+class PdfTemplate:
+    """Подготовленный pdf-шаблон: страницы без подстановок и положения подстановок.
+
+    Каждый документ собирается из страниц шаблона, которые встраиваются как
+    Form XObject без перекодирования изображений и шрифтов, и текста подстановок,
+    который накладывается поверх них.
+    """
+
+    def __init__(
+        self,
+        base_pdf: bytes,
+        layouts: Mapping[TextReplacements, list[PlaceholderLayout]],
+        font: pymupdf.Font,
+    ) -> None:
+        """Инициализирует шаблон.
+
+        :base_pdf:
+        Содержимое pdf-файла шаблона, в котором на месте подстановок пусто.
+
+        :layouts:
+        Положения подстановок на страницах шаблона.
+
+        :font:
+        Шрифт, которым печатаются значения подстановок.
+        """
+        self._base = pymupdf.open("pdf", base_pdf)
+        self._layouts = layouts
+        self._font = font
+
+    @classmethod
+    def prepare(
+        cls,
+        docx_template: DocxTemplate,
+        converter: DocumentConverter,
+        font: pymupdf.Font,
+    ) -> PdfTemplate:
+        """Готовит pdf-шаблон на основе .docx шаблона.
+
+        Шаблон конвертируется в pdf дважды: как есть, чтобы найти положение, размер
+        и цвет текста подстановок, и с пустыми подстановками - это и есть основа
+        для всех документов.
+
+        :docx_template:
+        Загруженный .docx шаблон.
+
+        :converter:
+        Конвертер документов в pdf, контекст которого уже открыт.
+
+        :font:
+        Шрифт, которым печатаются значения подстановок.
+        """
+        template_path = docx_template.path
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            probe_pdf_path = pathlib.Path(work_dir) / "probe.pdf"
+            converter.convert_to_pdf(template_path, probe_pdf_path)
+
+            blank_docx_path = pathlib.Path(work_dir) / "blank.docx"
+            docx_template.save(
+                blank_docx_path,
+                {replacement: "" for replacement in docx_template.replacements},
+            )
+            blank_pdf_path = pathlib.Path(work_dir) / "blank.pdf"
+            converter.convert_to_pdf(blank_docx_path, blank_pdf_path)
+
+            with pymupdf.open(probe_pdf_path) as probe:
+                layouts = _find_placeholders(probe, docx_template.alignments)
+            base_pdf = blank_pdf_path.read_bytes()
+
+        missing = docx_template.replacements - layouts.keys()
+        if missing:
+            names = ", ".join(sorted(f"{{{replacement}}}" for replacement in missing))
+            msg = f"Подстановки {names} не найдены в pdf-версии шаблона {template_path}"
+            raise ValueError(msg)
+
+        return cls(base_pdf, layouts, font)
+
+    def close(self) -> None:
+        """Закрывает pdf-документ шаблона. После этого шаблон нельзя использовать."""
+        self._base.close()
+
+    def render(self, values: Mapping[TextReplacements, str]) -> bytes:
+        """Возвращает содержимое pdf-документа с подставленными значениями.
+
+        Подстановки, для которых значение не передано, остаются пустыми.
+        """
+        with pymupdf.open() as document:
+            for base_page in self._base:
+                page = document.new_page(
+                    width=base_page.rect.width, height=base_page.rect.height,
+                )
+                page.show_pdf_page(page.rect, self._base, base_page.number)
+
+            for replacement, layouts in self._layouts.items():
+                value = values.get(replacement)
+                if not value:
+                    continue
+                for layout in layouts:
+                    self._draw_text(document[layout.page_number], layout, value)
+
+            document.subset_fonts()
+            return document.tobytes(garbage=3, deflate=True)
+
+    def _draw_text(
+        self,
+        page: pymupdf.Page,
+        layout: PlaceholderLayout,
+        value: str,
+    ) -> None:
+        x0, _, x1, _ = layout.bbox
+        width = self._font.text_length(value, fontsize=layout.font_size)
+        match layout.alignment:
+            case "center":
+                x = (x0 + x1 - width) / 2
+            case "right" | "end":
+                x = x1 - width
+            case _:
+                x = x0
+
+        writer = pymupdf.TextWriter(page.rect)
+        writer.append(
+            (x, layout.baseline), value, font=self._font, fontsize=layout.font_size,
+        )
+        writer.write_text(page, color=layout.color)
+
+
+class PdfOverlayCertificateGenerator(CertificateGenerator):
+    """Генератор сертификатов, накладывающий значения на заранее подготовленный pdf.
+
+    Каждый шаблон конвертируется в pdf один раз при входе в контекст, после чего
+    сертификаты собираются без участия конвертера: на общую страницу шаблона
+    накладывается только текст подстановок.
+
+    Примечание
+    ----------
+    Значения печатаются шрифтом `font_path`, а положение и размер берутся из шаблона.
+    Подстановки лучше располагать в отдельных абзацах: текст, стоящий в одной строке
+    с подстановкой, при разной длине значений не сдвигается.
+    """
+
+    def __init__(
+        self,
+        participation_cert_template_path: PathLike,
+        appreciation_cert_template_path: PathLike,
+        font_path: PathLike,
+        converter: DocumentConverter,
+        template_cache: TemplateCache | None = None,
+    ) -> None:
+        """Инициализирует генератор сертификатов на основе путей к файлам-шаблонам.
+
+        :participation_cert_template_path:
+        Путь к шаблону сертификаты участника.
+
+        :appreciation_cert_template_path:
+        Путь к шаблону благодарственного письма.
+
+        :font_path:
+        Путь к файлу шрифта (.ttf/.otf), которым печатаются значения подстановок.
+
+        :converter:
+        Конвертер, с помощью которого шаблоны один раз переводятся в pdf.
+
+        :template_cache:
+        Кэш шаблонов, общий с другими генераторами. Шаблоны из кэша не конвертируются
+        повторно, и конвертер тогда не запускается вовсе.
+        """
+        super().__init__(
+            participation_cert_template_path, appreciation_cert_template_path, template_cache,
+        )
+        self._font_path = font_path
+        self._converter = converter
+
+    def __enter__(self) -> Self:
+        metrics = get_metrics()
+        font = pymupdf.Font(fontfile=str(self._font_path))
+        # Подстановки проверяются до запуска конвертера, чтобы ошибка в шаблоне
+        # обнаруживалась сразу.
+        docx_templates = load_certificate_templates(
+            self._participation_cert_template_path,
+            self._appreciation_cert_template_path,
+            self._template_cache,
+        )
+        # Без общего кэша шаблоны готовятся заново при каждом входе в контекст
+        # и закрываются при выходе из него.
+        self._own_template_cache = None if self._template_cache else TemplateCache()
+        template_cache = self._template_cache or self._own_template_cache
+        # Положение подстановок зависит от шаблона, а печатаются они шрифтом генератора.
+        kind = f"pdf-overlay:{pathlib.Path(self._font_path).resolve()}"
+        missing = [
+            docx_template for docx_template in docx_templates
+            if template_cache.get(kind, docx_template.path) is None
+        ]
+        if missing:
+            with self._converter as converter:
+                for docx_template in missing:
+                    with metrics.timed("overlay.prepare", str(docx_template.path)):
+                        template_cache.add(
+                            kind,
+                            docx_template.path,
+                            PdfTemplate.prepare(docx_template, converter, font),
+                        )
+        self._participation_template, self._appreciation_template = (
+            template_cache.get(kind, docx_template.path) for docx_template in docx_templates
+        )
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        del self._participation_template
+        del self._appreciation_template
+        if self._own_template_cache is not None:
+            self._own_template_cache.close()
+
+    def generate_students_certificate(
+        self,
+        team: Team,
+        output_directory: PathLike,
+    ) -> None:
+        """Генерирует сертификаты участников в формате pdf для каждого члена команды.
+
+        :team:
+        Команда, для участников которой генерируются сертификаты.
+
+        :output_directory:
+        Путь, по которому сохраняются сгенерированные сертификаты.
+        """
+        metrics = get_metrics()
+        for student in team.members:
+            with metrics.timed("overlay.render", str(student.full_name)):
+                cert = self._participation_template.render(
+                    get_student_replacements(team, student),
+                )
+            student_cert_path = (
+                pathlib.Path(output_directory) / f"{student.full_name}{self.OUTPUT_SUFFIX}"
+            )
+            student_cert_path.write_bytes(cert)
+
+    def generate_appreciation_certificate(
+        self,
+        leader: Leader,
+        output_directory: PathLike,
+        teams: Sequence[Team] = (),
+    ) -> None:
+        """Генерирует благодарственное письмо преподавателю в формате pdf.
+
+        :leader:
+        Преподаватель, для которого генерируется благодарственное письмо.
+
+        :output_directory:
+        Путь, по которому будет сохранен сгенерированный документ.
+
+        :teams:
+        Команды, которые ведет преподаватель.
+        """
+        with get_metrics().timed("overlay.render", str(leader.full_name)):
+            cert = self._appreciation_template.render(get_leader_replacements(leader, teams))
+        leader_cert_path = (
+            pathlib.Path(output_directory) / f"{leader.full_name}{self.OUTPUT_SUFFIX}"
+        )
+        leader_cert_path.write_bytes(cert)
+
+
+_PLACEHOLDER_RE = re.compile(
+    "|".join(re.escape(f"{{{replacement}}}") for replacement in TextReplacements),
+)
+
+
+def _find_placeholders(
+    document: pymupdf.Document,
+    alignments: Mapping[TextReplacements, str],
+) -> dict[TextReplacements, list[PlaceholderLayout]]:
+    """Находит подстановки в тексте pdf-документа с точностью до символа."""
+    layouts: dict[TextReplacements, list[PlaceholderLayout]] = {}
+
+    for page in document:
+        for block in page.get_text("rawdict")["blocks"]:
+            for line in block.get("lines", []):
+                chars = [
+                    (char, span) for span in line["spans"] for char in span["chars"]
+                ]
+                text = "".join(char["c"] for char, _ in chars)
+
+                for placeholder in _PLACEHOLDER_RE.finditer(text):
+                    replacement = TextReplacements(placeholder.group()[1:-1])
+                    placeholder_chars = chars[placeholder.start():placeholder.end()]
+                    first_char, span = placeholder_chars[0]
+                    bbox = pymupdf.Rect(first_char["bbox"])
+                    for char, _ in placeholder_chars[1:]:
+                        bbox |= char["bbox"]
+
+                    layouts.setdefault(replacement, []).append(
+                        PlaceholderLayout(
+                            page_number=page.number,
+                            bbox=tuple(bbox),
+                            baseline=first_char["origin"][1],
+                            font_size=span["size"],
+                            color=pymupdf.sRGB_to_pdf(span["color"]),
+                            alignment=alignments.get(replacement, "left"),
+                        ),
+                    )
+
+    return layouts
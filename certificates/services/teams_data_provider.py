@@ -1,17 +1,30 @@
+from __future__ import annotations
+
+import threading
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import nullcontext
 from enum import IntEnum
+from itertools import islice
 from os import PathLike
-
-import xlwings as xw
+from typing import TYPE_CHECKING
 
 from certificates.models import FullName, Leader, Student, Team
+from certificates.team_filter import ALL_TEAMS, TeamFilter
+from certificates.team_table import TeamTable
+from utils.metrics import get_metrics
 from utils.strings import (
+    intern_if_str,
     sanitize_string,
     try_extract_number_as_str,
 )
+from utils.xlsx import CellValue
 
 from .gender_guesser import GenderGuesser
 
+if TYPE_CHECKING:
+    import xlwings as xw
+
 
 class Columns(IntEnum):
     city = 3
@@ -32,13 +45,77 @@ class TeamsDataProvider(ABC):
     """
 
     @abstractmethod
-    def get_data(self) -> list[Team]:
-        """Возвращает список всех команд."""
+    def get_data(self, team_filter: TeamFilter = ALL_TEAMS) -> list[Team]:
+        """Возвращает список команд, подходящих под фильтр, по умолчанию - всех.
+
+        Провайдеры применяют фильтр как можно раньше: не считывают листы
+        неподходящих классов и не разбирают строки неподходящих команд.
+        """
+
+    def iter_data(self, team_filter: TeamFilter = ALL_TEAMS) -> Iterator[Team]:
+        """Возвращает команды по одной, по мере их считывания.
+
+        Провайдеры, которые умеют читать источник по частям, переопределяют этот метод,
+        чтобы первые команды можно было обрабатывать, не дожидаясь чтения остальных.
+        """
+        yield from self.get_data(team_filter)
+
+    def get_table(self, team_filter: TeamFilter = ALL_TEAMS) -> TeamTable:
+        """Возвращает команды в компактной таблице (см. `TeamTable`).
+
+        Команды добавляются в таблицу по мере считывания, поэтому их объекты
+        не хранятся в памяти все одновременно.
+        """
+        return TeamTable.from_teams(self.iter_data(team_filter))
+
+class ExcelSession:
+    """Excel, в котором по очереди читаются несколько файлов регистрации.
+
+    Провайдеры, получившие сеанс, открывают книги в его Excel, а не запускают
+    собственный. Excel запускается при первом обращении и работает до `close`.
+
+    Объекты COM нельзя передавать между потоками, поэтому Excel сеанса доступен
+    только в потоке, который его запустил. В других потоках (например, при чтении
+    регистрации параллельно с генерацией) провайдер запускает собственный Excel.
+    """
+
+    def __init__(self) -> None:
+        self._app: xw.App | None = None
+        self._thread_id: int | None = None
+
+    def get_app(self) -> xw.App | None:
+        """Возвращает Excel сеанса, запуская его при первом вызове, или None в другом потоке."""
+        if self._thread_id is None:
+            import pythoncom
+            import xlwings as xw
+
+            # COM остается инициализированным, пока Excel сеанса запущен.
+            pythoncom.CoInitialize()
+            self._thread_id = threading.get_ident()
+            self._app = xw.App(visible=False)
+        if self._thread_id != threading.get_ident():
+            return None
+        return self._app
+
+    def close(self) -> None:
+        """Закрывает Excel, если он был запущен."""
+        if self._app is not None:
+            import pythoncom
+
+            self._app.quit()
+            self._app = None
+            pythoncom.CoUninitialize()
+
 
 class ExcelTeamsDataProvider(TeamsDataProvider):
     """Провайдер данных о командах, использующий в качестве источника файлы Excel."""
 
-    def __init__(self, filepath: PathLike, gender_guesser: GenderGuesser) -> None:
+    def __init__(
+        self,
+        filepath: PathLike,
+        gender_guesser: GenderGuesser,
+        session: ExcelSession | None = None,
+    ) -> None:
         """Инициализирует экземпляр провайдера на основе Excel-файла.
 
         :filepath:
@@ -46,93 +123,176 @@ class ExcelTeamsDataProvider(TeamsDataProvider):
 
         :gender_guesser:
         Экзмепляр сервиса-опеределителя пола по ФИО.
+
+        :session:
+        Сеанс Excel, общий с другими провайдерами. Без него Excel запускается
+        заново при каждом чтении файла.
         """
         self._filepath = filepath #TODO(idris): Валидация пути
-        self._gender_guesser = gender_guesser
+        self._parser = TeamsTableParser(gender_guesser)
+        self._session = session
 
-    def get_data(self) -> list[Team]:
+    def get_data(self, team_filter: TeamFilter = ALL_TEAMS) -> list[Team]:
         """Считывает данные о командах из Excel-файла.
 
         Замечание
         ---------
         Считанные данные не кэшируются, файл обрабатывается повторно при каждом вызове.
         """
-        with xw.App(visible=False):
-            book = xw.Book(self._filepath)
-            teams: list[Team] = []
+        return list(self.iter_data(team_filter))
+
+    def iter_data(self, team_filter: TeamFilter = ALL_TEAMS) -> Iterator[Team]:
+        """Считывает команды из Excel-файла, возвращая их после чтения каждого листа."""
+        # xlwings требует установленного Excel, поэтому импортируется только здесь.
+        import pythoncom
+        import xlwings as xw
 
-            sheet: xw.Sheet
-            for sheet in book.sheets:
-                teams.extend(self._process_sheet(sheet))
+        # Команды могут перебираться в фоновом потоке, где COM еще не инициализирован.
+        pythoncom.CoInitialize()
+        try:
+            metrics = get_metrics()
+            session_app = None if self._session is None else self._session.get_app()
+            with (
+                xw.App(visible=False) if session_app is None else nullcontext(session_app)
+            ) as app:
+                with metrics.timed("excel.open", str(self._filepath)):
+                    book = app.books.open(self._filepath)
 
-            book.close()
-            return teams
+                # Книга закрывается и при ошибке: Excel сеанса продолжает работать.
+                try:
+                    sheet: xw.Sheet
+                    for sheet in book.sheets:
+                        grade = try_extract_number_as_str(sheet.name, default_str="5")
+                        # Листы других классов не считываются из Excel вовсе.
+                        if not team_filter.accepts_grade(grade):
+                            continue
+                        yield from metrics.timed_iter(
+                            "parse.sheet",
+                            sheet.name,
+                            self._process_sheet(sheet, grade, team_filter),
+                        )
+                finally:
+                    book.close()
+        finally:
+            pythoncom.CoUninitialize()
 
-    def _process_sheet(self, sheet: xw.Sheet) -> list[Team]:
-        teams: list[Team] = []
-        grade = try_extract_number_as_str(sheet.name, default_str="5")
+    def _process_sheet(
+        self, sheet: xw.Sheet, grade: str, team_filter: TeamFilter,
+    ) -> Iterator[Team]:
+        # Лист считывается одним обращением к Excel, дальше разбор идет в памяти.
+        with get_metrics().timed("excel.read_sheet", sheet.name):
+            last_row = max(sheet.used_range.last_cell.row, START_ROW)
+            rows = sheet.range((START_ROW, 1), (last_row, Columns.leader)).options(ndim=2).value
 
-        row_idx = START_ROW
-        while sheet.cells(row_idx, 1).value.strip() != TABLE_EOF:
-            teams.append(
-                self._extract_team(sheet, grade, row_idx, Team.MEMBERS_PER_TEAM),
-            )
-            row_idx += Team.MEMBERS_PER_TEAM
+        return self._parser.iter_parse(rows, grade, team_filter)
 
-        return teams
 
-    def _extract_team(
+class TeamsTableParser:
+    """Разбирает уже считанную в память таблицу регистрации на команды.
+
+    Таблица передается построчно, начиная со строки `START_ROW`. Каждая строка содержит
+    значения столбцов с первого по `Columns.leader` включительно. Команды занимают
+    блоки по `Team.MEMBERS_PER_TEAM` строк, таблица заканчивается строкой,
+    в первом столбце которой стоит `TABLE_EOF`, либо последней строкой данных.
+    """
+
+    def __init__(self, gender_guesser: GenderGuesser) -> None:
+        """Инициализирует разборщик таблицы.
+
+        :gender_guesser:
+        Экземпляр сервиса-определителя пола по ФИО.
+        """
+        self._gender_guesser = gender_guesser
+
+    def parse(
         self,
-        sheet: xw.Sheet,
+        rows: Iterable[Sequence[CellValue]],
         grade: str,
-        start_row: int,
-        members_count: int,
-    ) -> Team:
-        team_name = sheet.cells(start_row, Columns.team).value
-        school = sheet.cells(start_row, Columns.school).value
-        city = sheet.cells(start_row, Columns.city).value
-
-        leaders = self._extract_leaders(sheet, start_row)
-        team_members = self._extract_team_members(
-            sheet,
-            grade,
-            start_row,
-            members_count,
-        )
+        team_filter: TeamFilter = ALL_TEAMS,
+    ) -> list[Team]:
+        """Возвращает команды, записанные в таблице.
 
-        return Team(
-            name=team_name,
-            school=school,
-            city=city,
-            members=team_members,
-            leaders=leaders,
+        :rows:
+        Строки таблицы, начиная со строки `START_ROW`.
+
+        :grade:
+        Класс, в котором учатся участники команд таблицы.
+
+        :team_filter:
+        Фильтр команд. Класс таблицы с фильтром не сверяется: листы неподходящих
+        классов провайдеры отбрасывают еще до чтения.
+        """
+        return list(self.iter_parse(rows, grade, team_filter))
+
+    def iter_parse(
+        self,
+        rows: Iterable[Sequence[CellValue]],
+        grade: str,
+        team_filter: TeamFilter = ALL_TEAMS,
+    ) -> Iterator[Team]:
+        """Возвращает команды таблицы по одной, считывая строки по мере необходимости.
+
+        Параметры те же, что у `parse`.
+        """
+        check_fields = not team_filter.is_empty
+        for team_rows in self._split_teams(iter(rows)):
+            # Неподходящие команды отбрасываются до разбора ФИО и определения пола.
+            if check_fields and not self._accepts(team_rows[0], team_filter):
+                continue
+            yield self._extract_team(team_rows, grade)
+
+    @staticmethod
+    def _accepts(first_row: Sequence[CellValue], team_filter: TeamFilter) -> bool:
+        leader_field = first_row[Columns.leader - 1]
+        return team_filter.accepts_fields(
+            first_row[Columns.team - 1],
+            first_row[Columns.school - 1],
+            first_row[Columns.city - 1],
+            leader_field.split(",") if isinstance(leader_field, str) else (),
         )
 
-    def _extract_leaders(self, sheet: xw.Sheet, row_idx: int) -> list[Leader]:
-        leaders: list[Leader] = []
-        leader_field = sheet.cells(row_idx, Columns.leader).value
+    @staticmethod
+    def _split_teams(
+        rows: Iterator[Sequence[CellValue]],
+    ) -> Iterator[list[Sequence[CellValue]]]:
+        for first_row in rows:
+            eof_marker = first_row[0]
+            if isinstance(eof_marker, str) and eof_marker.strip() == TABLE_EOF:
+                return
+            yield [first_row, *islice(rows, Team.MEMBERS_PER_TEAM - 1)]
 
-        for leader_name in leader_field.split(","):
-            full_name = FullName.from_string(leader_name)
-            gender = self._gender_guesser.guess_gender(full_name)
-            leaders.append(Leader(full_name=full_name, gender=gender))
+    def _extract_team(self, team_rows: list[Sequence[CellValue]], grade: str) -> Team:
+        first_row = team_rows[0]
+        # Школа и город повторяются у многих команд, одинаковые строки хранятся один раз.
+        return Team(
+            name=first_row[Columns.team - 1],
+            school=intern_if_str(first_row[Columns.school - 1]),
+            city=intern_if_str(first_row[Columns.city - 1]),
+            members=self._extract_team_members(team_rows, intern_if_str(grade)),
+            leaders=self._extract_leaders(first_row[Columns.leader - 1]),
+        )
 
-        return leaders
+    def _extract_leaders(self, leader_field: str) -> tuple[Leader, ...]:
+        full_names = [FullName.from_string(leader_name) for leader_name in leader_field.split(",")]
+        genders = self._gender_guesser.guess_genders(full_names)
+        return tuple(
+            Leader(full_name=full_name, gender=gender)
+            for full_name, gender in zip(full_names, genders, strict=True)
+        )
 
+    @staticmethod
     def _extract_team_members(
-        self,
-        sheet: xw.Sheet,
+        team_rows: list[Sequence[CellValue]],
         grade: str,
-        start_row: int,
-        members_count: int,
-    ) -> list[Student]:
+    ) -> tuple[Student, ...]:
         team_members: list[Student] = []
 
-        for row in range(start_row, start_row + members_count):
-            student_name = sanitize_string(sheet.cells(row, Columns.student).value)
+        for row in team_rows:
+            student_name = sanitize_string(row[Columns.student - 1])
             if not student_name:
                 continue
             student = Student(full_name=FullName.from_string(student_name), grade=grade)
             team_members.append(student)
 
-        return team_members
+        return tuple(team_members)
+
@@ -0,0 +1,68 @@
+from collections.abc import Iterator
+from itertools import islice
+from os import PathLike
+
+from certificates.models import Team
+from certificates.team_filter import ALL_TEAMS, TeamFilter
+from utils.metrics import get_metrics
+from utils.strings import try_extract_number_as_str
+from utils.xlsx import XlsxReader, XlsxSheet
+
+from .gender_guesser import GenderGuesser
+from .teams_data_provider import (
+    START_ROW,
+    Columns,
+    TeamsDataProvider,
+    TeamsTableParser,
+)
+
+
+class XlsxTeamsDataProvider(TeamsDataProvider):
+    """Провайдер данных о командах, читающий .xlsx файл напрямую, без запуска Excel.
+
+    Листы читаются потоково за один проход по XML-частям файла, поэтому провайдер
+    работает на любой ОС и не требует установленного Excel.
+    """
+
+    def __init__(self, filepath: PathLike, gender_guesser: GenderGuesser) -> None:
+        """Инициализирует экземпляр провайдера на основе .xlsx файла.
+
+        :filepath:
+        Путь к .xlsx файлу, содержащему информацию о командах.
+
+        :gender_guesser:
+        Экземпляр сервиса-определителя пола по ФИО.
+        """
+        self._filepath = filepath
+        self._parser = TeamsTableParser(gender_guesser)
+
+    def get_data(self, team_filter: TeamFilter = ALL_TEAMS) -> list[Team]:
+        """Считывает данные о командах из .xlsx файла.
+
+        Замечание
+        ---------
+        Считанные данные не кэшируются, файл обрабатывается повторно при каждом вызове.
+        """
+        return list(self.iter_data(team_filter))
+
+    def iter_data(self, team_filter: TeamFilter = ALL_TEAMS) -> Iterator[Team]:
+        """Считывает команды из .xlsx файла, возвращая каждую сразу после ее строк."""
+        metrics = get_metrics()
+        with XlsxReader(self._filepath) as reader:
+            for sheet in reader.sheets:
+                grade = try_extract_number_as_str(sheet.name, default_str="5")
+                # XML-части листов других классов не распаковываются и не разбираются.
+                if not team_filter.accepts_grade(grade):
+                    continue
+                # Лист читается и разбирается потоково, поэтому замеряются оба шага вместе.
+                yield from metrics.timed_iter(
+                    "xlsx.sheet",
+                    sheet.name,
+                    self._process_sheet(reader, sheet, grade, team_filter),
+                )
+
+    def _process_sheet(
+        self, reader: XlsxReader, sheet: XlsxSheet, grade: str, team_filter: TeamFilter,
+    ) -> Iterator[Team]:
+        rows = islice(reader.iter_rows(sheet, max_col=Columns.leader), START_ROW - 1, None)
+        return self._parser.iter_parse(rows, grade, team_filter)
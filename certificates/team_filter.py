@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Final
+
+from utils.strings import try_extract_number_as_str
+
+from .leaders import normalize_name
+from .models import Leader, Team
+
+
+@dataclass(frozen=True, slots=True)
+class TeamFilter:
+    """Отбор команд для частичной генерации, например перепечатки одной школы.
+
+    Каждое поле - допустимые значения одного признака, пустое поле признак
+    не ограничивает. Команда подходит, если подходит по всем заданным признакам.
+    Значения сравниваются без учета регистра, лишних пробелов и различия `е`/`ё`,
+    поэтому создавать фильтр следует через `create`.
+    """
+
+    grades: frozenset[str] = frozenset()
+    schools: frozenset[str] = frozenset()
+    cities: frozenset[str] = frozenset()
+    teams: frozenset[str] = frozenset()
+    leaders: frozenset[str] = frozenset()
+
+    @classmethod
+    def create(
+        cls,
+        grades: Iterable[str] = (),
+        schools: Iterable[str] = (),
+        cities: Iterable[str] = (),
+        teams: Iterable[str] = (),
+        leaders: Iterable[str] = (),
+    ) -> TeamFilter:
+        """Создает фильтр из значений, введенных пользователем.
+
+        :grades:
+        Классы: номер, например `7`, или название листа регистрации, например `7 класс`.
+
+        :leaders:
+        ФИО преподавателей в формате `Фамилия Имя Отчество`.
+        """
+        return cls(
+            grades=frozenset(
+                try_extract_number_as_str(grade, default_str=grade.strip()) for grade in grades
+            ),
+            schools=frozenset(map(normalize_name, schools)),
+            cities=frozenset(map(normalize_name, cities)),
+            teams=frozenset(map(normalize_name, teams)),
+            leaders=frozenset(map(normalize_name, leaders)),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        """Признак того, что фильтр пропускает все команды."""
+        return not (self.grades or self.schools or self.cities or self.teams or self.leaders)
+
+    def accepts_grade(self, grade: str) -> bool:
+        """Проверяет, что команды класса `grade` могут подойти под фильтр.
+
+        Позволяет пропускать листы регистрации, не считывая их.
+        """
+        return not self.grades or grade in self.grades
+
+    def accepts_fields(
+        self,
+        name: object,
+        school: object,
+        city: object,
+        leader_names: Iterable[str],
+    ) -> bool:
+        """Проверяет значения команды, еще не разобранные в `Team`, кроме класса.
+
+        Позволяет отбрасывать строки регистрации до разбора ФИО и определения пола.
+        Значения ячеек могут быть не строками, поэтому приводятся к `str`.
+        """
+        return (
+            self._matches(self.schools, school)
+            and self._matches(self.cities, city)
+            and self._matches(self.teams, name)
+            and (
+                not self.leaders
+                or any(normalize_name(leader) in self.leaders for leader in leader_names)
+            )
+        )
+
+    def accepts_team(self, team: Team) -> bool:
+        """Проверяет, что команда подходит под фильтр по всем признакам."""
+        if self.grades and not any(member.grade in self.grades for member in team.members):
+            return False
+        return self.accepts_fields(
+            team.name,
+            team.school,
+            team.city,
+            [str(leader.full_name) for leader in team.leaders],
+        )
+
+    def accepts_leader(self, leader: Leader) -> bool:
+        """Проверяет, нужна ли благодарность преподавателю отобранных команд.
+
+        Если преподаватели не заданы, благодарности получают все преподаватели
+        отобранных команд, иначе - только заданные.
+        """
+        return not self.leaders or normalize_name(str(leader.full_name)) in self.leaders
+
+    @staticmethod
+    def _matches(values: frozenset[str], value: object) -> bool:
+        return not values or normalize_name("" if value is None else str(value)) in values
+
+
+# Пустой фильтр, пропускающий все команды, - значение по умолчанию для параметров-фильтров.
+ALL_TEAMS: Final[TeamFilter] = TeamFilter()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator
+
+from .models import FullName, Gender, Leader, Student, Team
+
+# Номер отсутствующей строки (например, отчества) в таблице строк.
+_NO_STRING = 0
+# Вызов `Gender(value)` заметно медленнее обращения к кортежу по номеру.
+_GENDERS = tuple(Gender)
+
+
+class TeamTable:
+    """Команды, хранящиеся по столбцам в массивах чисел.
+
+    Вместо объекта на каждого участника и преподавателя таблица хранит номера
+    строк в общем списке различных строк и границы составов команд. Так регистрации
+    из сотен тысяч участников занимают в памяти в несколько раз меньше места,
+    чем списки `Team`. Объекты `Team` создаются по одному при обращении к команде.
+    """
+
+    def __init__(self) -> None:
+        self._strings: list[str | None] = [None]
+        self._string_ids: dict[str | None, int] = {None: _NO_STRING}
+
+        # Столбцы команд.
+        self._names = array("I")
+        self._schools = array("I")
+        self._cities = array("I")
+        # Участники и преподаватели команды `idx` занимают строки от конца
+        # состава команды `idx - 1` до `*_end[idx]` в своих столбцах.
+        self._members_end = array("I")
+        self._leaders_end = array("I")
+
+        # Столбцы участников и преподавателей, ФИО - по три номера строк на человека.
+        self._member_full_names = array("I")
+        self._member_grades = array("I")
+        self._leader_full_names = array("I")
+        self._leader_genders = array("B")
+
+    @classmethod
+    def from_teams(cls, teams: Iterable[Team]) -> TeamTable:
+        """Строит таблицу из команд, не храня их объекты одновременно."""
+        table = cls()
+        for team in teams:
+            table.append(team)
+        return table
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[Team]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getitem__(self, idx: int) -> Team:
+        if idx < 0:
+            idx += len(self)
+        members_start = self._members_end[idx - 1] if idx else 0
+        leaders_start = self._leaders_end[idx - 1] if idx else 0
+        strings = self._strings
+        return Team(
+            name=strings[self._names[idx]],
+            school=strings[self._schools[idx]],
+            city=strings[self._cities[idx]],
+            members=tuple(
+                Student(
+                    full_name=self._get_full_name(self._member_full_names, person_idx),
+                    grade=strings[self._member_grades[person_idx]],
+                )
+                for person_idx in range(members_start, self._members_end[idx])
+            ),
+            leaders=tuple(
+                Leader(
+                    full_name=self._get_full_name(self._leader_full_names, person_idx),
+                    gender=_GENDERS[self._leader_genders[person_idx]],
+                )
+                for person_idx in range(leaders_start, self._leaders_end[idx])
+            ),
+        )
+
+    @property
+    def members_count(self) -> int:
+        """Количество участников всех команд."""
+        return len(self._member_grades)
+
+    @property
+    def leaders_count(self) -> int:
+        """Количество преподавателей всех команд с учетом повторов."""
+        return len(self._leader_genders)
+
+    def append(self, team: Team) -> None:
+        """Добавляет команду в конец таблицы."""
+        self._names.append(self._get_string_id(team.name))
+        self._schools.append(self._get_string_id(team.school))
+        self._cities.append(self._get_string_id(team.city))
+
+        for student in team.members:
+            self._add_full_name(self._member_full_names, student.full_name)
+            self._member_grades.append(self._get_string_id(student.grade))
+        self._members_end.append(len(self._member_grades))
+
+        for leader in team.leaders:
+            self._add_full_name(self._leader_full_names, leader.full_name)
+            self._leader_genders.append(leader.gender.value)
+        self._leaders_end.append(len(self._leader_genders))
+
+    def _get_string_id(self, string: str | None) -> int:
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = self._string_ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+    def _add_full_name(self, column: array, full_name: FullName) -> None:
+        column.append(self._get_string_id(full_name.last_name))
+        column.append(self._get_string_id(full_name.first_name))
+        column.append(self._get_string_id(full_name.patronymic))
+
+    def _get_full_name(self, column: array, person_idx: int) -> FullName:
+        strings = self._strings
+        offset = 3 * person_idx
+        return FullName(
+            strings[column[offset]], strings[column[offset + 1]], strings[column[offset + 2]],
+        )
@@ -0,0 +1,73 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+# pymupdf нужен только для сборки общих pdf-файлов и может быть не установлен.
+HAS_PYMUPDF = importlib.util.find_spec("pymupdf") is not None
+
+# Текст аннотации похож на ссылку на объект и не должен изменяться при сборке.
+_ANNOTATION_TEXT = "см. 5 0 R (стр. 1)"
+
+
+@unittest.skipUnless(HAS_PYMUPDF, "pymupdf не установлен")
+class CombinedPdfWriterTest(unittest.TestCase):
+    """Сборка нескольких pdf-документов в один файл с закладками."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_path = Path(temp_dir.name)
+
+    def _make_pdf(self, name: str, fontname: str, pages: int, note: str | None = None) -> Path:
+        import pymupdf
+
+        path = self.temp_path / name
+        with pymupdf.open() as document:
+            for number in range(pages):
+                page = document.new_page()
+                page.insert_text((72, 72), f"{name} {number + 1}", fontname=fontname)
+                if note is not None:
+                    page.add_text_annot((100, 100), note)
+                    # Строка ASCII записывается литералом `(...)`, а не в hex.
+                    page.add_text_annot((200, 100), "see 1 0 R (x)")
+            document.save(path)
+        return path
+
+    def test_merges_pages_fonts_and_outlines(self) -> None:
+        import pymupdf
+
+        from utils.combined_pdf import CombinedPdfWriter
+
+        first = self._make_pdf("first.pdf", "helv", 2, _ANNOTATION_TEXT)
+        second = self._make_pdf("second.pdf", "tiro", 1)
+        combined_path = self.temp_path / "combined.pdf"
+        with CombinedPdfWriter(combined_path) as writer:
+            writer.add_bookmark("Первая команда")
+            writer.add_bookmark("Участник", level=1)
+            writer.append(first)
+            writer.add_bookmark("Вторая команда")
+            writer.append(second)
+
+        with pymupdf.open(combined_path) as combined:
+            self.assertEqual(combined.page_count, 3)
+            self.assertEqual(
+                [page.get_text().strip() for page in combined],
+                ["first.pdf 1", "first.pdf 2", "second.pdf 1"],
+            )
+            self.assertEqual(
+                [{font[3] for font in page.get_fonts()} for page in combined],
+                [{"Helvetica"}, {"Helvetica"}, {"Times-Roman"}],
+            )
+            self.assertEqual(
+                combined.get_toc(),
+                [[1, "Первая команда", 1], [2, "Участник", 1], [1, "Вторая команда", 3]],
+            )
+            self.assertEqual(
+                [annot.info["content"] for annot in combined[0].annots()],
+                [_ANNOTATION_TEXT, "see 1 0 R (x)"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import tempfile
+import unittest
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+from certificates.services.docx_template import DOCUMENT_PART, DocxTemplate
+from certificates.services.pdf_generator import TextReplacements
+
+_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _paragraph(*runs: str, justification: str | None = None) -> str:
+    """Абзац `<w:p>`, в котором каждый текст - отдельный run `<w:r>`."""
+    properties = ""
+    if justification is not None:
+        properties = f'<w:pPr><w:jc w:val="{justification}"/></w:pPr>'
+    runs_xml = "".join(f"<w:r><w:rPr><w:b/></w:rPr><w:t>{text}</w:t></w:r>" for text in runs)
+    return f"<w:p>{properties}{runs_xml}</w:p>"
+
+
+class DocxTemplateTest(unittest.TestCase):
+    """Подстановка значений в `word/document.xml` шаблона."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_path = Path(temp_dir.name)
+
+    def _make_template(self, *paragraphs: str) -> DocxTemplate:
+        template_path = self.temp_path / "template.docx"
+        with zipfile.ZipFile(template_path, "w", zipfile.ZIP_DEFLATED) as template:
+            template.writestr("[Content_Types].xml", "<Types/>")
+            template.writestr(
+                DOCUMENT_PART,
+                f'<w:document xmlns:w="{_NAMESPACE}"><w:body>{"".join(paragraphs)}'
+                "</w:body></w:document>",
+            )
+        return DocxTemplate(template_path)
+
+    @staticmethod
+    def _read_document(document: bytes) -> tuple[list[str], str]:
+        with zipfile.ZipFile(BytesIO(document)) as archive:
+            return archive.namelist(), archive.read(DOCUMENT_PART).decode("utf-8")
+
+    def test_placeholder_split_over_runs(self) -> None:
+        # Word разбивает текст на run'ы по правкам и проверке орфографии.
+        template = self._make_template(
+            _paragraph(
+                "Награждается ", "{F", "I", "O}", ", ", "{GRADE} класс", justification="center",
+            ),
+        )
+
+        self.assertEqual(
+            template.replacements, {TextReplacements.fio, TextReplacements.grade},
+        )
+        self.assertEqual(template.alignments[TextReplacements.fio], "center")
+        document_xml = template.render_document_xml(
+            {TextReplacements.fio: "Иванов Иван", TextReplacements.grade: "7"},
+        )
+        self.assertEqual(
+            document_xml,
+            f'<w:document xmlns:w="{_NAMESPACE}"><w:body><w:p>'
+            '<w:pPr><w:jc w:val="center"/></w:pPr>'
+            "<w:r><w:rPr><w:b/></w:rPr><w:t>Награждается </w:t></w:r>"
+            '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Иванов Иван</w:t></w:r>'
+            '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve"></w:t></w:r>'
+            '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve"></w:t></w:r>'
+            "<w:r><w:rPr><w:b/></w:rPr><w:t>, </w:t></w:r>"
+            '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">7 класс</w:t></w:r>'
+            "</w:p></w:body></w:document>",
+        )
+
+    def test_values_are_xml_escaped(self) -> None:
+        template = self._make_template(_paragraph("{SCHOOL}"), _paragraph("{FIO}"))
+
+        document_xml = template.render_document_xml(
+            {
+                TextReplacements.school: 'Лицей "Вектор" <№1> & Ко',
+                TextReplacements.fio: "О'Нил",
+            },
+        )
+        self.assertIn(
+            '<w:t xml:space="preserve">Лицей "Вектор" &lt;№1&gt; &amp; Ко</w:t>', document_xml,
+        )
+        self.assertIn("<w:t xml:space=\"preserve\">О'Нил</w:t>", document_xml)
+
+    def test_render_keeps_other_parts_and_missing_values(self) -> None:
+        template = self._make_template(_paragraph("{FIO} из {CITY}"))
+
+        names, document_xml = self._read_document(
+            template.render({TextReplacements.fio: "Петров Петр"}),
+        )
+        self.assertEqual(sorted(names), ["[Content_Types].xml", DOCUMENT_PART])
+        self.assertIn("Петров Петр из {CITY}", document_xml)
+
+
+if __name__ == "__main__":
+    unittest.main()
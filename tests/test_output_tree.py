@@ -0,0 +1,104 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from certificates.models import FullName, Gender, Leader, Student, Team
+from certificates.output_tree import (
+    APPRECIATIONS_FOLDER,
+    CERTIFICATES_FOLDER,
+    OutputTree,
+)
+
+_SMIRNOVA = Leader(FullName("Смирнова", "Анна", "Петровна"), Gender.female)
+_VOLKOV = Leader(FullName("Волков", "Сергей", "Ильич"), Gender.male)
+
+
+def _team(
+    name: str,
+    student: str,
+    school: str = "Школа 1",
+    leaders: tuple[Leader, ...] = (_SMIRNOVA,),
+) -> Team:
+    return Team(
+        name=name,
+        school=school,
+        city="Москва",
+        members=(Student(FullName(student, "Иван"), "7"),),
+        leaders=leaders,
+    )
+
+
+class OutputTreeTest(unittest.TestCase):
+    """Планирование папок с результатами и разрешение совпадений имен."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.output_path = Path(temp_dir.name)
+        self.certificates_path = self.output_path / CERTIFICATES_FOLDER
+        self.appreciations_path = self.output_path / APPRECIATIONS_FOLDER
+
+    def test_duplicate_team_names_get_numbers(self) -> None:
+        output_tree = OutputTree(self.output_path, ".pdf")
+        leader_folder = self.certificates_path / "Смирнова Анна Петровна"
+
+        paths = [
+            output_tree.add_team(_team("Альфа", "Иванов")),
+            # Имена сравниваются без учета регистра, как в файловой системе Windows.
+            output_tree.add_team(_team("альфа", "Петров")),
+            output_tree.add_team(_team("Альфа", "Сидоров")),
+            # У других преподавателей своя папка, и номер не нужен.
+            output_tree.add_team(_team("Альфа", "Орлов", leaders=(_VOLKOV,))),
+        ]
+
+        self.assertEqual(
+            paths,
+            [
+                leader_folder / "Альфа",
+                leader_folder / "альфа (2)",
+                leader_folder / "Альфа (3)",
+                self.certificates_path / "Волков Сергей Ильич" / "Альфа",
+            ],
+        )
+        output_tree.create()
+        self.assertTrue(all(path.is_dir() for path in paths))
+
+    def test_namesake_leaders_from_different_schools(self) -> None:
+        output_tree = OutputTree(self.output_path, ".pdf")
+        school_team = _team("Альфа", "Иванов")
+        lyceum_team = _team("Бета", "Петров", school="Лицей 2")
+
+        self.assertEqual(
+            output_tree.add_leader(_SMIRNOVA, [school_team]), self.appreciations_path,
+        )
+        # Тот же преподаватель той же школы пишется в общую папку.
+        self.assertEqual(
+            output_tree.add_leader(_SMIRNOVA, [_team("Гамма", "Сидоров", school=" школа 1 ")]),
+            self.appreciations_path,
+        )
+        # Однофамилец из другой школы получает подпапку своей школы.
+        self.assertEqual(
+            output_tree.add_leader(_SMIRNOVA, [lyceum_team]),
+            self.appreciations_path / "Лицей 2",
+        )
+        output_tree.create()
+        self.assertTrue((self.appreciations_path / "Лицей 2").is_dir())
+
+    def test_partial_tree_finds_numbered_team_folder(self) -> None:
+        teams = [_team("Альфа", "Иванов"), _team("Альфа", "Петров")]
+        full_tree = OutputTree(self.output_path, ".pdf")
+        for team in teams:
+            team_path = full_tree.add_team(team)
+            full_tree.create()
+            (team_path / f"{team.members[0].full_name}.pdf").touch()
+
+        # При перепечатке второй команды ее номер определяется по ее документам.
+        partial_tree = OutputTree(self.output_path, ".pdf", partial=True)
+        self.assertEqual(
+            partial_tree.add_team(teams[1]),
+            self.certificates_path / "Смирнова Анна Петровна" / "Альфа (2)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from collections.abc import Sequence
+from os import PathLike
+from pathlib import Path
+from typing import Self
+
+from certificates.certificate_generator import CertificateGeneratorApp
+from certificates.models import FullName, Gender, Leader, Student, Team
+from certificates.output_tree import APPRECIATIONS_FOLDER
+from certificates.services.pdf_generator import CertificateGenerator
+from certificates.services.teams_data_provider import TeamsDataProvider
+from certificates.team_filter import ALL_TEAMS, TeamFilter
+
+_LEADER = Leader(FullName("Смирнова", "Анна", "Петровна"), Gender.female)
+
+
+def _team(name: str, school: str, grade: str, student: str) -> Team:
+    return Team(
+        name=name,
+        school=school,
+        city="Москва",
+        members=(Student(FullName(student, "Иван"), grade),),
+        leaders=(_LEADER,),
+    )
+
+
+# Однофамилица из другой школы встречается первой и занимает общую папку благодарностей,
+# а преподаватель "Школы 1" ведет команды двух классов.
+_TEAMS = [
+    _team("Гамма", "Лицей 2", "7", "Орлов"),
+    _team("Альфа", "Школа 1", "7", "Иванов"),
+    _team("Бета", "Школа 1", "8", "Петров"),
+]
+
+
+class _ListTeamsDataProvider(TeamsDataProvider):
+    def get_data(self, team_filter: TeamFilter = ALL_TEAMS) -> list[Team]:
+        return [team for team in _TEAMS if team_filter.accepts_team(team)]
+
+
+class _RecordingGenerator(CertificateGenerator):
+    """Создает пустые файлы документов и запоминает команды в благодарностях."""
+
+    def __init__(self) -> None:
+        super().__init__(os.devnull, os.devnull)
+        self.appreciations: dict[Path, list[str]] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        pass
+
+    def generate_students_certificate(self, team: Team, output_directory: PathLike) -> None:
+        for student in team.members:
+            (Path(output_directory) / f"{student.full_name}{self.OUTPUT_SUFFIX}").touch()
+
+    def generate_appreciation_certificate(
+        self,
+        leader: Leader,
+        output_directory: PathLike,
+        teams: Sequence[Team] = (),
+    ) -> None:
+        path = Path(output_directory) / f"{leader.full_name}{self.OUTPUT_SUFFIX}"
+        path.touch()
+        self.appreciations[path] = [team.name for team in teams]
+
+
+class PartialGenerationTest(unittest.TestCase):
+    """Перепечатка части документов поверх полной генерации."""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.output_path = Path(temp_dir.name)
+
+    def _generate(self, team_filter: TeamFilter = ALL_TEAMS) -> dict[Path, list[str]]:
+        generator = _RecordingGenerator()
+        app = CertificateGeneratorApp(_ListTeamsDataProvider(), generator, team_filter=team_filter)
+        app.generate_certificates(str(self.output_path))
+        return generator.appreciations
+
+    def test_partial_run_keeps_all_teams_of_leader(self) -> None:
+        appreciations_path = self.output_path / APPRECIATIONS_FOLDER
+        leader_file = f"{_LEADER.full_name}.pdf"
+        self.assertEqual(
+            self._generate(),
+            {
+                appreciations_path / leader_file: ["Гамма"],
+                appreciations_path / "Школа 1" / leader_file: ["Альфа", "Бета"],
+            },
+        )
+
+        # Отобрана только команда 8 класса, но в письме перечислены обе команды.
+        self.assertEqual(
+            self._generate(TeamFilter.create(grades=["8"])),
+            {appreciations_path / "Школа 1" / leader_file: ["Альфа", "Бета"]},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from certificates.models import FullName, Gender, Leader, Student, Team
+from certificates.services.gender_guesser import SimpleGenderGuesser
+from certificates.services.teams_data_provider import (
+    TABLE_EOF,
+    Columns,
+    TeamsTableParser,
+)
+from certificates.team_filter import TeamFilter
+
+
+def _row(
+    city: str | None = None,
+    school: str | None = None,
+    team: str | None = None,
+    student: str | None = None,
+    leader: str | None = None,
+) -> list[str | None]:
+    """Строка таблицы регистрации со значениями только в нужных столбцах."""
+    row: list[str | None] = [None] * Columns.leader
+    row[Columns.city - 1] = city
+    row[Columns.school - 1] = school
+    row[Columns.team - 1] = team
+    row[Columns.student - 1] = student
+    row[Columns.leader - 1] = leader
+    return row
+
+
+# Объединенные ячейки Excel отдает значением в первой строке и пустыми в остальных,
+# поэтому город, школа, команда и преподаватели заполнены только у первого участника.
+_TABLE: list[list[str | None]] = [
+    _row("Москва", "Школа 1", "Альфа", "Иванов Иван Иванович", "Смирнова Анна Петровна"),
+    _row(student="Петров Петр"),
+    _row(student="  Сидорова Мария Олеговна  "),
+    _row(),
+    _row(),
+    _row(),
+    _row(
+        "Казань",
+        "Лицей 2",
+        "Бета",
+        "Кузнецов Алексей",
+        "Волков Сергей Ильич, Никитина Ольга Юрьевна",
+    ),
+    _row(),
+    _row(student="Орлова Дарья"),
+    _row(),
+    _row(),
+    _row(),
+    [TABLE_EOF, *[None] * (Columns.leader - 1)],
+    # Строки после конца таблицы не разбираются.
+    _row("Омск", "Школа 3", "Гамма", "Лишний Участник", "Лишний Преподаватель"),
+]
+
+
+class TeamsTableParserTest(unittest.TestCase):
+    """Разбор таблицы регистрации, считанной в память как список строк."""
+
+    def setUp(self) -> None:
+        self.parser = TeamsTableParser(SimpleGenderGuesser())
+
+    def test_parses_merged_and_blank_rows(self) -> None:
+        teams = self.parser.parse(_TABLE, "7")
+
+        self.assertEqual(
+            teams,
+            [
+                Team(
+                    name="Альфа",
+                    school="Школа 1",
+                    city="Москва",
+                    members=(
+                        Student(FullName("Иванов", "Иван", "Иванович"), "7"),
+                        Student(FullName("Петров", "Петр"), "7"),
+                        Student(FullName("Сидорова", "Мария", "Олеговна"), "7"),
+                    ),
+                    leaders=(Leader(FullName("Смирнова", "Анна", "Петровна"), Gender.female),),
+                ),
+                Team(
+                    name="Бета",
+                    school="Лицей 2",
+                    city="Казань",
+                    members=(
+                        Student(FullName("Кузнецов", "Алексей"), "7"),
+                        Student(FullName("Орлова", "Дарья"), "7"),
+                    ),
+                    leaders=(
+                        Leader(FullName("Волков", "Сергей", "Ильич"), Gender.male),
+                        Leader(FullName("Никитина", "Ольга", "Юрьевна"), Gender.female),
+                    ),
+                ),
+            ],
+        )
+
+    def test_filter_skips_teams_by_first_row(self) -> None:
+        teams = self.parser.parse(_TABLE, "7", TeamFilter.create(schools=["лицей 2"]))
+
+        self.assertEqual([team.name for team in teams], ["Бета"])
+
+    def test_table_without_eof_marker_ends_with_last_row(self) -> None:
+        teams = self.parser.parse(_TABLE[:6], "5")
+
+        self.assertEqual([team.name for team in teams], ["Альфа"])
+        self.assertEqual({student.grade for student in teams[0].members}, {"5"})
+
+
+if __name__ == "__main__":
+    unittest.main()
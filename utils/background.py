@@ -0,0 +1,67 @@
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# Как часто фоновый поток проверяет, не перестали ли забирать его элементы.
+_STOP_POLL_INTERVAL = 0.5
+
+
+@dataclass
+class _Failure:
+    error: Exception
+
+
+_DONE = object()
+
+
+def iterate_in_background(iterable: Iterable[T], max_prefetched: int) -> Iterator[T]:
+    """Перебирает `iterable` в фоновом потоке и возвращает его элементы по мере готовности.
+
+    Пока потребитель обрабатывает очередной элемент, следующие уже готовятся,
+    но не более `max_prefetched` штук: дальше фоновый поток ждет, пока их заберут.
+    Исключение, возникшее при переборе, пробрасывается потребителю после всех
+    элементов, полученных до него.
+
+    :iterable:
+    Перебираемая последовательность, например генератор, читающий файл.
+
+    :max_prefetched:
+    Максимальное количество подготовленных, но еще не забранных элементов.
+    """
+    items: queue.Queue = queue.Queue(max_prefetched)
+    stopped = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=_STOP_POLL_INTERVAL)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as error:
+            put(_Failure(error))
+        else:
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while (item := items.get()) is not _DONE:
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Если потребитель остановился раньше, фоновый поток бросает перебор.
+        stopped.set()
+        thread.join()
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections.abc import Callable
+from os import PathLike
+from typing import Self
+
+import pymupdf
+
+_REFERENCE_RE = re.compile(r"(\d+)\s+(\d+)\s+R\b")
+_LENGTH_RE = re.compile(r"/Length\s+\d+(?:\s+\d+\s+R\b)?")
+_PARENT_RE = re.compile(r"/Parent\s+\d+\s+\d+\s+R\b")
+_PARENT_MARKER = "/Parent PARENT"
+_PARENT_MARKER_RE = re.compile(re.escape(_PARENT_MARKER))
+# Начало строкового литерала - `(` или `<`, но не `<<` словаря.
+_STRING_START_RE = re.compile(r"<<|[(<]")
+
+# Атрибуты страницы, которые могут наследоваться от родительских узлов дерева страниц.
+_INHERITABLE_KEYS = ("Resources", "MediaBox", "CropBox", "Rotate")
+
+_PAGES_ID = 1
+_CATALOG_ID = 2
+_OUTLINES_ID = 3
+
+
+class CombinedPdfWriter:
+    """Потоково собирает несколько pdf-документов в один многостраничный файл.
+
+    Объекты каждого добавленного документа сразу записываются в файл, в памяти
+    остаются только смещения объектов, номера страниц и хэши уже записанных объектов.
+    Одинаковые объекты разных документов (шрифты, изображения, Form XObject'ы)
+    записываются один раз, а все страницы ссылаются на общую копию.
+    """
+
+    def __init__(self, output_path: PathLike) -> None:
+        """Создает файл, в который будут дописываться страницы.
+
+        :output_path:
+        Путь к итоговому pdf-файлу.
+        """
+        self._file = open(output_path, "wb")  # noqa: SIM115
+        self._offsets: list[int] = [0] * (_OUTLINES_ID + 1)
+        self._written_objects: dict[bytes, int] = {}
+        self._page_ids: list[int] = []
+        self._bookmarks: list[tuple[int, str, int]] = []
+        self._pending_bookmarks: list[tuple[int, str]] = []
+
+        self._file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    @property
+    def page_count(self) -> int:
+        """Количество уже добавленных страниц."""
+        return len(self._page_ids)
+
+    def add_bookmark(self, title: str, level: int = 0) -> None:
+        """Добавляет закладку, указывающую на следующую добавленную страницу.
+
+        :title:
+        Текст закладки.
+
+        :level:
+        Уровень вложенности закладки, 0 - верхний уровень.
+        """
+        self._pending_bookmarks.append((level, title))
+
+    def append(self, pdf_path: PathLike) -> None:
+        """Дописывает в итоговый файл все страницы pdf-документа."""
+        with pymupdf.open(pdf_path) as source:
+            copied: dict[int, int] = {}
+            for page in source:
+                page_id = self._copy_page(source, page.xref, copied)
+                for level, title in self._pending_bookmarks:
+                    self._bookmarks.append((level, title, page_id))
+                self._pending_bookmarks.clear()
+                self._page_ids.append(page_id)
+
+    def close(self) -> None:
+        """Дописывает дерево страниц, закладки и таблицу объектов и закрывает файл."""
+        if self._file.closed:
+            return
+
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(
+            _PAGES_ID,
+            f"<</Type/Pages/Kids[{kids}]/Count {len(self._page_ids)}>>",
+        )
+        self._write_outlines()
+        self._write_object(
+            _CATALOG_ID,
+            f"<</Type/Catalog/Pages {_PAGES_ID} 0 R/Outlines {_OUTLINES_ID} 0 R"
+            f"/PageMode/{'UseOutlines' if self._bookmarks else 'UseNone'}>>",
+        )
+
+        xref_offset = self._file.tell()
+        lines = [f"xref\n0 {len(self._offsets)}\n", "0000000000 65535 f \n"]
+        lines.extend(
+            f"{offset:010d} 00000 n \n" if offset else "0000000000 00000 f \n"
+            for offset in self._offsets[1:]
+        )
+        lines.append(
+            f"trailer\n<</Size {len(self._offsets)}/Root {_CATALOG_ID} 0 R>>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n",
+        )
+        self._file.write("".join(lines).encode("latin-1"))
+        self._file.close()
+
+    def _copy_page(
+        self,
+        source: pymupdf.Document,
+        page_xref: int,
+        copied: dict[int, int],
+    ) -> int:
+        # Ссылка на родителя заменяется ссылкой на дерево страниц итогового файла,
+        # а унаследованные атрибуты переносятся в саму страницу.
+        page_dict = _sub_outside_strings(
+            _PARENT_RE, _PARENT_MARKER, source.xref_object(page_xref, compressed=True),
+        )
+        inherited = "".join(
+            f"/{key} {value}"
+            for key, value in _inherited_attributes(source, page_xref).items()
+        )
+        page_dict = page_dict[:page_dict.rindex(">>")] + inherited + ">>"
+
+        # Номер страницы резервируется заранее: на нее могут ссылаться ее же аннотации.
+        page_id = self._reserve_id()
+        copied[page_xref] = page_id
+        page_dict = self._replace_references(source, page_dict, copied, set())
+        self._write_object(
+            page_id,
+            _sub_outside_strings(_PARENT_MARKER_RE, f"/Parent {_PAGES_ID} 0 R", page_dict),
+        )
+        return page_id
+
+    def _copy_object(
+        self,
+        source: pymupdf.Document,
+        xref: int,
+        copied: dict[int, int],
+        visiting: set[int],
+    ) -> int:
+        if xref in copied:
+            return copied[xref]
+        if xref in visiting:
+            # Циклическая ссылка: объекту назначается номер до того, как он будет записан.
+            copied[xref] = self._reserve_id()
+            return copied[xref]
+
+        visiting.add(xref)
+        obj = source.xref_object(xref, compressed=True)
+        stream = source.xref_stream_raw(xref) if source.xref_is_stream(xref) else None
+        if stream is not None:
+            obj = _sub_outside_strings(_LENGTH_RE, f"/Length {len(stream)}", obj)
+        obj = self._replace_references(source, obj, copied, visiting)
+        visiting.discard(xref)
+
+        if xref in copied:
+            self._write_object(copied[xref], obj, stream)
+            return copied[xref]
+
+        key = hashlib.sha256(obj.encode("latin-1") + b"\0" + (stream or b"")).digest()
+        if key not in self._written_objects:
+            self._written_objects[key] = self._write_object(self._reserve_id(), obj, stream)
+        copied[xref] = self._written_objects[key]
+        return copied[xref]
+
+    def _replace_references(
+        self,
+        source: pymupdf.Document,
+        obj: str,
+        copied: dict[int, int],
+        visiting: set[int],
+    ) -> str:
+        return _sub_outside_strings(
+            _REFERENCE_RE,
+            lambda reference: (
+                f"{self._copy_object(source, int(reference[1]), copied, visiting)} 0 R"
+            ),
+            obj,
+        )
+
+    def _reserve_id(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def _write_object(self, obj_id: int, obj: str, stream: bytes | None = None) -> int:
+        self._offsets[obj_id] = self._file.tell()
+        # MuPDF выводит байты строк вне ASCII восьмеричными escape-последовательностями,
+        # а строки в UTF-16 - шестнадцатеричными, поэтому текст объекта кодируется без потерь.
+        self._file.write(f"{obj_id} 0 obj\n{obj}\n".encode("latin-1"))
+        if stream is not None:
+            self._file.write(b"stream\n" + stream + b"\nendstream\n")
+        self._file.write(b"endobj\n")
+        return obj_id
+
+    def _write_outlines(self) -> None:
+        item_ids = [self._reserve_id() for _ in self._bookmarks]
+        parents: list[int] = []
+        children: dict[int, list[int]] = {_OUTLINES_ID: []}
+
+        # Родитель закладки - ближайшая предыдущая закладка меньшего уровня.
+        stack: list[tuple[int, int]] = []
+        for item_id, (level, _, _) in zip(item_ids, self._bookmarks, strict=True):
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            parent_id = stack[-1][1] if stack else _OUTLINES_ID
+            parents.append(parent_id)
+            children.setdefault(parent_id, []).append(item_id)
+            children[item_id] = []
+            stack.append((level, item_id))
+
+        for item_id, parent_id, (_, title, page_id) in zip(
+            item_ids, parents, self._bookmarks, strict=True,
+        ):
+            siblings = children[parent_id]
+            position = siblings.index(item_id)
+            entries = [
+                f"/Title {_pdf_text_string(title)}",
+                f"/Parent {parent_id} 0 R",
+                f"/Dest[{page_id} 0 R/Fit]",
+            ]
+            if position > 0:
+                entries.append(f"/Prev {siblings[position - 1]} 0 R")
+            if position < len(siblings) - 1:
+                entries.append(f"/Next {siblings[position + 1]} 0 R")
+            entries.extend(_outline_children_entries(children[item_id]))
+            self._write_object(item_id, f"<<{''.join(entries)}>>")
+
+        root_entries = _outline_children_entries(children[_OUTLINES_ID])
+        self._write_object(_OUTLINES_ID, f"<</Type/Outlines{''.join(root_entries)}>>")
+
+
+def _sub_outside_strings(
+    pattern: re.Pattern[str],
+    repl: str | Callable[[re.Match[str]], str],
+    obj: str,
+) -> str:
+    """Заменяет `pattern` в тексте pdf-объекта, не затрагивая строковые литералы.
+
+    Текст строк, например `(см. 5 0 R)` в комментарии аннотации, не должен
+    приниматься за ссылки на объекты и ключи словаря.
+    """
+    parts: list[str] = []
+    start = pos = 0
+    while (match := _STRING_START_RE.search(obj, pos)) is not None:
+        if match[0] == "<<":
+            pos = match.end()
+            continue
+        string_start = match.start()
+        if match[0] == "(":
+            string_end = _literal_string_end(obj, string_start)
+        else:
+            string_end = obj.find(">", string_start) + 1 or len(obj)
+        parts.append(pattern.sub(repl, obj[start:string_start]))
+        parts.append(obj[string_start:string_end])
+        start = pos = string_end
+    parts.append(pattern.sub(repl, obj[start:]))
+    return "".join(parts)
+
+
+def _literal_string_end(obj: str, start: int) -> int:
+    """Возвращает позицию после строки `(...)`, начинающейся в `start`.
+
+    Строка может содержать экранированные символы и парные скобки без экранирования.
+    """
+    depth = 0
+    pos = start
+    while pos < len(obj):
+        char = obj[pos]
+        if char == "\\":
+            pos += 2
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    return len(obj)
+
+
+def _outline_children_entries(child_ids: list[int]) -> list[str]:
+    if not child_ids:
+        return []
+    return [
+        f"/First {child_ids[0]} 0 R",
+        f"/Last {child_ids[-1]} 0 R",
+        f"/Count {len(child_ids)}",
+    ]
+
+
+def _pdf_text_string(text: str) -> str:
+    return f"<FEFF{text.encode('utf-16-be').hex().upper()}>"
+
+
+def _inherited_attributes(source: pymupdf.Document, page_xref: int) -> dict[str, str]:
+    """Возвращает наследуемые атрибуты, которые не заданы у самой страницы."""
+    missing = [
+        key for key in _INHERITABLE_KEYS
+        if source.xref_get_key(page_xref, key)[0] == "null"
+    ]
+    attributes: dict[str, str] = {}
+
+    node_type, node = source.xref_get_key(page_xref, "Parent")
+    while missing and node_type == "xref":
+        node_xref = int(node.split()[0])
+        for key in missing.copy():
+            value_type, value = source.xref_get_key(node_xref, key)
+            if value_type != "null":
+                attributes[key] = value
+                missing.remove(key)
+        node_type, node = source.xref_get_key(node_xref, "Parent")
+
+    return attributes
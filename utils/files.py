@@ -0,0 +1,13 @@
+import hashlib
+from os import PathLike
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path: PathLike) -> str:
+    """Возвращает sha256-хэш содержимого файла."""
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
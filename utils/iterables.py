@@ -0,0 +1,15 @@
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Разбивает последовательность на списки по `size` элементов (последний - короче).
+
+    Аналог `itertools.batched` из Python 3.12.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from os import PathLike
+from typing import Any, Final, TextIO, TypeVar
+
+T = TypeVar("T")
+
+Event = dict[str, Any]
+Sink = Callable[[Event], None]
+
+
+@dataclass
+class _StageStats:
+    started: float
+    total: int | None = None
+    # Этапы без события о начале (например, этапы внутри генераторов)
+    # длятся от начала первого элемента до конца последнего.
+    explicit: bool = True
+    # Начало первого элемента: скорость считается с него, чтобы не занижать ее
+    # для этапов, элементы которых начинают поступать не сразу.
+    first_item_started: float | None = None
+    finished: float | None = None
+    count: int = 0
+    errors: int = 0
+    item_seconds: float = 0.0
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+
+
+class Metrics:
+    """Сборщик событий о ходе генерации: этапов, отдельных документов и сообщений.
+
+    Каждое событие - словарь, который можно сохранить в JSON. События передаются
+    подписчикам (см. `ConsoleSink`, `JsonLinesSink`) и одновременно учитываются
+    в статистике этапов: количество, ошибки, скорость, оставшееся время и самые
+    медленные элементы.
+
+    Методы можно вызывать из разных потоков. События из других процессов
+    передаются в `emit` главного процесса как есть (см. `render_pool`).
+    """
+
+    SLOWEST_ITEMS_COUNT: Final[int] = 5
+
+    def __init__(self, sinks: Iterable[Sink] = ()) -> None:
+        """Создает сборщик событий.
+
+        :sinks:
+        Подписчики, которым передается каждое событие.
+        """
+        self._lock = threading.RLock()
+        self._sinks = list(sinks)
+        self._stages: dict[str, _StageStats] = {}
+
+    def subscribe(self, sink: Sink) -> None:
+        """Добавляет подписчика на события."""
+        with self._lock:
+            self._sinks.append(sink)
+
+    def emit(self, event: Event) -> None:
+        """Учитывает событие и передает его подписчикам.
+
+        Время и номер процесса добавляются в событие, если их в нем еще нет.
+        """
+        event.setdefault("time", time.time())
+        event.setdefault("pid", os.getpid())
+        with self._lock:
+            self._update_stats(event)
+            for sink in self._sinks:
+                sink(event)
+
+    @contextmanager
+    def stage(
+        self,
+        name: str,
+        total: int | None = None,
+        title: str | None = None,
+    ) -> Iterator[None]:
+        """Отмечает начало и конец этапа.
+
+        :name:
+        Имя этапа.
+
+        :total:
+        Сколько элементов будет обработано на этапе, если это известно заранее.
+
+        :title:
+        Описание этапа для пользователя. Этапы без описания в консоль не выводятся.
+        """
+        started = time.perf_counter()
+        self.emit({"event": "stage_start", "stage": name, "total": total, "title": title})
+        try:
+            yield
+        finally:
+            self.emit(
+                {
+                    "event": "stage_end",
+                    "stage": name,
+                    "seconds": time.perf_counter() - started,
+                },
+            )
+
+    @contextmanager
+    def timed(self, stage: str, item: str | None = None) -> Iterator[None]:
+        """Замеряет время обработки одного элемента этапа.
+
+        Если внутри блока возникло исключение, оно записывается в событие
+        и пробрасывается дальше.
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as exception:
+            error = repr(exception)
+            raise
+        finally:
+            self.item(stage, item, time.perf_counter() - started, error)
+
+    def timed_iter(self, stage: str, item: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Перебирает `iterable`, замеряя только время получения его элементов.
+
+        Время, которое вызывающий код тратит на обработку элементов, не учитывается,
+        поэтому так можно замерить, например, чтение листа, не теряя потоковости.
+        """
+        seconds = 0.0
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - started
+            yield value
+        self.item(stage, item, seconds)
+
+    def item(
+        self,
+        stage: str,
+        item: str | None,
+        seconds: float,
+        error: str | None = None,
+        count: int = 1,
+    ) -> None:
+        """Записывает обработку элемента этапа.
+
+        :count:
+        Сколько элементов обработано, если замерялся целый пакет.
+        """
+        self.emit(
+            {
+                "event": "item",
+                "stage": stage,
+                "item": item,
+                "seconds": seconds,
+                "error": error,
+                "count": count,
+            },
+        )
+
+    def message(self, text: str, level: str = "info") -> None:
+        """Передает подписчикам сообщение для пользователя (`info`, `warning` или `error`)."""
+        self.emit({"event": "message", "level": level, "text": text})
+
+    def snapshot(self, stage: str) -> dict[str, Any]:
+        """Возвращает текущее состояние этапа: сколько сделано, скорость и сколько осталось."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                return {"stage": stage, "count": 0, "errors": 0, "total": None}
+
+            now = stats.finished or time.time()
+            elapsed = now - stats.started
+            items_elapsed = now - (stats.first_item_started or stats.started)
+            items_per_second = stats.count / items_elapsed if items_elapsed > 0 else None
+            eta = None
+            if stats.total is not None and items_per_second:
+                eta = max(stats.total - stats.count, 0) / items_per_second
+            return {
+                "stage": stage,
+                "count": stats.count,
+                "errors": stats.errors,
+                "total": stats.total,
+                "seconds": elapsed,
+                "item_seconds": stats.item_seconds,
+                "items_per_second": items_per_second,
+                "eta_seconds": eta,
+                "slowest": [
+                    {"item": item, "seconds": seconds}
+                    for seconds, item in sorted(stats.slowest, reverse=True)
+                ],
+            }
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Возвращает состояние всех этапов, о которых были события."""
+        with self._lock:
+            return {stage: self.snapshot(stage) for stage in self._stages}
+
+    def _update_stats(self, event: Event) -> None:
+        stage = event.get("stage")
+        if stage is None:
+            return
+        if event["event"] == "stage_start":
+            self._stages[stage] = _StageStats(started=event["time"], total=event["total"])
+            return
+        stats = self._stages.get(stage)
+        if stats is None:
+            started = event["time"] - event.get("seconds", 0.0)
+            stats = self._stages[stage] = _StageStats(started=started, explicit=False)
+
+        match event["event"]:
+            case "stage_end":
+                stats.finished = event["time"]
+            case "item":
+                if not stats.explicit:
+                    stats.finished = event["time"]
+                if stats.first_item_started is None:
+                    stats.first_item_started = event["time"] - event["seconds"]
+                stats.count += event["count"]
+                stats.item_seconds += event["seconds"]
+                if event["error"] is not None:
+                    stats.errors += event["count"]
+                slowest_item = (event["seconds"], str(event["item"]))
+                if len(stats.slowest) < self.SLOWEST_ITEMS_COUNT:
+                    heapq.heappush(stats.slowest, slowest_item)
+                else:
+                    heapq.heappushpop(stats.slowest, slowest_item)
+
+
+class JsonLinesSink:
+    """Подписчик, записывающий каждое событие отдельной строкой JSON в файл."""
+
+    def __init__(self, path: PathLike) -> None:
+        """Открывает файл для записи событий.
+
+        :path:
+        Путь к файлу. Существующий файл перезаписывается.
+        """
+        self._file = open(path, "w", encoding="utf-8")  # noqa: SIM115
+
+    def __call__(self, event: Event) -> None:
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        self._file.close()
+
+
+class ConsoleSink:
+    """Подписчик, выводящий в консоль этапы с описанием, их прогресс и сообщения.
+
+    Вывод идет из отдельного потока с постоянной частотой обновления. Подписчик
+    только складывает события в очередь и не обрабатывает события об элементах:
+    прогресс берется из статистики сборщика событий. Поэтому тысячи быстрых
+    документов из разных потоков и процессов не тормозят генерацию выводом.
+
+    Прогресс всех выполняющихся одновременно этапов выводится в одну строку.
+    Этап `родитель.имя`, начатый внутри этапа `родитель`, считается его частью:
+    начало и конец такого этапа не выводятся, в строке прогресса он подписан
+    своим описанием.
+    """
+
+    BAR_LENGTH: Final[int] = 20
+    # Прогресс перерисовывается раз в столько секунд.
+    REFRESH_INTERVAL: Final[float] = 0.2
+
+    def __init__(self, metrics: Metrics, stream: TextIO = sys.stdout) -> None:
+        """Инициализирует вывод в консоль и запускает поток вывода.
+
+        :metrics:
+        Сборщик событий, из которого берется состояние этапов.
+
+        :stream:
+        Поток, в который выводится текст.
+        """
+        self._metrics = metrics
+        self._stream = stream
+        self._events: queue.SimpleQueue[Event] = queue.SimpleQueue()
+        # Выполняющиеся этапы с описанием: имя этапа -> описание.
+        self._titled_stages: dict[str, str] = {}
+        self._line_length = 0
+
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ConsoleSink", daemon=True)
+        self._thread.start()
+
+    def __call__(self, event: Event) -> None:
+        if event["event"] != "item":
+            self._events.put(event)
+
+    def close(self) -> None:
+        """Выводит оставшиеся события и останавливает поток вывода."""
+        self._closed.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._closed.wait(self.REFRESH_INTERVAL):
+            self._refresh()
+        self._refresh()
+        self._clear_progress()
+
+    def _refresh(self) -> None:
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._handle(event)
+
+        snapshots = [
+            (title, snapshot)
+            for stage, title in self._titled_stages.items()
+            if (snapshot := self._metrics.snapshot(stage))["count"] or snapshot["total"]
+        ]
+        if len(snapshots) == 1:
+            self._draw_progress(self._format_bar(snapshots[0][1]))
+        elif snapshots:
+            self._draw_progress(
+                " | ".join(
+                    f"{title}: {self._format_counts(snapshot)}" for title, snapshot in snapshots
+                ),
+            )
+
+    def _handle(self, event: Event) -> None:
+        match event["event"]:
+            case "stage_start" if event["title"]:
+                self._titled_stages[event["stage"]] = event["title"]
+                if not self._is_substage(event["stage"]):
+                    self._print(event["title"])
+            case "stage_end" if event["stage"] in self._titled_stages:
+                title = self._titled_stages.pop(event["stage"])
+                if not self._is_substage(event["stage"]):
+                    self._print(f"{title}: выполнено за {event['seconds']:.1f} с")
+            case "message":
+                self._print(event["text"])
+
+    def _is_substage(self, stage: str) -> bool:
+        parent, dot, _ = stage.rpartition(".")
+        return bool(dot) and parent in self._titled_stages
+
+    def _format_bar(self, snapshot: dict[str, Any]) -> str:
+        if not snapshot["total"]:
+            return f"Выполнено: {self._format_counts(snapshot)}"
+        share = min(snapshot["count"] / snapshot["total"], 1.0)
+        bar = ("▇" * int(share * self.BAR_LENGTH)).ljust(self.BAR_LENGTH, "-")
+        return f"Прогресс:[{bar}] {self._format_counts(snapshot)}"
+
+    @staticmethod
+    def _format_counts(snapshot: dict[str, Any]) -> str:
+        line = str(snapshot["count"])
+        if snapshot["total"]:
+            share = min(snapshot["count"] / snapshot["total"], 1.0)
+            line = f"{share:.0%} {snapshot['count']}/{snapshot['total']}"
+        if snapshot["items_per_second"]:
+            line += f", {snapshot['items_per_second']:.1f}/с"
+        if snapshot["eta_seconds"] is not None:
+            line += f", осталось ~{snapshot['eta_seconds']:.0f} с"
+        if snapshot["errors"]:
+            line += f", ошибок: {snapshot['errors']}"
+        return line
+
+    def _draw_progress(self, line: str) -> None:
+        self._stream.write("\r" + line.ljust(self._line_length))
+        self._stream.flush()
+        self._line_length = len(line)
+
+    def _clear_progress(self) -> None:
+        if self._line_length:
+            self._stream.write("\r" + " " * self._line_length + "\r")
+            self._stream.flush()
+            self._line_length = 0
+
+    def _print(self, text: str) -> None:
+        self._clear_progress()
+        self._stream.write(text + "\n")
+        self._stream.flush()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Возвращает сборщик событий текущего процесса.
+
+    По умолчанию у сборщика нет подписчиков: события только учитываются в статистике.
+    """
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> None:
+    """Заменяет сборщик событий текущего процесса."""
+    global _metrics  # noqa: PLW0603
+    _metrics = metrics
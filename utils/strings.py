@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import TypeGuard
+from typing import TypeVar
 
 import re
+import sys
+
+T = TypeVar("T")
 
 
 def sanitize_string(raw_str: str | None) -> str:
@@ -14,3 +17,7 @@ def try_extract_number_as_str(num_str: str, default_str: str = "0") -> str:
     if not search_result:
         return default_str
     return search_result.group()
+
+def intern_if_str(value: T) -> T:
+    """Возвращает общий экземпляр строки `value` (см. `sys.intern`), другие значения - как есть."""
+    return sys.intern(value) if isinstance(value, str) else value
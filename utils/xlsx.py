@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import posixpath
+import zipfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+from os import PathLike
+from typing import Self
+from xml.etree import ElementTree
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_WORKBOOK_PART = "xl/workbook.xml"
+_WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+_SHARED_STRINGS_REL_TYPE = "/sharedStrings"
+
+CellValue = str | float | bool | None
+
+
+@dataclass(frozen=True)
+class XlsxSheet:
+    name: str
+    part: str
+
+
+class XlsxReader:
+    """Потоковый читатель .xlsx файлов, работающий напрямую с XML-частями архива.
+
+    Не требует установленного Excel: листы читаются построчно через `iterparse`,
+    значения ячеек возвращаются в том же виде, что и у xlwings - строки, числа
+    с плавающей точкой, логические значения или `None` для пустых ячеек.
+    """
+
+    def __init__(self, filepath: PathLike) -> None:
+        """Открывает .xlsx файл.
+
+        :filepath:
+        Путь к .xlsx файлу.
+        """
+        self._archive = zipfile.ZipFile(filepath)
+        self._shared_strings: list[str] | None = None
+        self._sheets, self._shared_strings_part = self._read_workbook()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        self._archive.close()
+
+    @property
+    def sheets(self) -> list[XlsxSheet]:
+        """Листы книги в порядке их следования."""
+        return self._sheets
+
+    def iter_rows(self, sheet: XlsxSheet, max_col: int) -> Iterator[list[CellValue]]:
+        """Построчно возвращает значения первых `max_col` столбцов листа.
+
+        Строки возвращаются подряд начиная с первой, пропущенные в файле строки
+        возвращаются пустыми. Чтение прекращается после последней строки с данными
+        или когда вызывающий код перестает запрашивать строки.
+        """
+        shared_strings = self._get_shared_strings()
+        expected_row = 1
+
+        with self._archive.open(sheet.part) as sheet_file:
+            for _, element in ElementTree.iterparse(sheet_file):
+                if element.tag != f"{_MAIN_NS}row":
+                    continue
+
+                row_idx = int(element.get("r", expected_row))
+                while expected_row < row_idx:
+                    yield [None] * max_col
+                    expected_row += 1
+
+                yield self._read_row(element, max_col, shared_strings)
+                expected_row += 1
+                element.clear()
+
+    @staticmethod
+    def _read_row(
+        row_element: ElementTree.Element,
+        max_col: int,
+        shared_strings: list[str],
+    ) -> list[CellValue]:
+        values: list[CellValue] = [None] * max_col
+        col_idx = 0
+
+        for cell in row_element.iterfind(f"{_MAIN_NS}c"):
+            reference = cell.get("r")
+            col_idx = _column_index(reference) if reference else col_idx + 1
+            if col_idx <= max_col:
+                values[col_idx - 1] = _cell_value(cell, shared_strings)
+
+        return values
+
+    def _read_workbook(self) -> tuple[list[XlsxSheet], str | None]:
+        relationships: dict[str, tuple[str, str]] = {}
+        with self._archive.open(_WORKBOOK_RELS_PART) as rels_file:
+            for relationship in ElementTree.parse(rels_file).getroot():
+                target = relationship.get("Target", "")
+                part = (
+                    target.lstrip("/") if target.startswith("/")
+                    else posixpath.normpath(posixpath.join("xl", target))
+                )
+                relationships[relationship.get("Id", "")] = (
+                    relationship.get("Type", ""), part,
+                )
+
+        sheets: list[XlsxSheet] = []
+        with self._archive.open(_WORKBOOK_PART) as workbook_file:
+            workbook = ElementTree.parse(workbook_file).getroot()
+            for sheet in workbook.iterfind(f"{_MAIN_NS}sheets/{_MAIN_NS}sheet"):
+                _, part = relationships[sheet.get(f"{_REL_NS}id", "")]
+                sheets.append(XlsxSheet(name=sheet.get("name", ""), part=part))
+
+        shared_strings_part = next(
+            (
+                part for rel_type, part in relationships.values()
+                if rel_type.endswith(_SHARED_STRINGS_REL_TYPE)
+            ),
+            None,
+        )
+        return sheets, shared_strings_part
+
+    def _get_shared_strings(self) -> list[str]:
+        if self._shared_strings is not None:
+            return self._shared_strings
+
+        self._shared_strings = []
+        if self._shared_strings_part is None:
+            return self._shared_strings
+
+        with self._archive.open(self._shared_strings_part) as strings_file:
+            for _, element in ElementTree.iterparse(strings_file):
+                if element.tag == f"{_MAIN_NS}si":
+                    self._shared_strings.append(_inline_text(element))
+                    element.clear()
+
+        return self._shared_strings
+
+
+def _column_index(reference: str) -> int:
+    """Возвращает номер столбца (с 1) по адресу ячейки вида `AB12`."""
+    col_idx = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        col_idx = col_idx * 26 + ord(char.upper()) - ord("A") + 1
+    return col_idx
+
+
+def _inline_text(element: ElementTree.Element) -> str:
+    """Собирает текст строки, в том числе форматированной по частям (`<r>`).
+
+    Фонетические подсказки (`<rPh>`) в текст не включаются.
+    """
+    direct_text = element.find(f"{_MAIN_NS}t")
+    if direct_text is not None:
+        return direct_text.text or ""
+    return "".join(
+        run_text.text or ""
+        for run_text in element.iterfind(f"{_MAIN_NS}r/{_MAIN_NS}t")
+    )
+
+
+def _cell_value(cell: ElementTree.Element, shared_strings: list[str]) -> CellValue:
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        inline_string = cell.find(f"{_MAIN_NS}is")
+        return _inline_text(inline_string) if inline_string is not None else None
+
+    raw_value = cell.findtext(f"{_MAIN_NS}v")
+    if raw_value is None:
+        return None
+
+    match cell_type:
+        case "s":
+            return shared_strings[int(raw_value)]
+        case "b":
+            return raw_value == "1"
+        case "n":
+            return float(raw_value)
+        case _:
+            return raw_value